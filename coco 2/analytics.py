@@ -0,0 +1,134 @@
+""" Reporting over stored quotations from materialized summary rows
+
+Dashboards read small precomputed rows instead of scanning quotations:
+
+    month       quotations and total quoted value per month (by created_at)
+    floor       line items, total area and value per floor type (name, case-insensitive)
+    extra_work  line items, total quantity and revenue per extra work
+
+The repositories keep these rows current on every save: a new quotation adds
+its contribution and a new revision swaps the old one for its own. rebuild()
+recomputes them from scratch with server-side aggregation ($unwind over the
+line items and $group, or the SQLite equivalent over json_each); run it after
+importing data by other means or if an incremental update was interrupted.
+Quotations stored before created_at existed count under the month their
+MongoDB ObjectId was generated; rebuild() writes that date into them. SQLite
+rows without a created_at count under UNKNOWN_MONTH.
+
+    python analytics.py monthly
+    python analytics.py floors
+    python analytics.py extra-works --top 10
+    python analytics.py rebuild
+"""
+import argparse
+import sys
+from datetime import datetime
+
+MONTH, FLOOR, EXTRA_WORK = "month", "floor", "extra_work"
+SUMMARY_KINDS = (MONTH, FLOOR, EXTRA_WORK)
+SUMMARY_COLLECTION_NAME = "quotation_summaries"
+UNKNOWN_MONTH = "unknown"
+
+# MongoDB pipelines that recompute each kind of summary row from the quotations collection
+PIPELINES = {
+    MONTH: [
+        {"$group": {"_id": {"year": {"$year": "$created_at"}, "month": {"$month": "$created_at"}},
+                    "count": {"$sum": 1}, "total": {"$sum": "$total_project_cost"}}},
+    ],
+    FLOOR: [
+        {"$unwind": "$floors"},
+        {"$group": {"_id": {"$toLower": "$floors.name"}, "name": {"$first": "$floors.name"}, "count": {"$sum": 1},
+                    "quantity": {"$sum": "$floors.area_sqft"}, "total": {"$sum": "$floors.total_cost"}}},
+    ],
+    EXTRA_WORK: [
+        {"$unwind": "$extra_works"},
+        {"$group": {"_id": {"$toLower": "$extra_works.name"}, "name": {"$first": "$extra_works.name"}, "count": {"$sum": 1},
+                    "quantity": {"$sum": "$extra_works.quantity"}, "total": {"$sum": "$extra_works.total_cost"}}},
+    ],
+}
+
+
+def month_key(created_at):
+    """ "YYYY-MM" of a stored created_at (datetime or ISO string), or UNKNOWN_MONTH """
+    if isinstance(created_at, datetime):
+        return f"{created_at.year:04d}-{created_at.month:02d}"
+    return str(created_at)[:7] if created_at else UNKNOWN_MONTH
+
+
+def created_at(document):
+    """ created_at of a stored quotation, falling back to the generation time of its ObjectId (None if neither) """
+    if document.get("created_at"):
+        return document["created_at"]
+    return getattr(document.get("_id"), "generation_time", None)
+
+
+def summary_increments(added=(), removed=()):
+    """ {(kind, key): [name, count, quantity, total]} that storing `added` and dropping `removed` documents adds to the summaries """
+    increments = {}
+
+    def add(kind, key, name, count, quantity, total):
+        row = increments.setdefault((kind, key), [name, 0, 0, 0])
+        row[1] += count
+        row[2] += quantity
+        row[3] += total
+
+    for documents, sign in ((added, 1), (removed, -1)):
+        for document in documents:
+            month = month_key(created_at(document))
+            add(MONTH, month, month, sign, 0, sign * (document.get("total_project_cost") or 0))
+            for kind, items, quantity in ((FLOOR, "floors", "area_sqft"), (EXTRA_WORK, "extra_works", "quantity")):
+                for item in document.get(items) or []:
+                    add(kind, item["name"].lower(), item["name"], sign, sign * item[quantity], sign * item["total_cost"])
+    return {key: row for key, row in increments.items() if row[1:] != [0, 0, 0]}
+
+
+def _rows(repository, kind):
+    return [row for row in repository.summaries(kind) if row["count"] > 0]
+
+
+def monthly_totals(repository):
+    """ [{month, count, total}] oldest month first """
+    return [{"month": row["key"], "count": row["count"], "total": round(row["total"], 2)}
+            for row in sorted(_rows(repository, MONTH), key=lambda row: row["key"])]
+
+
+def floor_rates(repository):
+    """ [{name, count, area_sqft, total, cost_per_sqft}] by total value, highest first """
+    return [{"name": row["name"], "count": row["count"], "area_sqft": round(row["quantity"], 2), "total": round(row["total"], 2),
+             "cost_per_sqft": round(row["total"] / row["quantity"], 2) if row["quantity"] else 0.0}
+            for row in sorted(_rows(repository, FLOOR), key=lambda row: -row["total"])]
+
+
+def top_extra_works(repository, limit=10):
+    """ [{name, count, quantity, total}] of the `limit` extra works with the most revenue """
+    return [{"name": row["name"], "count": row["count"], "quantity": round(row["quantity"], 2), "total": round(row["total"], 2)}
+            for row in sorted(_rows(repository, EXTRA_WORK), key=lambda row: -row["total"])[:limit]]
+
+
+def main(argv=None):
+    from storage import get_repository, open_repository
+
+    parser = argparse.ArgumentParser(prog="analytics", description="Report on stored quotations.")
+    parser.add_argument("report", choices=("monthly", "floors", "extra-works", "rebuild"))
+    parser.add_argument("--top", type=int, default=10, help="extra works to list (default: 10)")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    args = parser.parse_args(argv)
+
+    repository = open_repository(args.db) if args.db else get_repository()
+    if args.report == "rebuild":
+        rows = repository.rebuild_summaries()
+        print(f"✅ Rebuilt {rows} summary rows")
+    elif args.report == "monthly":
+        for row in monthly_totals(repository):
+            print(f"{row['month']}  {row['count']:6d} quotations  ₹{row['total']:,.2f}")
+    elif args.report == "floors":
+        for row in floor_rates(repository):
+            print(f"{row['name']:<30} {row['count']:6d} items  {row['area_sqft']:>12,.2f} sqft  ₹{row['cost_per_sqft']:,.2f}/sqft")
+    else:
+        for row in top_extra_works(repository, args.top):
+            print(f"{row['name']:<30} {row['count']:6d} items  qty {row['quantity']:>10,.2f}  ₹{row['total']:,.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
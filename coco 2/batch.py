@@ -0,0 +1,91 @@
+""" Batch quotation rendering: stream records from CSV/JSONL and render PDFs on all CPU cores """
+import argparse
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from estimator_core import build_pdf, iter_records, pdf_bytes, quotation_from_dict, validate_customer_info
+
+
+def pdf_filename(record):
+    """ Output file name for a record, derived from its quote_id """
+    quote_id = re.sub(r"[^A-Za-z0-9_.@-]+", "_", str(record.get("quote_id", ""))).strip("._") or "quotation"
+    return f"{quote_id}.pdf"
+
+
+def render_record(record, output_dir):
+    """ Validate one quotation record and write its PDF; returns the PDF path """
+    quotation = quotation_from_dict(record)
+    validate_customer_info(quotation.customer_name, quotation.building_site, quotation.validity_date)
+    if quotation.is_empty():
+        raise ValueError("No data to export!")
+
+    pdf_path = os.path.join(output_dir, pdf_filename(record))
+    # Every record is a different quotation, so skip the render memo
+    with open(pdf_path, "wb") as f:
+        f.write(pdf_bytes(build_pdf(quotation)))
+    return pdf_path
+
+
+def run_batch(path, output_dir, workers=None, report=print):
+    """ Render every record in `path` into `output_dir`; returns (rendered, failures, seconds)
+
+    Records are streamed to the pool with a bounded number in flight, so the
+    input file is never loaded into memory as a whole. A failing record is
+    reported and counted but does not stop the run.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    failures = []
+    rendered = 0
+
+    def fail(location, error):
+        failures.append((location, str(error)))
+        report(f"❌ {location}: {error}")
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+
+        def collect(quote_id, future):
+            nonlocal rendered
+            try:
+                future.result()
+                rendered += 1
+            except Exception as e:
+                fail(f"quote {quote_id}", e)
+
+        for record in iter_records(path, on_error=fail):
+            pending.append((record.get("quote_id"), executor.submit(render_record, record, output_dir)))
+            if len(pending) >= workers * 4:
+                collect(*pending.popleft())
+
+        while pending:
+            collect(*pending.popleft())
+    elapsed = time.perf_counter() - start
+
+    rate = rendered / elapsed if elapsed > 0 else 0.0
+    report(f"✅ {rendered} quotations rendered, {len(failures)} failed in {elapsed:.2f}s ({rate:.1f} quotes/sec)")
+    return rendered, failures, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="batch", description="Render many quotations from a CSV or JSONL file to PDF.")
+    parser.add_argument("input", help="quotation records (.csv or .jsonl)")
+    parser.add_argument("-o", "--output-dir", default="quotations", help="directory for the PDFs (default: quotations)")
+    parser.add_argument("-j", "--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    try:
+        rendered, failures, _ = run_batch(args.input, args.output_dir, args.workers)
+    except OSError as e:
+        print(f"❌ {args.input}: {e}", file=sys.stderr)
+        return 1
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+""" Benchmarks of the estimation, PDF, e-mail and persistence hot paths on synthetic quotations
+
+Each case runs on quotations of 10 to 10,000 line items, generated from a
+fixed seed so every run measures the same work:
+
+    totals      quotation_from_dict (validation + line totals) and the running total update_total shows
+    pdf         build_pdf + pdf_bytes, bypassing the PDF cache
+    stream      pdf_stream.stream_pdf to os.devnull
+    mime        build_message + serialization of the message send_email queues
+    save        repository.save of a fresh quotation
+    fetch       repository.get + find_page for its email
+
+The repository is an in-memory SQLite database, plus mongomock when it is
+installed. Nothing needs a display. Results go to a JSON file; pass an older
+file with --compare to print the change per case and fail on regressions.
+
+    python benchmark.py -o bench.json
+    python benchmark.py --compare bench-main.json --sizes 10 100 1000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from estimator_core import build_pdf, pdf_bytes, quotation_from_dict
+from mailer import build_message
+from pdf_stream import stream_pdf
+from storage import MongoRepository, SQLiteRepository
+
+SIZES = (10, 100, 1000, 10000)
+CASES = ("totals", "pdf", "stream", "mime", "save", "fetch")
+REGRESSION_PCT = 10.0  # --compare fails on a case this much slower than before
+MAX_CASE_SECONDS = 2.0  # Stop repeating a case once it has run this long
+
+FLOOR_NAMES = ("Ground Floor", "First Floor", "Second Floor", "Terrace", "Basement", "Stilt Parking", "Podium")
+EXTRA_WORK_NAMES = ("Compound wall", "Sump", "Septic tank", "Main gate", "Borewell", "Overhead tank",
+                    "Rainwater harvesting", "Staircase headroom", "Parapet wall", "Electrical fittings")
+
+
+def synthetic_quotation(lines, seed=0):
+    """ Quotation dict with `lines` line items, about a quarter of them floors, named from a catalogue-sized set """
+    rng = random.Random(f"{seed}:{lines}")
+    floors = [{"name": rng.choice(FLOOR_NAMES), "area_sqft": rng.randint(200, 4000),
+               "cost_per_sqft": rng.randint(1400, 2800)} for _ in range(max(1, lines // 4))]
+    extra_works = [{"name": rng.choice(EXTRA_WORK_NAMES), "quantity": rng.randint(1, 500),
+                    "cost_per_unit": rng.randint(50, 25000)} for _ in range(lines - len(floors))]
+    return {"email": f"bench{seed}@example.com", "customer_name": f"Benchmark Customer {seed}",
+            "building_site": f"Plot {rng.randint(1, 999)}, Benchmark Layout", "validity_date": "2030-12-31",
+            "floors": floors, "extra_works": extra_works}
+
+
+def measure(work, repeat):
+    """ Seconds per call of work() over up to `repeat` calls (at least one) """
+    times = []
+    started = time.perf_counter()
+    while len(times) < repeat and (not times or time.perf_counter() - started < MAX_CASE_SECONDS):
+        start = time.perf_counter()
+        work()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _repositories():
+    repositories = {"sqlite": SQLiteRepository(":memory:")}
+    try:
+        import mongomock
+    except ImportError:
+        pass
+    else:
+        repositories["mongomock"] = MongoRepository(client=mongomock.MongoClient())
+    return repositories
+
+
+def run_benchmarks(sizes=SIZES, cases=CASES, repeat=5, report=print):
+    """ List of result dicts (case, backend, lines, runs, best_ms, median_ms, mean_ms) """
+    results = []
+
+    def record(case, lines, times, backend=None):
+        result = {"case": case, "backend": backend, "lines": lines, "runs": len(times),
+                  "best_ms": round(min(times) * 1000, 3), "median_ms": round(statistics.median(times) * 1000, 3),
+                  "mean_ms": round(statistics.fmean(times) * 1000, 3)}
+        results.append(result)
+        report(f"   {_name(result):<28} {lines:>6} lines  best {result['best_ms']:10.3f} ms  median {result['median_ms']:10.3f} ms")
+
+    repositories = _repositories() if {"save", "fetch"} & set(cases) else {}
+    for lines in sizes:
+        data = synthetic_quotation(lines)
+        quotation = quotation_from_dict(data)
+        if "totals" in cases:
+            record("totals", lines, measure(lambda: quotation_from_dict(data).total_cost, repeat))
+        if "pdf" in cases or "mime" in cases:
+            pdf_data = pdf_bytes(build_pdf(quotation))
+            if "pdf" in cases:
+                record("pdf", lines, measure(lambda: pdf_bytes(build_pdf(quotation)), repeat))
+            if "mime" in cases:
+                record("mime", lines, measure(lambda: build_message(data["email"], pdf_data).as_bytes(), repeat))
+        if "stream" in cases:
+            with open(os.devnull, "wb") as sink:
+                record("stream", lines, measure(lambda: stream_pdf(quotation, sink), repeat))
+
+        for backend, repository in repositories.items():
+            document = quotation.to_document()
+            saved = []
+            if "save" in cases:
+                def save():
+                    # A new customer name each call, so every save inserts instead of finding its twin
+                    saved.append(repository.save(dict(document, customer_name=f"{document['customer_name']} #{len(saved)}")))
+                record("save", lines, measure(save, repeat), backend)
+            quote_id = saved[-1] if saved else repository.save(document)
+            if "fetch" in cases:
+                record("fetch", lines, measure(lambda: (repository.get(quote_id), repository.find_page(data["email"])), repeat), backend)
+    return results
+
+
+def _name(result):
+    return f"{result['case']} ({result['backend']})" if result["backend"] else result["case"]
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(old, new, threshold_pct=REGRESSION_PCT, report=print):
+    """ Print the change in median time per case between two result files; returns the cases that regressed """
+    before = {(result["case"], result["backend"], result["lines"]): result for result in old["results"]}
+    regressions = []
+    report(f"🔍 {old.get('commit') or 'old'} → {new.get('commit') or 'new'}")
+    for result in new["results"]:
+        previous = before.get((result["case"], result["backend"], result["lines"]))
+        if previous is None or not previous["median_ms"]:
+            continue
+        change = (result["median_ms"] - previous["median_ms"]) / previous["median_ms"] * 100
+        flag = "❌" if change > threshold_pct else "✅"
+        report(f"{flag} {_name(result):<28} {result['lines']:>6} lines  {previous['median_ms']:10.3f} → {result['median_ms']:10.3f} ms  ({change:+.1f}%)")
+        if change > threshold_pct:
+            regressions.append(result)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark", description="Benchmark totals, PDF export, e-mail assembly and save/fetch.")
+    parser.add_argument("-o", "--output", default="benchmark.json", help="JSON file to write the results to (default: benchmark.json)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES), help="line item counts (default: 10 100 1000 10000)")
+    parser.add_argument("--cases", nargs="+", choices=CASES, default=list(CASES), help="cases to run (default: all)")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="runs per case (default: 5; fewer for cases over 2s)")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_PCT, help=f"%% slowdown counted as a regression (default: {REGRESSION_PCT:g})")
+    args = parser.parse_args(argv)
+
+    print(f"🔍 Benchmarking {', '.join(args.cases)} on {', '.join(map(str, args.sizes))} line items")
+    run = {"commit": _commit(), "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+           "python": platform.python_version(), "platform": platform.platform(),
+           "results": run_benchmarks(args.sizes, args.cases, args.repeat)}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        if compare(old, run, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+""" Vectorized bill-of-quantities engine with exact paise arithmetic (requires numpy)
+
+Line items are held as typed arrays: quantities in thousandths of a unit
+(so 1200.125 sqft is exact), rates and money in integer paise and tax rates
+in basis points. Line totals, tax, subtotals and the grand total are computed
+in one pass of integer array operations, rounding half up to the paise once
+per line, so totals never drift the way summed floats do.
+
+Input amounts go through Decimal (to_paise, to_milli) on every path, so
+add() and extend() store exactly the same values. The engine prices bills
+of quantities and rate revisions (reprice.py); Quotation totals in the app
+and on the PDF are still the float sums of estimator_core.
+"""
+from decimal import ROUND_HALF_UP, Decimal
+
+import numpy as np
+
+FLOOR = 0
+EXTRA_WORK = 1
+CATEGORY_NAMES = ("floor", "extra_work")
+
+QTY_SCALE = 1000  # quantities are stored in thousandths
+PAISE = 100
+
+
+def to_paise(amount):
+    """ Rupee amount (number or numeric string) as integer paise, rounded half up """
+    return int((Decimal(str(amount)) * PAISE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def to_milli(quantity):
+    """ Quantity (number or numeric string) as integer thousandths of a unit, rounded half up """
+    return int((Decimal(str(quantity)) * QTY_SCALE).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def format_paise(paise):
+    """ ₹ string for an integer paise amount """
+    sign = "-" if paise < 0 else ""
+    rupees, rem = divmod(abs(int(paise)), PAISE)
+    return f"{sign}₹{rupees:,}.{rem:02d}"
+
+
+def _converted(values, convert, count):
+    """ int64 array of convert(value) per value, converting each distinct value once """
+    cache = {}
+
+    def lookup(value):
+        converted = cache.get(value)
+        if converted is None:
+            converted = cache[value] = convert(value)
+        return converted
+
+    return np.fromiter(map(lookup, values), dtype=np.int64, count=count)
+
+
+def _div_round(numerator, denominator):
+    """ Integer division rounding half up, elementwise """
+    return (numerator + denominator // 2) // denominator
+
+
+def _group_sums(codes, values, size):
+    """ Exact int64 per-code sums via bincount on 26-bit halves (float64 bins stay exact) """
+    low = values & ((1 << 26) - 1)
+    high = values >> 26
+    return (np.bincount(codes, weights=low, minlength=size).astype(np.int64)
+            + (np.bincount(codes, weights=high, minlength=size).astype(np.int64) << 26))
+
+
+class BillTotals:
+    """ Result of BillOfQuantities.compute(); all money in integer paise """
+    __slots__ = ("line_totals", "line_tax", "by_category", "by_group", "subtotal", "tax", "grand_total")
+
+    def __init__(self, line_totals, line_tax, by_category, by_group, subtotal, tax, grand_total):
+        self.line_totals = line_totals
+        self.line_tax = line_tax
+        self.by_category = by_category
+        self.by_group = by_group
+        self.subtotal = subtotal
+        self.tax = tax
+        self.grand_total = grand_total
+
+
+class BillOfQuantities:
+    """ Growable columnar store of line items """
+
+    def __init__(self, capacity=64):
+        self._size = 0
+        self.category = np.zeros(capacity, dtype=np.intp)
+        self.group = np.zeros(capacity, dtype=np.intp)
+        self.qty_milli = np.zeros(capacity, dtype=np.int64)
+        self.rate_paise = np.zeros(capacity, dtype=np.int64)
+        self.tax_bp = np.zeros(capacity, dtype=np.int32)
+        self.names = []
+        self.group_names = []
+        self._group_codes = {}
+
+    def __len__(self):
+        return self._size
+
+    def _group_code(self, group):
+        code = self._group_codes.get(group)
+        if code is None:
+            code = self._group_codes[group] = len(self.group_names)
+            self.group_names.append(group)
+        return code
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self.category)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for column in ("category", "group", "qty_milli", "rate_paise", "tax_bp"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, column, new)
+
+    def add(self, category, name, quantity, rate, group=None, tax_bp=0):
+        """ Append one line item; `group` defaults to the item name """
+        self._reserve(1)
+        i = self._size
+        self.category[i] = category
+        self.group[i] = self._group_code(name if group is None else group)
+        self.qty_milli[i] = to_milli(quantity)
+        self.rate_paise[i] = to_paise(rate)
+        self.tax_bp[i] = tax_bp
+        self.names.append(name)
+        self._size += 1
+
+    def extend(self, category, names, quantities, rates, groups=None, tax_bp=0):
+        """ Append many line items of one category from sequences or arrays """
+        count = len(names)
+        self._reserve(count)
+        start, end = self._size, self._size + count
+        self.category[start:end] = category
+        self.group[start:end] = [self._group_code(group) for group in (names if groups is None else groups)]
+        # Through Decimal like add(); float scaling would round a 0.285 rate down to 28 paise
+        self.qty_milli[start:end] = _converted(quantities, to_milli, count)
+        self.rate_paise[start:end] = _converted(rates, to_paise, count)
+        self.tax_bp[start:end] = tax_bp
+        self.names.extend(names)
+        self._size = end
+
+    @classmethod
+    def from_quotation(cls, quotation, tax_bp=0):
+        """ Bill for a Quotation: floors grouped by floor name, extra works by work name """
+        bill = cls(capacity=max(len(quotation.floors) + len(quotation.extra_works), 1))
+        bill.extend(FLOOR, [floor.name for floor in quotation.floors],
+                    [floor.area_sqft for floor in quotation.floors],
+                    [floor.cost_per_sqft for floor in quotation.floors], tax_bp=tax_bp)
+        bill.extend(EXTRA_WORK, [work.name for work in quotation.extra_works],
+                    [work.quantity for work in quotation.extra_works],
+                    [work.cost_per_unit for work in quotation.extra_works], tax_bp=tax_bp)
+        return bill
+
+    def repriced(self, rate_paise):
+        """ Copy of this bill with the given per-line rates (paise); quantities and groups are shared """
+        bill = BillOfQuantities.__new__(BillOfQuantities)
+        bill.__dict__.update(self.__dict__)
+        bill.rate_paise = np.asarray(rate_paise, dtype=np.int64)
+        return bill
+
+    def compute(self):
+        """ Line totals, tax, subtotals by category and group, and the grand total in one pass """
+        n = self._size
+        line_totals = _div_round(self.qty_milli[:n] * self.rate_paise[:n], QTY_SCALE)
+        line_tax = _div_round(line_totals * self.tax_bp[:n], 10000)
+        gross = line_totals + line_tax
+
+        by_category = _group_sums(self.category[:n], gross, len(CATEGORY_NAMES))
+        by_group = _group_sums(self.group[:n], gross, len(self.group_names))
+
+        subtotal = int(line_totals.sum())
+        tax = int(line_tax.sum())
+        return BillTotals(
+            line_totals=line_totals,
+            line_tax=line_tax,
+            by_category=dict(zip(CATEGORY_NAMES, (int(v) for v in by_category))),
+            by_group=dict(zip(self.group_names, (int(v) for v in by_group))),
+            subtotal=subtotal,
+            tax=tax,
+            grand_total=subtotal + tax,
+        )
@@ -0,0 +1,139 @@
+""" Bulk e-mail campaign: send many saved quotations over a few long-lived SMTP sessions """
+import argparse
+import csv
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from estimator_core import quotation_from_dict, render_pdf
+from mailer import SENDER_EMAIL, RateLimiter, SMTPSession, build_message
+from storage import get_repository
+
+REPORT_FIELDS = ("quote_id", "recipient", "status", "error", "sent_at")
+
+
+def render_document(document):
+    """ Render a stored quotation document (or read it from the PDF cache); returns (quote_id, recipient, pdf bytes) """
+    quotation = quotation_from_dict(document)
+    return str(document["_id"]), quotation.email, render_pdf(quotation)
+
+
+def run_campaign(quote_ids, sessions=4, per_minute=None, workers=None, session_factory=SMTPSession, report=print):
+    """ Render and send every quotation in `quote_ids`; returns (rows, seconds)
+
+    PDFs are rendered in a process pool and handed over as they finish to
+    `sessions` sender threads, each holding one SMTP session for the whole run.
+    At most two renders per worker are in flight and the hand-over queue is
+    bounded, so only a few quotations and PDFs are held in memory at a time.
+    `per_minute` caps the combined send rate. Each returned row has the
+    REPORT_FIELDS keys, one per requested quotation.
+    """
+    rows = []
+    rows_lock = threading.Lock()
+    outbox = queue.Queue(maxsize=sessions * 4)
+    limiter = RateLimiter(per_minute)
+
+    def record(quote_id, recipient, status, error=""):
+        with rows_lock:
+            rows.append({"quote_id": quote_id, "recipient": recipient, "status": status,
+                         "error": error, "sent_at": time.strftime("%Y-%m-%d %H:%M:%S")})
+        if status != "sent":
+            report(f"❌ {quote_id} ({recipient}): {error}")
+
+    def sender():
+        session = session_factory()
+        try:
+            while True:
+                item = outbox.get()
+                if item is None:
+                    break
+                quote_id, recipient, pdf_data = item
+                try:
+                    msg = build_message(recipient, pdf_data)
+                    limiter.wait()
+                    session.send(SENDER_EMAIL, recipient, msg.as_string())
+                    record(quote_id, recipient, "sent")
+                except Exception as e:
+                    session.close()
+                    record(quote_id, recipient, "failed", str(e))
+        finally:
+            session.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=sender, name=f"campaign-smtp-{i}", daemon=True) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+
+    found = set()
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = {}
+
+        def collect(return_when):
+            done, _ = wait(in_flight, return_when=return_when)
+            for future in done:
+                quote_id, recipient = in_flight.pop(future)
+                try:
+                    outbox.put(future.result())  # Blocks while the senders are behind
+                except Exception as e:
+                    record(quote_id, recipient, "failed", f"render error: {e}")
+
+        for document in get_repository().get_many(quote_ids):
+            quote_id = str(document["_id"])
+            found.add(quote_id)
+            in_flight[executor.submit(render_document, document)] = (quote_id, document.get("email", ""))
+            if len(in_flight) >= workers * 2:
+                collect(FIRST_COMPLETED)
+        while in_flight:
+            collect(FIRST_COMPLETED)
+
+    for quote_id in quote_ids:
+        if quote_id not in found:
+            record(quote_id, "", "failed", "quotation not found")
+
+    for _ in threads:
+        outbox.put(None)
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    sent = sum(1 for row in rows if row["status"] == "sent")
+    rate = sent / elapsed * 60 if elapsed > 0 else 0.0
+    report(f"✅ {sent} of {len(quote_ids)} quotations sent in {elapsed:.1f}s ({rate:.0f} messages/min)")
+    return rows, elapsed
+
+
+def write_report(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="campaign", description="E-mail many saved quotations in one run.")
+    parser.add_argument("ids", help="file with one saved quotation id per line")
+    parser.add_argument("-s", "--sessions", type=int, default=4, help="parallel SMTP sessions (default: 4)")
+    parser.add_argument("-r", "--rate", type=float, help="maximum messages per minute across all sessions")
+    parser.add_argument("-j", "--workers", type=int, help="PDF render processes (default: CPU count)")
+    parser.add_argument("--report", default="campaign_report.csv", help="per-recipient delivery report (CSV)")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.ids, encoding="utf-8") as f:
+            quote_ids = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    except OSError as e:
+        print(f"❌ {args.ids}: {e}", file=sys.stderr)
+        return 1
+
+    rows, _ = run_campaign(quote_ids, args.sessions, args.rate, args.workers)
+    write_report(rows, args.report)
+    print(f"📄 Delivery report written to {os.path.abspath(args.report)}")
+    return 0 if all(row["status"] == "sent" for row in rows) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+""" Versioned rate catalogue with cached, prefix-indexed lookups
+
+Each catalogue version is an immutable list of entries
+{"name", "category" ("floor" or "extra_work"), "rate", "unit"} stored by the
+repository next to the quotations. Versions are loaded once into an LRU cache.
+The current version is re-checked at most every `refresh_interval`
+seconds (or after invalidate()), so a newly published catalogue is picked up
+without re-reading an unchanged one. current() may wait on the database;
+code that must not block (the GUI's key handlers) reads cached() and
+refreshes in the background when stale() says a re-check is due.
+"""
+import argparse
+import bisect
+import csv
+import sys
+import threading
+import time
+from functools import lru_cache
+
+from storage import get_repository, open_repository
+
+CATEGORIES = ("floor", "extra_work")
+
+
+class CatalogueSnapshot:
+    """ One catalogue version with an exact-name map and a sorted word-prefix index """
+    __slots__ = ("version", "entries", "_by_name", "_keys", "_positions")
+
+    def __init__(self, version, entries):
+        self.version = version
+        self.entries = tuple(entries)
+        self._by_name = {}
+        index = []
+        for position, entry in enumerate(self.entries):
+            name = entry["name"].strip().lower()
+            self._by_name[(entry.get("category"), name)] = entry
+            # Index every word start so "rcc" finds "Ground Floor – RCC"
+            words = name.split()
+            for i in range(len(words)):
+                index.append((" ".join(words[i:]), position))
+        index.sort()
+        self._keys = [key for key, _ in index]
+        self._positions = [position for _, position in index]
+
+    def get(self, name, category=None):
+        """ Entry with exactly this name (case-insensitive), or None """
+        return self._by_name.get((category, name.strip().lower()))
+
+    def search(self, prefix, category=None, limit=20):
+        """ Entries with a word starting with `prefix`; O(log n + limit) """
+        prefix = " ".join(prefix.strip().lower().split())
+        if not prefix:
+            return []
+        results = []
+        seen = set()
+        start = bisect.bisect_left(self._keys, prefix)
+        for i in range(start, len(self._keys)):
+            if not self._keys[i].startswith(prefix):
+                break
+            position = self._positions[i]
+            entry = self.entries[position]
+            if position in seen or (category is not None and entry.get("category") != category):
+                continue
+            seen.add(position)
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+
+class RateCatalogue:
+    """ Cached access to the catalogue versions of a repository """
+
+    def __init__(self, repository=None, refresh_interval=30.0, cache_size=8):
+        self.repository = repository
+        self.refresh_interval = refresh_interval
+        self._latest = None
+        self._snapshot = None
+        self._checked_at = None  # monotonic time of the last check; None forces one
+        self._lock = threading.Lock()
+        self.load_version = lru_cache(maxsize=cache_size)(self._load_version)
+
+    def _repository(self):
+        return self.repository or get_repository()
+
+    def _load_version(self, version):
+        entries = self._repository().get_catalogue(version)
+        if entries is None:
+            raise KeyError(f"Rate catalogue version {version} does not exist")
+        return CatalogueSnapshot(version, entries)
+
+    def invalidate(self):
+        """ Force the next current() call to re-check the latest version """
+        self._checked_at = None
+
+    def stale(self):
+        """ True once the next current() call will re-check the latest version """
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.refresh_interval
+
+    def current(self):
+        """ Snapshot of the newest catalogue version, or None if there is no catalogue; may query the database """
+        with self._lock:
+            if self.stale():
+                # Stamp first so an unreachable database is not retried on every call
+                self._checked_at = time.monotonic()
+                self._latest = self._repository().latest_catalogue_version()
+            latest = self._latest
+        self._snapshot = self.load_version(latest) if latest is not None else None
+        return self._snapshot
+
+    def cached(self):
+        """ Snapshot the last current() call returned, without touching the database """
+        return self._snapshot
+
+    def publish(self, entries):
+        """ Store entries as a new version and make it current """
+        version = self._repository().save_catalogue(entries)
+        self.invalidate()
+        return version
+
+
+def read_entries(path):
+    """ Catalogue entries from a CSV with the columns name, category, rate and unit """
+    entries = []
+    with open(path, encoding="utf-8", newline="") as f:
+        for line_no, row in enumerate(csv.DictReader(f), 2):
+            name = (row.get("name") or "").strip()
+            category = (row.get("category") or "").strip().lower()
+            if not name or category not in CATEGORIES:
+                raise ValueError(f"line {line_no}: name is required and category must be one of {', '.join(CATEGORIES)}")
+            entries.append({"name": name, "category": category, "rate": float(row["rate"]), "unit": (row.get("unit") or "").strip()})
+    return entries
+
+
+_catalogue = None
+
+
+def get_catalogue():
+    """ Process-wide RateCatalogue over the configured repository """
+    global _catalogue
+    if _catalogue is None:
+        _catalogue = RateCatalogue()
+    return _catalogue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="catalogue", description="Publish or search the rate catalogue.")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish = commands.add_parser("publish", help="store a CSV (name,category,rate,unit) as a new catalogue version")
+    publish.add_argument("csv")
+    search = commands.add_parser("search", help="list catalogue entries matching a prefix")
+    search.add_argument("prefix")
+    args = parser.parse_args(argv)
+
+    catalogue = RateCatalogue(open_repository(args.db) if args.db else None)
+    if args.command == "publish":
+        try:
+            entries = read_entries(args.csv)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {args.csv}: {e}", file=sys.stderr)
+            return 1
+        print(f"✅ Published rate catalogue version {catalogue.publish(entries)} with {len(entries)} entries")
+        return 0
+
+    snapshot = catalogue.current()
+    if snapshot is None:
+        print("❌ No rate catalogue has been published yet.", file=sys.stderr)
+        return 1
+    for entry in snapshot.search(args.prefix):
+        print(f"{entry['name']} ({entry['category']}): ₹{entry['rate']} {entry.get('unit', '')}".rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+""" Command-line quotation estimator: estimate quote.json -o quote.pdf
+
+A CSV bill of quantities (one quotation, the iter_records CSV columns) is
+always exported with the streaming PDF writer, so its size is not limited by
+memory; --stream does the same for a JSON quotation.
+"""
+import argparse
+import os
+import sys
+
+from estimator_core import iter_line_items, load_bill_header, load_quotation, render_pdf, validate_customer_info
+from pdf_cache import PDFCache, set_pdf_cache
+from storage import get_repository
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="estimate", description="Generate a construction quotation PDF from a JSON file.")
+    parser.add_argument("input", help="quotation JSON file, or CSV bill of quantities")
+    parser.add_argument("-o", "--output", help="PDF output path (default: input name with .pdf)")
+    parser.add_argument("--stream", action="store_true", help="write the PDF page by page instead of through the PDF cache")
+    parser.add_argument("--save", action="store_true", help="also store the quotation (database from ESTIMATOR_DB, default local MongoDB)")
+    args = parser.parse_args(argv)
+
+    if "ESTIMATOR_PDF_CACHE" not in os.environ:
+        set_pdf_cache(PDFCache(directory=None))  # A one-shot run would only leave ./pdf_cache behind
+
+    output = args.output or os.path.splitext(args.input)[0] + ".pdf"
+    if args.input.lower().endswith(".csv"):
+        if args.save:
+            print(f"❌ {args.input}: --save needs a JSON quotation.", file=sys.stderr)
+            return 1
+        return stream_export(args.input, output)
+
+    try:
+        quotation = load_quotation(args.input)
+        validate_customer_info(quotation.customer_name, quotation.building_site, quotation.validity_date)
+    except (OSError, ValueError) as e:
+        print(f"❌ {args.input}: {e}", file=sys.stderr)
+        return 1
+
+    if quotation.is_empty():
+        print(f"❌ {args.input}: No data to export!", file=sys.stderr)
+        return 1
+
+    if args.stream:
+        from pdf_stream import stream_pdf
+
+        with open(output, "wb") as f:
+            pages, _, total = stream_pdf(quotation, f)
+        print(f"✅ {output}: {pages} pages, Total Project Cost ₹{total:.2f}")
+    else:
+        with open(output, "wb") as f:
+            f.write(render_pdf(quotation))
+        print(f"✅ {output}: Total Project Cost ₹{quotation.total_cost:.2f}")
+
+    if args.save:
+        print("✅ Quotation stored successfully with ID:", get_repository().save(quotation.to_document()))
+    return 0
+
+
+def stream_export(path, output):
+    """ Stream a CSV bill of quantities to a PDF without loading its line items """
+    from pdf_stream import stream_pdf
+
+    partial = f"{output}.part"  # Renamed into place once complete, so a bad row never leaves half a PDF
+    try:
+        quotation = load_bill_header(path)
+        validate_customer_info(quotation.customer_name, quotation.building_site, quotation.validity_date)
+        with open(partial, "wb") as f:
+            pages, _, total = stream_pdf(quotation, f, iter_line_items(path, "floor"), iter_line_items(path, "extra_work"))
+        os.replace(partial, output)
+    except (OSError, ValueError) as e:
+        if os.path.exists(partial):
+            os.remove(partial)
+        print(f"❌ {path}: {e}", file=sys.stderr)
+        return 1
+    print(f"✅ {output}: {pages} pages, Total Project Cost ₹{total:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
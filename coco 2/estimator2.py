@@ -1,244 +1,304 @@
+import time
+STARTED = time.perf_counter()  # Start-up is measured from here to the first idle main loop
+
+import importlib
+import queue
 import tkinter as tk
 from tkinter import messagebox, filedialog
 from tkinter import ttk
-from fpdf import FPDF
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.mime.base import MIMEBase
-from email import encoders
-from tkcalendar import Calendar, DateEntry
-from datetime import date, datetime
-import unicodedata
-import re
-from pymongo import MongoClient
-
-# MongoDB Connection
-try:
-    client = MongoClient("mongodb://localhost:27017/")
-    db = client["constructionestimator"]
-    collection = db["quotations"]
-    print("✅ Connected to MongoDB successfully")
-except Exception as e:
-    print(f"❌ Failed to connect to MongoDB: {e}")
+import estimator_core
+from mailer import MailQueue, build_message
+from estimator_core import Quotation, ValidationError, parse_extra_work, parse_floor, quotation_from_dict, render_pdf
+from storage import get_repository
+from revisions import format_diff, revision_history
+from catalogue import get_catalogue
+from metrics import profiling, render as render_metrics, set_profiling, timed, write_metrics
+from tasks import TaskExecutor
+
+# Quotation currently shown in the text display
+quotation = Quotation()
+# Stored quotation being edited; saving records a new revision of it instead of a new quotation
+edit_state = {"quote_id": None, "revision": None}
+
+def read_customer_info():
+    """ Copy the customer entry fields onto the current quotation """
+    quotation.email = email_entry.get().strip().lower()
+    quotation.customer_name = entry_customer_name.get().strip()
+    quotation.building_site = entry_building_site.get().strip()
+    quotation.validity_date = entry_validity_date.get().strip()
+
+def editor_state():
+    """ Everything the editor holds: the quotation and any line item typed but not yet added """
+    read_customer_info()
+    pending = (entry_floor_name, entry_area_sqft, entry_cost_per_sqft, entry_extra_works, entry_quantity, entry_cost_per_quantity)
+    return quotation.to_document(), tuple(entry.get() for entry in pending)
 
 def save_quotation():
-    try:
-        email = email_entry.get().strip().lower()
-        customer_name = entry_customer_name.get().strip()
-        building_site = entry_building_site.get().strip()
-        validity_date = entry_validity_date.get().strip()
+    read_customer_info()
 
-        if not email or not customer_name or not building_site or not validity_date:
-            messagebox.showerror("Input Error", "All fields are required!")
-            return
+    if not quotation.email or not quotation.customer_name or not quotation.building_site or not quotation.validity_date:
+        messagebox.showerror("Input Error", "All fields are required!")
+        return
 
-        # Extract Floors and Extra Works from Text Display
-        floors = []
-        extra_works = []
-        content = text_display.get("1.0", tk.END).strip()
-
-        for line in content.splitlines():
-            if "Floor Name:" in line:
-                try:
-                    parts = re.search(r"Floor Name: (.*?), (.*?) sqft X ₹(.*?) = ₹(.*?)$", line)
-                    if parts:
-                        floor_name = parts.group(1).strip()
-                        area_sqft = float(parts.group(2).strip())
-                        cost_per_sqft = float(parts.group(3).strip())
-                        total_cost = float(parts.group(4).replace("₹", "").replace(",", "").strip())
-
-                        floors.append({
-                            "name": floor_name,
-                            "area_sqft": area_sqft,
-                            "cost_per_sqft": cost_per_sqft,
-                            "total_cost": total_cost
-                        })
-                except Exception as e:
-                    print(f"❌ Error processing floor data: {line} - {e}")
-
-            if "Extra Works:" in line:
-                try:
-                    parts = re.search(r"Extra Works: (.*?), Qty: (.*?) @ ₹(.*?) = ₹(.*?)$", line)
-                    if parts:
-                        work_name = parts.group(1).strip()
-                        quantity = int(parts.group(2).strip())
-                        cost_per_unit = float(parts.group(3).replace("₹", "").strip())
-                        total_cost = float(parts.group(4).replace("₹", "").replace(",", "").strip())
-
-                        extra_works.append({
-                            "name": work_name,
-                            "quantity": quantity,
-                            "cost_per_unit": cost_per_unit,
-                            "total_cost": total_cost
-                        })
-                except Exception as e:
-                    print(f"❌ Error processing extra works data: {line} - {e}")
-
-        total_project_cost = sum(floor["total_cost"] for floor in floors) + sum(work["total_cost"] for work in extra_works)
-
-        quotation_data = {
-            "email": email,
-            "customer_name": customer_name,
-            "building_site": building_site,
-            "validity_date": validity_date,
-            "floors": floors,
-            "extra_works": extra_works,
-            "total_project_cost": total_project_cost
-        }
-
-        result = collection.insert_one(quotation_data)
-        
-        if result.inserted_id:
-            messagebox.showinfo("Success", "Quotation saved successfully!")
-            print("✅ Quotation stored successfully with ID:", result.inserted_id)
-        else:
-            print("❌ Data insertion failed!")
-    
-    except Exception as e:
-        print(f"❌ Error saving quotation: {e}")
-        messagebox.showerror("Database Error", f"An error occurred while saving the quotation: {e}")
+    document = quotation.to_document()  # Snapshot; editing can go on while it is written
+    quote_id, loaded_revision = edit_state["quote_id"], edit_state["revision"]
 
-def fetch_quotation():
-    try:
-        email = fetch_email_entry.get().strip().lower()
+    def work(task):
+        from search import update_search_index
 
-        if not email:
-            messagebox.showerror("Input Error", "Please enter an email address.")
-            return
+        task.progress(0.5, "writing to the database")
+        if quote_id:
+            result = quote_id, get_repository().save_revision(quote_id, document), loaded_revision
+        else:
+            result = get_repository().save(document), None, None
+        update_search_index(result[0], document)
+        return result
+
+    task_executor.submit("save", work, on_done=on_quotation_saved, on_error=on_save_error, label="Saving quotation")
+
+def on_quotation_saved(result):
+    inserted_id, revision, loaded_revision = result
+    if revision and loaded_revision is not None and revision <= loaded_revision:
+        # save_revision returns the current revision when the content is unchanged
+        messagebox.showinfo("No changes", f"Quotation {inserted_id} is unchanged; it stays at revision {revision}.")
+        print(f"✅ Quotation {inserted_id} unchanged at revision {revision}")
+    elif revision:
+        if edit_state["quote_id"] == inserted_id:
+            edit_state["revision"] = revision
+        messagebox.showinfo("Success", f"Saved revision {revision} of quotation {inserted_id}.")
+        print(f"✅ Quotation {inserted_id} saved as revision {revision}")
+    elif inserted_id:
+        messagebox.showinfo("Success", "Quotation saved successfully!")
+        print("✅ Quotation stored successfully with ID:", inserted_id)
+    else:
+        print("❌ Data insertion failed!")
 
-        print(f"🔍 Searching for all quotations with email: {email}")
+def on_save_error(e):
+    print(f"❌ Error saving quotation: {e}")
+    messagebox.showerror("Database Error", f"An error occurred while saving the quotation: {e}")
 
-        results = collection.find({"email": email})  # Fetch all quotations with the given email
+# **Previous Quotations**
+# Lookup state; `generation` changes with every new search so late results of an older one are dropped
+fetch_state = {"email": None, "next": None, "generation": 0}
+SEARCH_RESULTS = 50
 
-        text_display.delete("1.0", "end")  # Clear display before showing results
-        found = False
+def show_fetch_error(generation, e):
+    if generation != fetch_state["generation"]:
+        return
+    print(f"❌ Error fetching quotations: {e}")
+    messagebox.showerror("Database Error", f"An error occurred while fetching the quotations: {e}")
+
+def show_quotation_page(generation, page):
+    """ Append one page of summary rows; each gets a placeholder child so its line items load on expand """
+    if generation != fetch_state["generation"]:
+        return  # A newer search has replaced this one
+    summaries, fetch_state["next"] = page
+
+    if not summaries and not quotation_tree.get_children():
+        print("❌ No quotations found.")
+        messagebox.showwarning("Not Found", "No quotations found for this email." if fetch_state["email"] else "No quotations match this search.")
+
+    for result in summaries:
+        quote_id = str(result["_id"])
+        details = f"{result.get('customer_name', 'N/A')} · {result.get('building_site', 'N/A')} · valid till {result.get('validity_date', 'N/A')}"
+        quotation_tree.insert("", "end", iid=quote_id, text=f"🔹 {quote_id}", values=(details, f"₹{result.get('total_project_cost', 0)}"))
+        quotation_tree.insert(quote_id, "end", text="Loading...", tags=("placeholder",))
+
+    load_more_button.config(state="normal" if fetch_state["next"] else "disabled")
+
+def show_quotation_details(generation, quote_id, result):
+    """ Replace the placeholder row of a quotation with its floors and extra works """
+    if generation != fetch_state["generation"] or not quotation_tree.exists(quote_id):
+        return
+    quotation_tree.delete(*quotation_tree.get_children(quote_id))
+    if result is None:
+        quotation_tree.insert(quote_id, "end", text="This quotation no longer exists.")
+        return
 
-        for result in results:
-            found = True
-            text_display.insert("end", f"🔹 Quotation ID: {result.get('_id', 'N/A')}\n")
-            text_display.insert("end", f"Customer Name: {result.get('customer_name', 'N/A')}\n")
-            text_display.insert("end", f"Building Site: {result.get('building_site', 'N/A')}\n")
-            text_display.insert("end", f"Validity Date: {result.get('validity_date', 'N/A')}\n\n")
+    for floor in result.get("floors", []):
+        quotation_tree.insert(quote_id, "end", text=f"🏢 {floor['name']}",
+                              values=(f"{floor['area_sqft']} sqft x ₹{floor['cost_per_sqft']}", f"₹{floor['total_cost']}"))
+    for work in result.get("extra_works", []):
+        quotation_tree.insert(quote_id, "end", text=f"🔧 {work['name']}",
+                              values=(f"Qty {work['quantity']} @ ₹{work['cost_per_unit']}", f"₹{work['total_cost']}"))
+    if not quotation_tree.get_children(quote_id):
+        quotation_tree.insert(quote_id, "end", text="No line items.")
+
+def show_details_error(generation, quote_id, e):
+    if generation != fetch_state["generation"] or not quotation_tree.exists(quote_id):
+        return
+    print(f"❌ Error fetching quotation {quote_id}: {e}")
+    placeholder = quotation_tree.get_children(quote_id)[0]
+    quotation_tree.item(placeholder, text=f"❌ Could not load the line items: {e}", tags=("placeholder",))  # Retried on the next expand
+
+def on_quotation_open(event):
+    """ Load the line items of an expanded quotation the first time it is opened """
+    quote_id = quotation_tree.focus()
+    children = quotation_tree.get_children(quote_id)
+    if quotation_tree.parent(quote_id) or not children or "placeholder" not in quotation_tree.item(children[0], "tags"):
+        return
+    quotation_tree.item(children[0], text="Loading...", tags=("loading",))
 
-            # Display Floors
-            text_display.insert("end", "🏢 Floors:\n")
-            for floor in result.get("floors", []):
-                text_display.insert("end", f" - {floor['name']}: {floor['area_sqft']} sqft x ₹{floor['cost_per_sqft']} = ₹{floor['total_cost']}\n")
+    generation = fetch_state["generation"]
+    task_executor.submit(("details", quote_id), lambda task: get_repository().get(quote_id),
+                         on_done=lambda result: show_quotation_details(generation, quote_id, result),
+                         on_error=lambda e: show_details_error(generation, quote_id, e), debounce=0)
 
-            # Display Extra Works
-            text_display.insert("end", "\n🔧 Extra Works:\n")
-            for work in result.get("extra_works", []):
-                text_display.insert("end", f" - {work['name']}: Qty {work['quantity']} @ ₹{work['cost_per_unit']} = ₹{work['total_cost']}\n")
+def on_quotation_scroll(first, last):
+    """ Keep the scrollbar in sync and fetch the next page once the last rows come into view """
+    quotation_scrollbar.set(first, last)
+    if float(last) >= 0.95:
+        fetch_next_page()
 
-            # Display Total Cost
-            text_display.insert("end", f"\n💰 Total Project Cost: ₹{result.get('total_project_cost', 0)}\n")
-            text_display.insert("end", "------------------------------------------------------------\n\n")
+def fetch_quotation():
+    email = fetch_email_entry.get().strip().lower()
 
-        if not found:
-            print("❌ No quotations found.")
-            messagebox.showwarning("Not Found", "No quotations found for this email.")
+    if not email:
+        messagebox.showerror("Input Error", "Please enter an email address.")
+        return
 
-    except Exception as e:
-        print(f"❌ Error fetching quotations: {e}")
-        messagebox.showerror("Database Error", f"An error occurred while fetching the quotations: {e}")
+    print(f"🔍 Searching for quotations with email: {email}")
+
+    fetch_state.update(email=email, next=None, generation=fetch_state["generation"] + 1)
+    quotation_tree.delete(*quotation_tree.get_children())  # Clear the previous results
+    load_more_button.config(state="disabled")
+    display_tabs.select(history_tab)
+
+    # A new search replaces one that is still running
+    generation = fetch_state["generation"]
+    task_executor.submit("fetch", lambda task: get_repository().find_page(email),  # First page, newest first
+                         on_done=lambda page: show_quotation_page(generation, page),
+                         on_error=lambda e: show_fetch_error(generation, e),
+                         label=f"Searching quotations for {email}", replace=True)
+
+def search_previous_quotations():
+    """ Ranked, typo-tolerant search by customer name, building site or line item """
+    query = search_entry.get().strip()
+    if not query:
+        messagebox.showerror("Input Error", "Please enter a name, site or line item to search for.")
+        return
 
+    print(f"🔍 Searching quotations for: {query}")
 
-def add_floor_info():
-    try:
-        floor_name = entry_floor_name.get().strip()
-        area_sqft = entry_area_sqft.get().strip()
-        cost_per_sqft = entry_cost_per_sqft.get().strip()
+    fetch_state.update(email=None, next=None, generation=fetch_state["generation"] + 1)
+    quotation_tree.delete(*quotation_tree.get_children())
+    load_more_button.config(state="disabled")
+    display_tabs.select(history_tab)
 
-        # Validate inputs
-        if not floor_name:
-            messagebox.showerror("Input Error", "Floor name cannot be empty.")
-            return
-        if not area_sqft or not cost_per_sqft:
-            messagebox.showerror("Input Error", "Enter valid numerical values.")
-            return
+    def work(task):
+        from search import get_search_index, search_quotations
 
-        # Convert to float
-        area_sqft = float(area_sqft)
-        cost_per_sqft = float(cost_per_sqft)
+        task.progress(0.2, "building the search index")  # Only slow the first time
+        get_search_index()
+        task.check()
+        task.progress(0.8, "ranking")
+        return search_quotations(query, limit=SEARCH_RESULTS), None
 
-        # Calculate cost
-        area_cost = area_sqft * cost_per_sqft
-        result = f"Floor Name: {floor_name}, {area_sqft} sqft X ₹{cost_per_sqft} = ₹{area_cost:.2f}\n{'-'*40}\n"
-        
-        # Insert into text display
-        text_display.insert(tk.END, result)
-        
-        # Update total cost
-        update_total()
+    generation = fetch_state["generation"]
+    task_executor.submit("fetch", work, on_done=lambda page: show_quotation_page(generation, page),
+                         on_error=lambda e: show_fetch_error(generation, e),
+                         label=f"Searching quotations for {query}", replace=True)
 
-        # Clear inputs
-        entry_floor_name.delete(0, tk.END)
-        entry_area_sqft.delete(0, tk.END)
-        entry_cost_per_sqft.delete(0, tk.END)
+def fetch_next_page():
+    if not fetch_state["next"]:
+        return
 
-    except ValueError:
-        messagebox.showerror("Input Error", "Please enter valid numerical values.")
+    # Ignored while the previous page is still loading
+    email, after, generation = fetch_state["email"], fetch_state["next"], fetch_state["generation"]
+    task_executor.submit("fetch", lambda task: get_repository().find_page(email, after=after),
+                         on_done=lambda page: show_quotation_page(generation, page),
+                         on_error=lambda e: show_fetch_error(generation, e), debounce=0)
 
-def add_extra_work_info():
+# **Rate Catalogue Autocomplete**
+def refresh_catalogue(task=None):
+    """ Re-check the newest rate catalogue; waits on the database, so it runs on a worker thread """
     try:
-        extra_works = entry_extra_works.get().strip()
-        quantity = entry_quantity.get().strip()
-        cost_per_quantity = entry_cost_per_quantity.get().strip()
-
-        # Validate inputs
-        if not extra_works:
-            messagebox.showerror("Input Error", "Extra works name cannot be empty.")
-            return
-        if not quantity or not cost_per_quantity:
-            messagebox.showerror("Input Error", "Enter valid numerical values.")
-            return
+        return get_catalogue().current()
+    except Exception as e:
+        print(f"❌ Rate catalogue unavailable: {e}")
+        return None
+
+def current_catalogue():
+    """ Rate catalogue for the key handlers: the cached snapshot (or None), re-checked in the background when due """
+    catalogue = get_catalogue()
+    if catalogue.stale():
+        task_executor.submit("catalogue", refresh_catalogue, debounce=0)
+    return catalogue.cached()
+
+def suggest_catalogue_items(combobox, category):
+    snapshot = current_catalogue()
+    if snapshot is not None:
+        combobox["values"] = [entry["name"] for entry in snapshot.search(combobox.get(), category)]
+
+def fill_catalogue_rate(combobox, category, rate_entry):
+    snapshot = current_catalogue()
+    entry = snapshot.get(combobox.get(), category) if snapshot is not None else None
+    if entry is not None:
+        rate_entry.delete(0, tk.END)
+        rate_entry.insert(0, str(entry["rate"]))
+        quotation.catalogue_version = snapshot.version
+
+def floor_line(floor):
+    return f"Floor Name: {floor.name}, {floor.area_sqft} sqft X ₹{floor.cost_per_sqft} = ₹{floor.total_cost:.2f}\n{'-'*40}\n"
+
+def extra_work_line(work):
+    return f"Extra Works: {work.name}, Qty: {work.quantity} @ ₹{work.cost_per_unit} = ₹{work.total_cost:.2f}\n{'-'*40}\n"
 
-        # Convert to appropriate types
-        quantity = int(quantity)
-        cost_per_quantity = float(cost_per_quantity)
+def add_floor_info():
+    try:
+        floor_name, area_sqft, cost_per_sqft = parse_floor(entry_floor_name.get(), entry_area_sqft.get().strip(), entry_cost_per_sqft.get().strip())
+    except ValidationError as e:
+        messagebox.showerror("Input Error", str(e))
+        return
 
-        # Calculate extra cost
-        extra_cost = quantity * cost_per_quantity
-        result = f"Extra Works: {extra_works}, Qty: {quantity} @ ₹{cost_per_quantity} = ₹{extra_cost:.2f}\n{'-'*40}\n"
+    # Calculate cost
+    floor = quotation.add_floor(floor_name, area_sqft, cost_per_sqft)
 
-        # Insert into text display
-        text_display.insert(tk.END, result)
+    # Insert into text display
+    text_display.insert(tk.END, floor_line(floor))
+    display_tabs.select(current_tab)
+    
+    # Update total cost
+    update_total()
 
-        # Update total cost
-        update_total()
+    # Clear inputs
+    entry_floor_name.delete(0, tk.END)
+    entry_area_sqft.delete(0, tk.END)
+    entry_cost_per_sqft.delete(0, tk.END)
 
-        # Clear inputs
-        entry_extra_works.delete(0, tk.END)
-        entry_quantity.delete(0, tk.END)
-        entry_cost_per_quantity.delete(0, tk.END)
+def add_extra_work_info():
+    try:
+        extra_works, quantity, cost_per_quantity = parse_extra_work(entry_extra_works.get(), entry_quantity.get().strip(), entry_cost_per_quantity.get().strip())
+    except ValidationError as e:
+        messagebox.showerror("Input Error", str(e))
+        return
 
-    except ValueError:
-        messagebox.showerror("Input Error", "Please enter valid numerical values.")
+    # Calculate extra cost
+    work = quotation.add_extra_work(extra_works, quantity, cost_per_quantity)
 
-def validate_customer_info():
-    customer_name = entry_customer_name.get().strip()
-    building_site = entry_building_site.get().strip()
-    validity_date = entry_validity_date.get().strip()
+    # Insert into text display
+    text_display.insert(tk.END, extra_work_line(work))
+    display_tabs.select(current_tab)
 
-    if not customer_name:
-        messagebox.showerror("Input Error", "Customer name cannot be empty.")
-        return False
+    # Update total cost
+    update_total()
 
-    if not re.match("^[A-Za-z ]*$", customer_name):
-        messagebox.showerror("Input Error", "Customer name should only contain alphabets.")
-        entry_customer_name.delete(0, tk.END)
-        return False
+    # Clear inputs
+    entry_extra_works.delete(0, tk.END)
+    entry_quantity.delete(0, tk.END)
+    entry_cost_per_quantity.delete(0, tk.END)
 
-    if not building_site:
-        messagebox.showerror("Input Error", "Building site cannot be empty.")
-        return False
+def validate_customer_info():
+    read_customer_info()
 
     try:
-        datetime.strptime(validity_date, "%Y-%m-%d")
-    except ValueError:
-        messagebox.showerror("Input Error", "Validity date must be in YYYY-MM-DD format.")
-        entry_validity_date.delete(0, tk.END)
+        estimator_core.validate_customer_info(quotation.customer_name, quotation.building_site, quotation.validity_date)
+    except ValidationError as e:
+        messagebox.showerror("Input Error", str(e))
+        if e.field == "customer_name":
+            entry_customer_name.delete(0, tk.END)
+        elif e.field == "validity_date":
+            entry_validity_date.delete(0, tk.END)
         return False
 
     return True
@@ -267,350 +327,313 @@ def clear_all():
 
     # Clear text display
     text_display.delete("1.0", tk.END)
+    quotation.clear()
     total_label.config(text="Total Project Cost: ₹0.00")
+    edit_state.update(quote_id=None, revision=None)
 
 def update_total():
-    content = text_display.get("1.0", tk.END).strip()
-    total_cost = 0
-
-    for line in content.splitlines():
-        if "=" in line:
-            try:
-                cost = float(line.split("=")[-1].strip().replace("₹", "").replace(",", ""))
-                total_cost += cost
-            except ValueError:
-                continue
-
-    total_label.config(text=f"Total Project Cost: ₹{total_cost:.2f}")
+    with timed("update_total"):
+        total_label.config(text=f"Total Project Cost: ₹{quotation.total_cost:.2f}")
 
 def export_to_pdf():
     if not validate_customer_info():
         return
 
-    content = text_display.get("1.0", tk.END).strip()
-    if not content:
+    if quotation.is_empty():
         messagebox.showwarning("Export Error", "No data to export!")
         return
 
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font("Arial", size=12)
-
-    def safe_text(text):
-        """ Normalize text to remove unsupported characters for PDF compatibility """
-        return unicodedata.normalize('NFKD', text).encode('latin-1', 'ignore').decode('latin-1')
-
-    # 🏠 **Header Section**
-    pdf.set_font("Arial", style="B", size=16)
-    pdf.cell(200, 10, txt=safe_text("Niranjana Construction"), ln=True, align="C")
-    
-    pdf.set_font("Arial", size=12)
-    pdf.cell(200, 10, txt=safe_text(f"Date: {date.today().strftime('%Y-%m-%d')}"), ln=True, align="C")
-    pdf.cell(200, 10, txt=safe_text("Email: viswa26073@gmail.com"), ln=True, align="C")
-    pdf.cell(200, 10, txt=safe_text("Phone: 9150447236"), ln=True, align="C")
-    pdf.ln(10)  # Add blank line
-
-    # 🧑 **Customer Information**
-    pdf.set_font("Arial", style="B", size=12)
-    pdf.cell(200, 10, txt=safe_text("Customer Information"), ln=True)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(60, 10, safe_text("Customer Name:"), border=0)
-    pdf.cell(140, 10, safe_text(entry_customer_name.get()), border=0)
-    pdf.ln()
-    pdf.cell(60, 10, safe_text("Building Site:"), border=0)
-    pdf.cell(140, 10, safe_text(entry_building_site.get()), border=0)
-    pdf.ln()
-    pdf.cell(60, 10, safe_text("Validity Date:"), border=0)
-    pdf.cell(140, 10, safe_text(entry_validity_date.get()), border=0)
-    pdf.ln(10)  # Add blank line
-
-    # 🏢 **Floor Details Table**
-    pdf.set_font("Arial", style="B", size=12)
-    pdf.cell(200, 10, txt=safe_text("Floor Details"), ln=True)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(60, 10, safe_text("Floor Name"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Area (sqft)"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Cost/Unit (INR)"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Total Cost (INR)"), border=1, align="C")
-    pdf.ln()
-
-    # **Initialize total project cost**
-    total_cost = 0
-
-    # **Extract & Add Floor Data**
-    for line in content.splitlines():
-        if "Floor Name:" in line:
-            try:
-                # Extract values correctly
-                parts = re.search(r"Floor Name: (.*?), (.*?) sqft X ₹(.*?) = ₹(.*?)$", line)
-                if parts:
-                    floor_name = parts.group(1).strip()
-                    area_sqft = parts.group(2).strip()
-                    cost_per_sqft = parts.group(3).strip()
-                    floor_total_cost = float(parts.group(4).replace(",", ""))  # Remove commas for float conversion
-                    
-                    total_cost += floor_total_cost  # Add to total project cost
-
-                    pdf.cell(60, 10, safe_text(floor_name), border=1)
-                    pdf.cell(40, 10, safe_text(area_sqft), border=1)
-                    pdf.cell(40, 10, safe_text(cost_per_sqft), border=1)
-                    pdf.cell(40, 10, safe_text(f"₹{floor_total_cost:.2f}"), border=1)
-                    pdf.ln()
-
-            except Exception as e:
-                print(f"Error processing floor data: {line} - {e}")
-
-    # 🔧 **Extra Works Table**
-    pdf.set_font("Arial", style="B", size=12)
-    pdf.cell(200, 10, txt=safe_text("Extra Works Details"), ln=True)
-    pdf.set_font("Arial", size=10)
-    pdf.cell(60, 10, safe_text("Extra Work"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Quantity"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Cost/Unit (INR)"), border=1, align="C")
-    pdf.cell(40, 10, safe_text("Total Cost (INR)"), border=1, align="C")
-    pdf.ln()
-
-    # **Extract & Add Extra Work Data**
-    for line in content.splitlines():
-        if "Extra Works:" in line:
-            try:
-                # Extract values correctly
-                parts = re.search(r"Extra Works: (.*?), Qty: (.*?) @ ₹(.*?) = ₹(.*?)$", line)
-                if parts:
-                    work_name = parts.group(1).strip()
-                    quantity = parts.group(2).strip()
-                    cost_per_unit = parts.group(3).strip()
-                    extra_total_cost = float(parts.group(4).replace(",", ""))  # Remove commas
-                    
-                    total_cost += extra_total_cost  # Add to total project cost
-
-                    pdf.cell(60, 10, safe_text(work_name), border=1)
-                    pdf.cell(40, 10, safe_text(quantity), border=1)
-                    pdf.cell(40, 10, safe_text(cost_per_unit), border=1)
-                    pdf.cell(40, 10, safe_text(f"₹{extra_total_cost:.2f}"), border=1)
-                    pdf.ln()
-
-            except Exception as e:
-                print(f"Error processing extra works data: {line} - {e}")
-
-    # 📊 **Total Project Cost**
-    pdf.set_font("Arial", style="B", size=12)
-    pdf.cell(200, 10, txt=safe_text(f"Total Project Cost: ₹{total_cost:.2f}"), ln=True, align="C")
-
-    # 📄 **Add Note**
-    note = ("Note:\n"
-            "1. If the Construction materials rate increases more than 5%, client should bear the extra costs.\n"
-            "2. If any work to be done which is not mentioned in the quotation, client should bear the cost for that.\n"
-            "3. Client should bear the Cost for EB main board works & all the government formalities.\n"
-            "4. EB bill is to be paid by the client during the period of construction.\n"
-            "5. Construction water is to be provided by the client if bore water is not available.")
-    
-    pdf.ln(10)
-    pdf.set_font("Arial", size=10)
-    pdf.multi_cell(0, 10, txt=safe_text(note))
+    if task_executor.running("export"):
+        return
 
     # 📝 **Save PDF**
     pdf_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")])
-    if pdf_path:
-        pdf.output(pdf_path)
-        messagebox.showinfo("Export Success", f"The quotation has been exported to {pdf_path}.")
-        clear_all()  # Clear all fields after exporting
+    if not pdf_path:
+        return
+    snapshot = quotation_from_dict(quotation.to_document())
+    exported = editor_state()
+
+    def work(task):
+        task.progress(0.2, "rendering")
+        pdf_data = render_pdf(snapshot)
+        task.check()
+        task.progress(0.8, "writing the file")
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_data)
+        return pdf_path
+
+    task_executor.submit("export", work, on_done=lambda path: on_pdf_exported(path, exported), on_error=on_export_error,
+                         label="Exporting PDF")
+
+def selected_quote_id():
+    """ ID of the quotation selected under Previous Quotations (also when one of its line items is selected), or "" """
+    selection = quotation_tree.selection()
+    quote_id = selection[0] if selection else ""
+    while quote_id and quotation_tree.parent(quote_id):
+        quote_id = quotation_tree.parent(quote_id)
+    return quote_id
+
+def export_selected_quotation():
+    """ Save the PDF of the stored quotation selected under Previous Quotations (a cache read if it was rendered before) """
+    quote_id = selected_quote_id()
+    if not quote_id:
+        messagebox.showwarning("Export Error", "Select a quotation first.")
+        return
+
+    pdf_path = filedialog.asksaveasfilename(defaultextension=".pdf", filetypes=[("PDF files", "*.pdf")], initialfile=f"quotation_{quote_id}.pdf")
+    if not pdf_path:
+        return
+
+    def work(task):
+        task.progress(0.2, "loading the quotation")
+        document = get_repository().get(quote_id)
+        if document is None:
+            raise LookupError(f"Quotation {quote_id} no longer exists.")
+        task.check()
+        task.progress(0.5, "rendering")
+        pdf_data = render_pdf(quotation_from_dict(document))
+        task.check()
+        with open(pdf_path, "wb") as f:
+            f.write(pdf_data)
+        return pdf_path
+
+    task_executor.submit(("export", quote_id), work, on_error=on_export_error, label=f"Exporting quotation {quote_id}",
+                         on_done=lambda path: messagebox.showinfo("Export Success", f"The quotation has been exported to {path}."))
+
+def edit_selected_quotation():
+    """ Load the selected stored quotation into the editor; saving it then records a new revision """
+    quote_id = selected_quote_id()
+    if not quote_id:
+        messagebox.showwarning("Edit Error", "Select a quotation first.")
+        return
+
+    def work(task):
+        task.progress(0.5, "loading the quotation")
+        document = get_repository().get(quote_id)
+        if document is None:
+            raise LookupError(f"Quotation {quote_id} no longer exists.")
+        return document
+
+    task_executor.submit(("edit", quote_id), work, on_done=show_stored_quotation, on_error=on_edit_error,
+                         label=f"Opening quotation {quote_id}")
+
+def show_stored_quotation(document):
+    stored = quotation_from_dict(document)
+    clear_all()
+    for entry, value in ((email_entry, stored.email), (entry_customer_name, stored.customer_name),
+                         (entry_building_site, stored.building_site), (entry_validity_date, stored.validity_date)):
+        entry.insert(0, value)
+    read_customer_info()
+    quotation.catalogue_version = stored.catalogue_version
+
+    quote_id, revision = str(document["_id"]), document.get("revision", 1)
+    text_display.insert(tk.END, f"Editing quotation {quote_id} (revision {revision})\n{'='*40}\n")
+    for floor in stored.floors:
+        quotation.add_floor(floor.name, floor.area_sqft, floor.cost_per_sqft)
+        text_display.insert(tk.END, floor_line(floor))
+    for work in stored.extra_works:
+        quotation.add_extra_work(work.name, work.quantity, work.cost_per_unit)
+        text_display.insert(tk.END, extra_work_line(work))
+    update_total()
+    edit_state.update(quote_id=quote_id, revision=revision)
+    display_tabs.select(current_tab)
+
+def on_edit_error(e):
+    print(f"❌ Error opening quotation: {e}")
+    messagebox.showerror("Database Error", f"An error occurred while opening the quotation: {e}")
+
+def show_revision_history():
+    """ List every revision of the selected quotation with what changed in it, newest first """
+    quote_id = selected_quote_id()
+    if not quote_id:
+        messagebox.showwarning("Revision History", "Select a quotation first.")
+        return
+
+    def work(task):
+        task.progress(0.5, "rebuilding revisions")
+        return revision_history(get_repository(), quote_id)
+
+    task_executor.submit(("history", quote_id), work, on_error=on_edit_error, label=f"Loading history of {quote_id}",
+                         on_done=lambda history: open_revision_window(quote_id, history))
+
+def open_revision_window(quote_id, history):
+    window = tk.Toplevel(root)
+    window.title(f"Revision History: {quote_id}")
+    text = tk.Text(window, font=FONT, wrap="word", width=90, height=25)
+    scrollbar = ttk.Scrollbar(window, orient="vertical", command=text.yview)
+    text.configure(yscrollcommand=scrollbar.set)
+    scrollbar.pack(side="right", fill="y")
+    text.pack(side="left", fill="both", expand=True)
+    for revision, saved_at, changes in reversed(history):
+        text.insert(tk.END, f"Revision {revision} ({saved_at})\n")
+        for line in (format_diff(changes) if changes is not None else ["Created."]):
+            text.insert(tk.END, f"   {line}\n")
+        text.insert(tk.END, "\n")
+    text.configure(state="disabled")
+
+def on_pdf_exported(pdf_path, exported):
+    messagebox.showinfo("Export Success", f"The quotation has been exported to {pdf_path}.")
+    # Clear all fields after exporting, unless they were edited while the export ran
+    if editor_state() == exported:
+        clear_all()
+
+def on_export_error(e):
+    print(f"❌ Error exporting quotation: {e}")
+    messagebox.showerror("Export Error", f"An error occurred while exporting the quotation: {e}")
  
-def is_valid_email(email):
-    """ Check if email format is valid """
-    pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
-    return re.match(pattern, email) 
-      
 def send_email():
     if not validate_customer_info():
         return
 
-    content = text_display.get("1.0", tk.END).strip()
-    if content:
+    if not quotation.is_empty():
         email_address = email_entry.get()
         if not email_address:
             messagebox.showerror("Input Error", "Please enter an email address.")
             return
 
-        # Save PDF first
-        pdf = FPDF()
-        pdf.add_page()
-        pdf.set_font("Arial", size=12)
-
-        def safe_text(text):
-            return unicodedata.normalize('NFKD', text).encode('latin-1', 'ignore').decode('latin-1')
-
-        # Add header
-        pdf.set_font("Arial", style="B", size=14)
-        pdf.cell(200, 10, txt=safe_text("Niranjana Construction"), ln=True, align="C")
-        pdf.set_font("Arial", size=12)
-        pdf.cell(200, 10, txt=safe_text(f"Date: {date.today().strftime('%Y-%m-%d')}"), ln=True, align="C")
-        pdf.cell(200, 10, txt=safe_text("email: viswa26073@gmail.com"), ln=True, align="C")
-        pdf.cell(200, 10, txt=safe_text("Phone: 9150447236"), ln=True, align="C")
-        pdf.ln(10)  # Add a blank line
-
-        # Add customer info
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(200, 10, txt=safe_text("Customer Information"), ln=True)
-        pdf.set_font("Arial", size=10)
-        pdf.cell(60, 10, safe_text("Customer Name:"), border=0)
-        pdf.cell(140, 10, safe_text(entry_customer_name.get()), border=0)
-        pdf.ln()
-        pdf.cell(60, 10, safe_text("Building Site:"), border=0)
-        pdf.cell(140, 10, safe_text(entry_building_site.get()), border=0)
-        pdf.ln()
-        pdf.cell(60, 10, safe_text("Validity Date:"), border=0)
-        pdf.cell(140, 10, safe_text(entry_validity_date.get()), border=0)
-        pdf.ln(10)  # Add a blank line
-
-        # Add floor details table
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(200, 10, txt=safe_text("Floor Details"), ln=True)
-        pdf.set_font("Arial", size=10)
-        pdf.cell(60, 10, safe_text("Floor Name"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Area (sqft)"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Cost/Unit (INR)"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Total Cost (INR)"), border=1, align="C")
-        pdf.ln()
-
-        # Initialize total project cost
-        total_cost = 0
-
-        # Process floor data
-        for line in content.splitlines():
-            if "Floor Name:" in line:
-                try:
-                    parts = re.search(r"Floor Name: (.*?), (.*?) sqft X ₹(.*?) = ₹(.*?)$", line)
-                    if parts:
-                        floor_name = parts.group(1).strip()
-                        area_sqft = parts.group(2).strip()
-                        cost_per_sqft = parts.group(3).strip()
-                        floor_total_cost = float(parts.group(4).replace(",", ""))  # Remove commas for float conversion
-
-                        total_cost += floor_total_cost  # Add to total project cost
-
-                        pdf.cell(60, 10, safe_text(floor_name), border=1)
-                        pdf.cell(40, 10, safe_text(area_sqft), border=1)
-                        pdf.cell(40, 10, safe_text(cost_per_sqft), border=1)
-                        pdf.cell(40, 10, safe_text(f"₹{floor_total_cost:.2f}"), border=1)
-                        pdf.ln()
-                except IndexError:
-                    continue
-
-        # Add extra works table
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(200, 10, txt=safe_text("Extra Works Details"), ln=True)
-        pdf.set_font("Arial", size=10)
-        pdf.cell(60, 10, safe_text("Extra Work"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Quantity"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Cost/Unit (INR)"), border=1, align="C")
-        pdf.cell(40, 10, safe_text("Total Cost (INR)"), border=1, align="C")
-        pdf.ln()
-
-        # Process extra works data
-        for line in content.splitlines():
-            if "Extra Works:" in line:
-                try:
-                    parts = re.search(r"Extra Works: (.*?), Qty: (.*?) @ ₹(.*?) = ₹(.*?)$", line)
-                    if parts:
-                        work_name = parts.group(1).strip()
-                        quantity = parts.group(2).strip()
-                        cost_per_unit = parts.group(3).strip()
-                        extra_total_cost = float(parts.group(4).replace(",", ""))  # Remove commas
-
-                        total_cost += extra_total_cost  # Add to total project cost
-
-                        pdf.cell(60, 10, safe_text(work_name), border=1)
-                        pdf.cell(40, 10, safe_text(quantity), border=1)
-                        pdf.cell(40, 10, safe_text(cost_per_unit), border=1)
-                        pdf.cell(40, 10, safe_text(f"₹{extra_total_cost:.2f}"), border=1)
-                        pdf.ln()
-                except (IndexError, ValueError) as e:
-                    print(f"Error processing line: {line}. Error: {e}")
-                    continue
-
-        # Add total project cost
-        pdf.set_font("Arial", style="B", size=12)
-        pdf.cell(200, 10, txt=safe_text(f"Total Project Cost: ₹{total_cost:.2f}"), ln=True, align="C")
-
-        # 📄 **Add Note**
-        note = ("Note:\n"
-                "1. If the Construction materials rate increases more than 5%, client should bear the extra costs.\n"
-                "2. If any work to be done which is not mentioned in the quotation, client should bear the cost for that.\n"
-                "3. Client should bear the Cost for EB main board works & all the government formalities.\n"
-                "4. EB bill is to be paid by the client during the period of construction.\n"
-                "5. Construction water is to be provided by the client if bore water is not available.")
-        
-        pdf.ln(10)
-        pdf.set_font("Arial", size=10)
-        pdf.multi_cell(0, 10, txt=safe_text(note))
+        snapshot = quotation_from_dict(quotation.to_document())
 
-        # Save the PDF to a temporary file
-        pdf_path = "quotation.pdf"
-        pdf.output(pdf_path)
+        def work(task):
+            # Attach the PDF straight from memory (reuses the bytes if this version was already exported)
+            task.progress(0.3, "rendering the PDF")
+            msg = build_message(email_address, render_pdf(snapshot))
+            task.check()
+            mail_queue.enqueue(msg)  # Delivered in the background; progress shows in mail_status_label
 
-        # Email setup
-        try:
-            sender_email = "2399059@saec.ac.in"  # Replace with your email
-            sender_password = "viswavizz26"  # Replace with your email password
-            subject = "Construction Quotation"
-
-            # Create email
-            msg = MIMEMultipart()
-            msg['From'] = sender_email
-            msg['To'] = email_address
-            msg['Subject'] = subject
-
-            body = "Please find the attached quotation for the construction project."
-            msg.attach(MIMEText(body, 'plain'))
-
-            # Attach PDF
-            attachment = open(pdf_path, "rb")
-            part = MIMEBase('application', 'octet-stream')
-            part.set_payload((attachment).read())
-            encoders.encode_base64(part)
-            part.add_header('Content-Disposition', f"attachment; filename={pdf_path}")
-            msg.attach(part)
-
-            # Send email
-            server = smtplib.SMTP('smtp.gmail.com', 587)
-            server.starttls()
-            server.login(sender_email, sender_password)
-            text = msg.as_string()
-            server.sendmail(sender_email, email_address, text)
-            server.quit()
-
-            messagebox.showinfo("Email Sent", f"The quotation has been sent to {email_address}.")
-        except Exception as e:
-            messagebox.showerror("Email Error", f"An error occurred while sending the email: {e}")
+        task_executor.submit("send", work, on_error=on_send_error, label=f"Preparing email to {email_address}")
     else:
         messagebox.showwarning("Email Error", "No data to send!")
-        
-# Splash Screen
-splash_root = tk.Tk()
-splash_root.title("Splash Screen")
-splash_root.configure(bg='grey')
 
-# Make the splash screen a fixed size
-splash_width = 800
-splash_height = 400
-screen_width = splash_root.winfo_screenwidth()
-screen_height = splash_root.winfo_screenheight()
-x = (screen_width / 2) - (splash_width / 2)
-y = (screen_height / 2) - (splash_height / 2)
-splash_root.geometry(f"{splash_width}x{splash_height}+{int(x)}+{int(y)}")
+def on_send_error(e):
+    messagebox.showerror("Email Error", f"An error occurred while sending the email: {e}")
+
+# **Background Tasks**
+task_rows = {}  # Task -> (row frame, label, progress bar) in task_frame
+
+def cancel_task(task, label):
+    label.config(text=f"⏳ {task.label}: cancelling...")
+    task.cancel()
+
+def on_task_status(task, status, detail):
+    """ Show each running action with its progress and a Cancel button (called on the Tk thread) """
+    if status == "started":
+        row = tk.Frame(task_frame, bg='grey')
+        row.pack(fill="x", pady=2)
+        label = tk.Label(row, text=f"⏳ {task.label}", bg='grey', fg='white', font=("Arial", 12), anchor="w")
+        label.pack(side="left", fill="x", expand=True)
+        tk.Button(row, text="Cancel", command=lambda: cancel_task(task, label), font=("Arial", 10)).pack(side="right")
+        bar = ttk.Progressbar(row, length=160, maximum=1.0)
+        bar.pack(side="right", padx=5)
+        task_rows[task] = (row, label, bar)
+        return
 
-# Center the splash label
-splash_label = tk.Label(splash_root, text="CONSTRUCTION ESTIMATOR", font=("Arial", 40), bg='grey', fg='white')
-splash_label.place(relx=0.5, rely=0.5, anchor=tk.CENTER)
+    row, label, bar = task_rows[task]
+    if status == "progress":
+        bar["value"] = task.fraction
+        label.config(text=f"⏳ {task.label}: {detail}")
+        return
+
+    del task_rows[task]
+    row.destroy()
+    if status == "cancelled":
+        print(f"❌ {task.label}: cancelled")
+
+# **Start-up**
+def warm_up(task):
+    """ Connect to the database, load the rate catalogue and the PDF engine before they are first needed """
+    task.progress(0.1, "connecting to the database")
+    get_repository().connect()
+    task.progress(0.6, "loading the rate catalogue")
+    refresh_catalogue()
+    task.progress(0.9, "loading the PDF engine")
+    importlib.import_module("fpdf")
+
+def on_warm_up_error(e):
+    print(f"❌ Database unavailable at start-up: {e}")
+
+def install_date_picker(tkcalendar):
+    """ Swap the plain validity date entry for a calendar drop-down once tkcalendar is imported """
+    global entry_validity_date
+    typed = entry_validity_date.get().strip()
+    entry_validity_date.destroy()
+    entry_validity_date = tkcalendar.DateEntry(left_frame, font=FONT, date_pattern='yyyy-mm-dd')
+    entry_validity_date.grid(row=2, column=1, padx=10, pady=5, sticky="w")
+    if typed:
+        entry_validity_date.delete(0, tk.END)
+        entry_validity_date.insert(0, typed)
 
-# Close the splash screen after 3 seconds
-splash_root.after(3000, splash_root.destroy)
+def report_startup():
+    print(f"✅ Window ready in {time.perf_counter() - STARTED:.2f}s")
 
-# Run the splash screen
-splash_root.mainloop()
+def poll_tasks():
+    task_executor.poll()
+    root.after(50, poll_tasks)
 
+# **Outbound Mail Queue**
+mail_events = queue.Queue()  # Filled by the mail worker thread, drained on the Tk thread
 
+def on_mail_status(message_id, recipient, status, detail):
+    mail_events.put((recipient, status, detail))
+
+def poll_mail_events():
+    while True:
+        try:
+            recipient, status, detail = mail_events.get_nowait()
+        except queue.Empty:
+            break
+
+        if status == "queued":
+            mail_status_label.config(text=f"📧 Sending quotation to {recipient}...")
+        elif status == "retrying":
+            mail_status_label.config(text=f"📧 {recipient}: {detail}")
+        elif status == "sent":
+            mail_status_label.config(text=f"✅ Quotation sent to {recipient}")
+            messagebox.showinfo("Email Sent", f"The quotation has been sent to {recipient}.")
+        elif status == "failed":
+            mail_status_label.config(text=f"❌ Could not send to {recipient}")
+            messagebox.showerror("Email Error", f"An error occurred while sending the email: {detail}")
+
+    root.after(200, poll_mail_events)
+
+# **Metrics**
+METRICS_INTERVAL_MS = 15000
+PROFILE_DIR = "profiles"
+
+def flush_metrics():
+    """ Rewrite the metrics file (ESTIMATOR_METRICS_FILE, default ./metrics.prom) for the operator """
+    try:
+        write_metrics()
+    except OSError as e:
+        print(f"❌ Could not write the metrics file: {e}")
+
+def poll_metrics():
+    flush_metrics()
+    root.after(METRICS_INTERVAL_MS, poll_metrics)
+
+def open_diagnostics(event=None):
+    """ Live view of the process metrics with a cProfile capture toggle (F12) """
+    window = tk.Toplevel(root)
+    window.title("Diagnostics")
+    profile_dir = profiling() or PROFILE_DIR
+    capture = tk.BooleanVar(value=profiling() is not None)
+    tk.Checkbutton(window, text=f"Capture a cProfile of every save, export, send and fetch into {profile_dir}/", variable=capture,
+                   command=lambda: set_profiling(profile_dir if capture.get() else None)).pack(anchor="w", padx=10, pady=5)
+    text = tk.Text(window, font=("Courier", 10), width=110, height=35)
+    text.pack(fill="both", expand=True)
+
+    def refresh():
+        if not window.winfo_exists():
+            return
+        position = text.yview()[0]
+        text.configure(state="normal")
+        text.delete("1.0", tk.END)
+        text.insert(tk.END, render_metrics())
+        text.configure(state="disabled")
+        text.yview_moveto(position)
+        window.after(2000, refresh)
+
+    refresh()
+        
 # GUI Setup
 root = tk.Tk()
 root.title("Construction Quotation Generator")
@@ -641,13 +664,23 @@ def create_label_entry(parent, text, row):
     entry.grid(row=row, column=1, padx=10, pady=5, sticky="w")
     return entry
 
+# **Label-Combobox with Rate Catalogue Suggestions**
+def create_label_catalogue_entry(parent, text, row, category, rate_entry):
+    tk.Label(parent, text=text, bg='grey', fg='white', font=FONT).grid(row=row, column=0, padx=10, pady=5, sticky="w")
+    combobox = ttk.Combobox(parent, font=FONT, width=19)
+    combobox.grid(row=row, column=1, padx=10, pady=5, sticky="w")
+    combobox.bind("<KeyRelease>", lambda event: suggest_catalogue_items(combobox, category))
+    combobox.bind("<<ComboboxSelected>>", lambda event: fill_catalogue_rate(combobox, category, rate_entry()))
+    return combobox
+
 # **Customer Information**
 entry_customer_name = create_label_entry(left_frame, "Customer Name:", 0)
 entry_building_site = create_label_entry(left_frame, "Building Site:", 1)
 
 # **Validity Date (Fixed visibility)**
+# A plain yyyy-mm-dd entry until tkcalendar has been imported in the background (see install_date_picker)
 tk.Label(left_frame, text="Validity Date:", bg='grey', fg='white', font=FONT).grid(row=2, column=0, padx=10, pady=5, sticky="w")
-entry_validity_date = DateEntry(left_frame, font=FONT, date_pattern='yyyy-mm-dd')
+entry_validity_date = tk.Entry(left_frame, font=FONT, width=12)
 entry_validity_date.grid(row=2, column=1, padx=10, pady=5, sticky="w")
 
 email_entry = create_label_entry(left_frame, "Email:", 3)
@@ -657,7 +690,7 @@ ttk.Separator(left_frame, orient='horizontal').grid(row=4, column=0, columnspan=
 
 # **Floor Inputs**
 tk.Label(left_frame, text="🏢 Floor Information", bg='grey', fg='white', font=("Arial", 18, "bold")).grid(row=5, column=0, columnspan=2, pady=5, sticky="w")
-entry_floor_name = create_label_entry(left_frame, "Floor Name:", 6)
+entry_floor_name = create_label_catalogue_entry(left_frame, "Floor Name:", 6, "floor", lambda: entry_cost_per_sqft)
 entry_area_sqft = create_label_entry(left_frame, "Area (sqft):", 7)
 entry_cost_per_sqft = create_label_entry(left_frame, "Cost per sqft (INR):", 8)
 
@@ -668,7 +701,7 @@ ttk.Separator(left_frame, orient='horizontal').grid(row=10, column=0, columnspan
 
 # **Extra Works Inputs**
 tk.Label(left_frame, text="🛠️ Extra Works", bg='grey', fg='white', font=("Arial", 18, "bold")).grid(row=11, column=0, columnspan=2, pady=5, sticky="w")
-entry_extra_works = create_label_entry(left_frame, "Extra Works:", 12)
+entry_extra_works = create_label_catalogue_entry(left_frame, "Extra Works:", 12, "extra_work", lambda: entry_cost_per_quantity)
 entry_quantity = create_label_entry(left_frame, "Quantity:", 13)
 entry_cost_per_quantity = create_label_entry(left_frame, "Cost per Quantity (INR):", 14)
 
@@ -682,6 +715,12 @@ tk.Label(left_frame, text="📜 Fetch Previous Quotation", bg='grey', fg='white'
 fetch_email_entry = create_label_entry(left_frame, "Email:", 18)
 
 tk.Button(left_frame, text="View Previous Quotation", command=fetch_quotation, bg='#FFD700', fg='black', font=SMALL_BUTTON_FONT).grid(row=19, column=0, columnspan=2, pady=5, sticky="ew")
+load_more_button = tk.Button(left_frame, text="Load More", command=fetch_next_page, bg='#FFD700', fg='black', font=SMALL_BUTTON_FONT, state="disabled")
+load_more_button.grid(row=20, column=0, columnspan=2, pady=5, sticky="ew")
+
+search_entry = create_label_entry(left_frame, "Search:", 21)
+search_entry.bind("<Return>", lambda event: search_previous_quotations())
+tk.Button(left_frame, text="Search Quotations", command=search_previous_quotations, bg='#FFD700', fg='black', font=SMALL_BUTTON_FONT).grid(row=22, column=0, columnspan=2, pady=5, sticky="ew")
 
 # **Right frame (Display & Actions)**
 right_frame = tk.Frame(root, bg='grey')
@@ -689,9 +728,39 @@ right_frame.grid(row=0, column=1, padx=20, pady=20, sticky="nsew")
 right_frame.grid_rowconfigure(0, weight=1)  # Expand text display
 right_frame.grid_columnconfigure(0, weight=1)  # Expand buttons
 
+# **Tabs: current quotation and previous quotations**
+display_tabs = ttk.Notebook(right_frame)
+display_tabs.grid(row=0, column=0, columnspan=4, padx=10, pady=10, sticky="nsew")
+current_tab = tk.Frame(display_tabs, bg='grey')
+history_tab = tk.Frame(display_tabs, bg='grey')
+display_tabs.add(current_tab, text="Current Quotation")
+display_tabs.add(history_tab, text="Previous Quotations")
+
 # **Text Display**
-text_display = tk.Text(right_frame, font=FONT, wrap="word")
-text_display.grid(row=0, column=0, columnspan=4, padx=10, pady=10, sticky="nsew")
+text_display = tk.Text(current_tab, font=FONT, wrap="word")
+text_display.pack(fill="both", expand=True)
+
+# **Previous Quotations Tree** (rows are added a page at a time, line items on expand)
+quotation_tree = ttk.Treeview(history_tab, columns=("details", "total"), yscrollcommand=on_quotation_scroll)
+quotation_tree.heading("#0", text="Quotation")
+quotation_tree.heading("details", text="Details")
+quotation_tree.heading("total", text="Total Cost")
+quotation_tree.column("#0", width=260)
+quotation_tree.column("details", width=420)
+quotation_tree.column("total", width=140, anchor="e")
+quotation_scrollbar = ttk.Scrollbar(history_tab, orient="vertical", command=quotation_tree.yview)
+history_buttons = tk.Frame(history_tab, bg='grey')
+history_buttons.pack(side="bottom", fill="x", pady=5)
+history_buttons.grid_columnconfigure((0, 1, 2), weight=1)
+for column, (text, command, color) in enumerate([
+    ("Export Selected Quotation", export_selected_quotation, '#4A90E2'),
+    ("Edit Selected Quotation", edit_selected_quotation, '#F5A623'),
+    ("Revision History", show_revision_history, '#9B9B9B'),
+]):
+    tk.Button(history_buttons, text=text, command=command, bg=color, fg='white', font=SMALL_BUTTON_FONT).grid(row=0, column=column, padx=2, sticky="ew")
+quotation_scrollbar.pack(side="right", fill="y")
+quotation_tree.pack(side="left", fill="both", expand=True)
+quotation_tree.bind("<<TreeviewOpen>>", on_quotation_open)
 
 # **Total Cost Label**
 total_label = tk.Label(right_frame, text="Total Project Cost: ₹0.00", bg='grey', fg='white', font=("Arial", 18, "bold"))
@@ -712,4 +781,25 @@ buttons = [
 for i, (text, command, color) in enumerate(buttons):
     tk.Button(button_frame, text=text, command=command, bg=color, fg='white', font=BUTTON_FONT).grid(row=0, column=i, padx=10, pady=5, sticky="ew")
 
-root.mainloop()
\ No newline at end of file
+# **Mail Status Label**
+mail_status_label = tk.Label(right_frame, text="", bg='grey', fg='white', font=("Arial", 12))
+mail_status_label.grid(row=3, column=0, columnspan=4, pady=5, sticky="ew")
+
+# **Running Tasks** (one row per background action)
+task_frame = tk.Frame(right_frame, bg='grey')
+task_frame.grid(row=4, column=0, columnspan=4, pady=5, sticky="ew")
+
+mail_queue = MailQueue(on_status=on_mail_status).start()
+task_executor = TaskExecutor(on_status=on_task_status)
+poll_mail_events()
+poll_tasks()
+poll_metrics()
+root.bind("<F12>", open_diagnostics)
+
+# Slow initialisation runs behind the open window; its progress row is the only splash
+task_executor.submit("date-picker", lambda task: importlib.import_module("tkcalendar"), on_done=install_date_picker)
+task_executor.submit("warm-up", warm_up, on_error=on_warm_up_error, label="Starting up")
+root.after_idle(report_startup)
+
+root.mainloop()
+flush_metrics()  # Final snapshot on exit
\ No newline at end of file
@@ -0,0 +1,431 @@
+""" GUI-free estimation core: quotation model, validation and PDF rendering """
+import csv
+import hashlib
+import json
+import re
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+
+COMPANY_NAME = "Niranjana Construction"
+COMPANY_EMAIL = "viswa26073@gmail.com"
+COMPANY_PHONE = "9150447236"
+
+NOTE = ("Note:\n"
+        "1. If the Construction materials rate increases more than 5%, client should bear the extra costs.\n"
+        "2. If any work to be done which is not mentioned in the quotation, client should bear the cost for that.\n"
+        "3. Client should bear the Cost for EB main board works & all the government formalities.\n"
+        "4. EB bill is to be paid by the client during the period of construction.\n"
+        "5. Construction water is to be provided by the client if bore water is not available.")
+
+
+class ValidationError(ValueError):
+    """ Raised when quotation input is invalid; `field` names the offending input """
+
+    def __init__(self, message, field=None):
+        super().__init__(message)
+        self.field = field
+
+
+# **Quotation Model**
+class FloorItem:
+    """ A single floor line item (area x rate) """
+    __slots__ = ("name", "area_sqft", "cost_per_sqft", "total_cost")
+
+    def __init__(self, name, area_sqft, cost_per_sqft):
+        self.name = name
+        self.area_sqft = area_sqft
+        self.cost_per_sqft = cost_per_sqft
+        self.total_cost = area_sqft * cost_per_sqft
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "area_sqft": self.area_sqft,
+            "cost_per_sqft": self.cost_per_sqft,
+            "total_cost": self.total_cost
+        }
+
+
+class ExtraWorkItem:
+    """ A single extra work line item (quantity x unit rate) """
+    __slots__ = ("name", "quantity", "cost_per_unit", "total_cost")
+
+    def __init__(self, name, quantity, cost_per_unit):
+        self.name = name
+        self.quantity = quantity
+        self.cost_per_unit = cost_per_unit
+        self.total_cost = quantity * cost_per_unit
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "quantity": self.quantity,
+            "cost_per_unit": self.cost_per_unit,
+            "total_cost": self.total_cost
+        }
+
+
+class Quotation:
+    """ Customer details and line items of a quotation, with a running total
+
+    catalogue_version records the rate catalogue version its rates were
+    picked from (None if every rate was typed in by hand).
+    """
+    __slots__ = ("email", "customer_name", "building_site", "validity_date",
+                 "floors", "extra_works", "total_cost", "catalogue_version")
+
+    def __init__(self, email="", customer_name="", building_site="", validity_date=""):
+        self.email = email
+        self.customer_name = customer_name
+        self.building_site = building_site
+        self.validity_date = validity_date
+        self.floors = []
+        self.extra_works = []
+        self.total_cost = 0.0
+        self.catalogue_version = None
+
+    def add_floor(self, name, area_sqft, cost_per_sqft):
+        item = FloorItem(name, area_sqft, cost_per_sqft)
+        self.floors.append(item)
+        self.total_cost += item.total_cost
+        return item
+
+    def add_extra_work(self, name, quantity, cost_per_unit):
+        item = ExtraWorkItem(name, quantity, cost_per_unit)
+        self.extra_works.append(item)
+        self.total_cost += item.total_cost
+        return item
+
+    def is_empty(self):
+        return not self.floors and not self.extra_works
+
+    def clear(self):
+        self.floors.clear()
+        self.extra_works.clear()
+        self.total_cost = 0.0
+        self.catalogue_version = None
+
+    def to_document(self):
+        """ MongoDB document for this quotation """
+        document = {
+            "email": self.email,
+            "customer_name": self.customer_name,
+            "building_site": self.building_site,
+            "validity_date": self.validity_date,
+            "floors": [floor.to_dict() for floor in self.floors],
+            "extra_works": [work.to_dict() for work in self.extra_works],
+            "total_project_cost": self.total_cost
+        }
+        if self.catalogue_version is not None:
+            document["catalogue_version"] = self.catalogue_version
+        return document
+
+
+# **Validation**
+def parse_floor(name, area_sqft, cost_per_sqft):
+    """ Validate raw floor input; returns (name, area_sqft, cost_per_sqft) """
+    name = str(name).strip()
+    if not name:
+        raise ValidationError("Floor name cannot be empty.", "floor_name")
+    if area_sqft in (None, "") or cost_per_sqft in (None, ""):
+        raise ValidationError("Enter valid numerical values.")
+    try:
+        return name, float(area_sqft), float(cost_per_sqft)
+    except (TypeError, ValueError):
+        raise ValidationError("Please enter valid numerical values.")
+
+
+def parse_extra_work(name, quantity, cost_per_unit):
+    """ Validate raw extra work input; returns (name, quantity, cost_per_unit) """
+    name = str(name).strip()
+    if not name:
+        raise ValidationError("Extra works name cannot be empty.", "extra_works")
+    if quantity in (None, "") or cost_per_unit in (None, ""):
+        raise ValidationError("Enter valid numerical values.")
+    try:
+        return name, int(quantity), float(cost_per_unit)
+    except (TypeError, ValueError):
+        raise ValidationError("Please enter valid numerical values.")
+
+
+def validate_customer_info(customer_name, building_site, validity_date):
+    """ Raise ValidationError if the customer fields are not usable """
+    if not customer_name:
+        raise ValidationError("Customer name cannot be empty.", "customer_name")
+
+    if not re.match("^[A-Za-z ]*$", customer_name):
+        raise ValidationError("Customer name should only contain alphabets.", "customer_name")
+
+    if not building_site:
+        raise ValidationError("Building site cannot be empty.", "building_site")
+
+    try:
+        datetime.strptime(validity_date, "%Y-%m-%d")
+    except ValueError:
+        raise ValidationError("Validity date must be in YYYY-MM-DD format.", "validity_date")
+
+
+def is_valid_email(email):
+    """ Check if email format is valid """
+    pattern = r"^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$"
+    return re.match(pattern, email)
+
+
+def quotation_from_dict(data):
+    """ Build a validated Quotation from a plain dict (JSON input or a stored document) """
+    quotation = Quotation(
+        email=str(data.get("email", "")).strip().lower(),
+        customer_name=str(data.get("customer_name", "")).strip(),
+        building_site=str(data.get("building_site", "")).strip(),
+        validity_date=str(data.get("validity_date", "")).strip(),
+    )
+    quotation.catalogue_version = data.get("catalogue_version")
+    for floor in data.get("floors", []):
+        quotation.add_floor(*parse_floor(floor.get("name", ""), floor.get("area_sqft"), floor.get("cost_per_sqft")))
+    for work in data.get("extra_works", []):
+        quotation.add_extra_work(*parse_extra_work(work.get("name", ""), work.get("quantity"), work.get("cost_per_unit")))
+    return quotation
+
+
+def load_quotation(path):
+    """ Read a quotation from a JSON file """
+    with open(path, encoding="utf-8") as f:
+        return quotation_from_dict(json.load(f))
+
+
+def iter_records(path, on_error=None):
+    """ Stream quotation dicts from a .jsonl file (one quotation per line) or a .csv file
+
+    CSV files hold one line item per row with the columns quote_id, email,
+    customer_name, building_site, validity_date, item_type ("floor" or
+    "extra_work"), name, quantity and rate; consecutive rows with the same
+    quote_id form one quotation. Unreadable lines are passed to
+    on_error(location, exception) and skipped, or raised if no handler is given.
+    """
+    if path.lower().endswith(".csv"):
+        yield from _iter_csv_records(path, on_error)
+        return
+
+    with open(path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                if on_error is None:
+                    raise
+                on_error(f"line {line_no}", e)
+                continue
+            record.setdefault("quote_id", str(line_no))
+            yield record
+
+
+def _iter_csv_records(path, on_error):
+    record = None
+    broken = False
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            quote_id = (row.get("quote_id") or row.get("email") or "").strip()
+            if record is None or record["quote_id"] != quote_id:
+                if record is not None and not broken:
+                    yield record
+                broken = False
+                record = {
+                    "quote_id": quote_id,
+                    "email": row.get("email", ""),
+                    "customer_name": row.get("customer_name", ""),
+                    "building_site": row.get("building_site", ""),
+                    "validity_date": row.get("validity_date", ""),
+                    "floors": [],
+                    "extra_works": [],
+                }
+
+            item_type = (row.get("item_type") or "").strip().lower()
+            if item_type == "floor":
+                record["floors"].append({"name": row.get("name", ""), "area_sqft": row.get("quantity"), "cost_per_sqft": row.get("rate")})
+            elif item_type == "extra_work":
+                record["extra_works"].append({"name": row.get("name", ""), "quantity": row.get("quantity"), "cost_per_unit": row.get("rate")})
+            elif item_type and not broken:
+                # Skip the whole quotation rather than issue it with a missing line item
+                error = ValidationError(f"Unknown item_type {item_type!r}.", "item_type")
+                if on_error is None:
+                    raise error
+                on_error(f"quote {quote_id}", error)
+                broken = True
+    if record is not None and not broken:
+        yield record
+
+
+def load_bill_header(path):
+    """ Quotation with the customer fields of the first row of a one-quotation CSV bill of quantities, and no line items """
+    with open(path, encoding="utf-8", newline="") as f:
+        row = next(csv.DictReader(f), None) or {}
+    return Quotation(
+        email=str(row.get("email") or "").strip().lower(),
+        customer_name=str(row.get("customer_name") or "").strip(),
+        building_site=str(row.get("building_site") or "").strip(),
+        validity_date=str(row.get("validity_date") or "").strip(),
+    )
+
+
+def iter_line_items(path, item_type):
+    """ Stream the validated FloorItems ("floor") or ExtraWorkItems ("extra_work") of a CSV bill of quantities
+
+    The file has the CSV columns of iter_records and holds one quotation. It is
+    read once per item type, so no more than one row is held at a time.
+    """
+    parse, item_class = (parse_floor, FloorItem) if item_type == "floor" else (parse_extra_work, ExtraWorkItem)
+    with open(path, encoding="utf-8", newline="") as f:
+        for row_no, row in enumerate(csv.DictReader(f), 2):
+            if (row.get("item_type") or "").strip().lower() != item_type:
+                continue
+            try:
+                yield item_class(*parse(row.get("name", ""), row.get("quantity"), row.get("rate")))
+            except ValidationError as e:
+                raise ValidationError(f"Row {row_no}: {e}", e.field) from e
+
+
+# **PDF**
+def safe_text(text):
+    """ Normalize text to remove unsupported characters for PDF compatibility """
+    return unicodedata.normalize('NFKD', text).encode('latin-1', 'ignore').decode('latin-1')
+
+
+FLOOR_TABLE_HEADS = ("Floor Name", "Area (sqft)", "Cost/Unit (INR)", "Total Cost (INR)")
+EXTRA_TABLE_HEADS = ("Extra Work", "Quantity", "Cost/Unit (INR)", "Total Cost (INR)")
+COLUMN_WIDTHS = (60, 40, 40, 40)
+
+
+class QuotationTemplate:
+    """ Static parts of the quotation PDF, normalized and laid out once per process """
+    __slots__ = ("header_lines", "floor_heads", "extra_heads", "note_lines")
+
+    def __init__(self, today):
+        from fpdf import FPDF
+
+        self.header_lines = tuple(safe_text(text) for text in (
+            f"Date: {today}", f"Email: {COMPANY_EMAIL}", f"Phone: {COMPANY_PHONE}"))
+        self.floor_heads = tuple(safe_text(text) for text in FLOOR_TABLE_HEADS)
+        self.extra_heads = tuple(safe_text(text) for text in EXTRA_TABLE_HEADS)
+
+        # Word-wrap the terms once, the same way multi_cell(0, ...) would on an A4 page
+        pdf = FPDF()
+        pdf.set_font("Arial", size=10)
+        max_width = pdf.w - pdf.l_margin - pdf.r_margin - 2 * pdf.c_margin
+        lines = []
+        for paragraph in safe_text(NOTE).split("\n"):
+            line = ""
+            for word in paragraph.split(" "):
+                candidate = f"{line} {word}" if line else word
+                if line and pdf.get_string_width(candidate) > max_width:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = candidate
+            lines.append(line)
+        self.note_lines = tuple(lines)
+
+    def table_head(self, pdf, title, heads):
+        pdf.set_font("Arial", style="B", size=12)
+        pdf.cell(200, 10, txt=title, ln=True)
+        pdf.set_font("Arial", size=10)
+        for width, head in zip(COLUMN_WIDTHS, heads):
+            pdf.cell(width, 10, head, border=1, align="C")
+        pdf.ln()
+
+
+@lru_cache(maxsize=1)
+def get_template(today):
+    """ Template for the given date string; rebuilt only when the date changes """
+    return QuotationTemplate(today)
+
+
+def build_pdf(quotation):
+    """ Lay out the quotation as an FPDF document """
+    from fpdf import FPDF
+
+    template = get_template(date.today().strftime('%Y-%m-%d'))
+
+    pdf = FPDF()
+    pdf.add_page()
+
+    # 🏠 **Header Section**
+    pdf.set_font("Arial", style="B", size=16)
+    pdf.cell(200, 10, txt=COMPANY_NAME, ln=True, align="C")
+
+    pdf.set_font("Arial", size=12)
+    for line in template.header_lines:
+        pdf.cell(200, 10, txt=line, ln=True, align="C")
+    pdf.ln(10)  # Add blank line
+
+    # 🧑 **Customer Information**
+    pdf.set_font("Arial", style="B", size=12)
+    pdf.cell(200, 10, txt="Customer Information", ln=True)
+    pdf.set_font("Arial", size=10)
+    pdf.cell(60, 10, "Customer Name:", border=0)
+    pdf.cell(140, 10, safe_text(quotation.customer_name), border=0)
+    pdf.ln()
+    pdf.cell(60, 10, "Building Site:", border=0)
+    pdf.cell(140, 10, safe_text(quotation.building_site), border=0)
+    pdf.ln()
+    pdf.cell(60, 10, "Validity Date:", border=0)
+    pdf.cell(140, 10, safe_text(quotation.validity_date), border=0)
+    pdf.ln(10)  # Add blank line
+
+    # 🏢 **Floor Details Table**
+    template.table_head(pdf, "Floor Details", template.floor_heads)
+    for floor in quotation.floors:
+        pdf.cell(60, 10, safe_text(floor.name), border=1)
+        pdf.cell(40, 10, str(floor.area_sqft), border=1)
+        pdf.cell(40, 10, str(floor.cost_per_sqft), border=1)
+        pdf.cell(40, 10, f"{floor.total_cost:.2f}", border=1)
+        pdf.ln()
+
+    # 🔧 **Extra Works Table**
+    template.table_head(pdf, "Extra Works Details", template.extra_heads)
+    for work in quotation.extra_works:
+        pdf.cell(60, 10, safe_text(work.name), border=1)
+        pdf.cell(40, 10, str(work.quantity), border=1)
+        pdf.cell(40, 10, str(work.cost_per_unit), border=1)
+        pdf.cell(40, 10, f"{work.total_cost:.2f}", border=1)
+        pdf.ln()
+
+    # 📊 **Total Project Cost**
+    pdf.set_font("Arial", style="B", size=12)
+    pdf.cell(200, 10, txt=f"Total Project Cost: {quotation.total_cost:.2f}", ln=True, align="C")
+
+    # 📄 **Add Note**
+    pdf.ln(10)
+    pdf.set_font("Arial", size=10)
+    for line in template.note_lines:
+        pdf.cell(0, 10, line, ln=True)
+
+    return pdf
+
+
+def quotation_key(quotation, today=None):
+    """ Content hash of everything printed on the PDF; the PDF cache key """
+    content = quotation.to_document()
+    content["date"] = today or date.today().strftime('%Y-%m-%d')
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def pdf_bytes(pdf):
+    """ Serialized PDF as bytes (pyfpdf returns a latin-1 str, fpdf2 a bytearray) """
+    data = pdf.output(dest="S")
+    if isinstance(data, str):
+        data = data.encode("latin-1")
+    return bytes(data)
+
+
+def render_pdf(quotation):
+    """ PDF bytes for the quotation, rendered once per quotation version and then served from the PDF cache """
+    from metrics import PDF_BYTES
+    from pdf_cache import get_pdf_cache
+
+    data = get_pdf_cache().get_or_render(quotation_key(quotation), lambda: pdf_bytes(build_pdf(quotation)))
+    PDF_BYTES.observe(len(data))
+    return data
@@ -0,0 +1,70 @@
+""" Bulk import of historical quotations from CSV/JSONL with batched, de-duplicated writes """
+import argparse
+import sys
+import time
+
+from estimator_core import iter_records, quotation_from_dict
+from storage import get_repository, open_repository
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def import_records(path, repository, batch_size=DEFAULT_BATCH_SIZE, ordered=False, report=print):
+    """ Validate and store every record in `path`; returns (inserted, duplicates, invalid, seconds)
+
+    Records are written in batches of `batch_size` through the repository's
+    upsert_many, which skips quotations whose content is already stored, so
+    re-running an import does not create duplicates.
+    """
+    inserted = duplicates = invalid = 0
+    batch = []
+
+    def reject(location, error):
+        nonlocal invalid
+        invalid += 1
+        report(f"❌ {location}: {error}")
+
+    def flush():
+        nonlocal inserted, duplicates
+        added, skipped = repository.upsert_many(batch, ordered=ordered)
+        inserted += added
+        duplicates += skipped
+        batch.clear()
+
+    start = time.perf_counter()
+    for record in iter_records(path, on_error=reject):
+        try:
+            batch.append(quotation_from_dict(record).to_document())
+        except ValueError as e:
+            reject(f"quote {record.get('quote_id')}", e)
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    elapsed = time.perf_counter() - start
+
+    rate = (inserted + duplicates) / elapsed if elapsed > 0 else 0.0
+    report(f"✅ {inserted} imported, {duplicates} duplicates skipped, {invalid} invalid in {elapsed:.2f}s ({rate:.0f} docs/sec)")
+    return inserted, duplicates, invalid, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="import_quotes", description="Import historical quotations from a CSV or JSONL file.")
+    parser.add_argument("input", help="quotation records (.csv or .jsonl)")
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help=f"documents per write batch (default: {DEFAULT_BATCH_SIZE})")
+    parser.add_argument("--ordered", action="store_true", help="apply each batch in order and stop a batch at the first error")
+    parser.add_argument("--db", help="target database URL (default: ESTIMATOR_DB or local MongoDB)")
+    args = parser.parse_args(argv)
+
+    repository = open_repository(args.db) if args.db else get_repository()
+    try:
+        _, _, invalid, _ = import_records(args.input, repository, args.batch_size, args.ordered)
+    except OSError as e:
+        print(f"❌ {args.input}: {e}", file=sys.stderr)
+        return 1
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+""" Load generator for the quotation HTTP API (service.py)
+
+Opens `concurrency` keep-alive connections and sends POST /estimate (or
+another route) as fast as the server answers for `duration` seconds, then
+reports requests/sec and latency percentiles.
+
+    python loadtest.py http://127.0.0.1:8080 -c 200 -d 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import urlsplit
+
+SAMPLE_QUOTATION = {
+    "email": "client@example.com",
+    "customer_name": "Load Test",
+    "building_site": "Plot 7",
+    "validity_date": "2030-01-01",
+    "floors": [{"name": "Ground Floor", "area_sqft": 1200, "cost_per_sqft": 1850},
+               {"name": "First Floor", "area_sqft": 1100, "cost_per_sqft": 1750}],
+    "extra_works": [{"name": "Compound wall", "quantity": 120, "cost_per_unit": 950}],
+}
+
+
+async def _client(host, port, request, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            writer.write(request)
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.strip().lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if status >= 400:
+                errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_load(url, path="/estimate", body=None, concurrency=100, duration=10.0):
+    """ (requests, errors, seconds, sorted latencies) for `duration` seconds of load """
+    target = urlsplit(url)
+    payload = json.dumps(SAMPLE_QUOTATION if body is None else body).encode("utf-8")
+    request = (f"POST {path} HTTP/1.1\r\nHost: {target.hostname}\r\n"
+               f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n").encode("latin-1") + payload
+
+    latencies, errors = [], []
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*(_client(target.hostname, target.port or 80, request, deadline, latencies, errors)
+                           for _ in range(concurrency)))
+    return len(latencies), len(errors), time.perf_counter() - start, sorted(latencies)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="loadtest", description="Load-test the quotation HTTP API.")
+    parser.add_argument("url", nargs="?", default="http://127.0.0.1:8080", help="API base URL")
+    parser.add_argument("-p", "--path", default="/estimate", help="POST route to hit (default: /estimate)")
+    parser.add_argument("-c", "--concurrency", type=int, default=100, help="concurrent connections (default: 100)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds to run (default: 10)")
+    args = parser.parse_args(argv)
+
+    try:
+        count, errors, elapsed, latencies = asyncio.run(run_load(args.url, args.path, None, args.concurrency, args.duration))
+    except OSError as e:
+        print(f"❌ {args.url}: {e}", file=sys.stderr)
+        return 1
+    if not latencies:
+        print("❌ No responses received.", file=sys.stderr)
+        return 1
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))] * 1000
+
+    print(f"✅ {count} requests in {elapsed:.1f}s ({count / elapsed:.0f} req/s), {errors} errors; "
+          f"p50 {pct(50):.1f} ms, p95 {pct(95):.1f} ms, p99 {pct(99):.1f} ms")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
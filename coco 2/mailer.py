@@ -0,0 +1,271 @@
+""" Quotation e-mail assembly and SMTP delivery
+
+smtplib and the email package are imported on first use so that the GUI does
+not pay for them at start-up.
+"""
+import heapq
+import os
+import queue
+import threading
+import time
+import uuid
+
+from metrics import SMTP_SECONDS
+
+SMTP_HOST = "smtp.gmail.com"
+SMTP_PORT = 587
+SENDER_EMAIL = "2399059@saec.ac.in"  # Replace with your email
+SENDER_PASSWORD = "viswavizz26"  # Replace with your email password
+
+SUBJECT = "Construction Quotation"
+BODY = "Please find the attached quotation for the construction project."
+ATTACHMENT_NAME = "quotation.pdf"
+
+
+def build_message(recipient, pdf_data, sender=SENDER_EMAIL, filename=ATTACHMENT_NAME):
+    """ MIME message with the quotation PDF attached straight from memory """
+    from email import encoders
+    from email.mime.base import MIMEBase
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = recipient
+    msg['Subject'] = SUBJECT
+    msg.attach(MIMEText(BODY, 'plain'))
+
+    part = MIMEBase('application', 'octet-stream')
+    part.set_payload(pdf_data)
+    encoders.encode_base64(part)
+    part.add_header('Content-Disposition', f"attachment; filename={filename}")
+    msg.attach(part)
+    return msg
+
+
+def permanent_failure(error):
+    """ True for an SMTP 5xx reply (to every recipient), which sending again will not change """
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code >= 500
+
+
+class SMTPSession:
+    """ One long-lived SMTP connection, opened on first send and reopened if the server drops it """
+
+    def __init__(self, host=SMTP_HOST, port=SMTP_PORT, username=SENDER_EMAIL,
+                 password=SENDER_PASSWORD, use_tls=True, timeout=30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._server = None
+
+    def _connect(self):
+        import smtplib
+
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            server.starttls()
+        if self.username:
+            server.login(self.username, self.password)
+        return server
+
+    def send(self, sender, recipient, raw):
+        import smtplib
+
+        if self._server is None:
+            self._server = self._connect()
+        try:
+            self._server.sendmail(sender, recipient, raw)
+        except smtplib.SMTPServerDisconnected:
+            # The session timed out on the server side; reconnect once
+            self._server = self._connect()
+            self._server.sendmail(sender, recipient, raw)
+
+    def close(self):
+        if self._server is not None:
+            import smtplib
+
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                self._server.close()
+            self._server = None
+
+
+class RateLimiter:
+    """ Thread-safe limiter that spaces calls to at most `per_minute` per minute """
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class MailQueue:
+    """ Outbound mail queue served by one background worker
+
+    Messages are spooled to `spool_dir` before they are queued, so anything not
+    yet delivered is picked up again on the next start. The worker keeps one
+    authenticated SMTP session open and reuses it until it has been idle for
+    `idle_timeout` seconds. A message whose send fails is put back with a
+    next-attempt time (exponential backoff) and the worker goes on with the
+    others meanwhile. It is moved to `spool_dir/failed` after `max_attempts`,
+    or at once on a 5xx reply.
+
+    `on_status(message_id, recipient, status, detail)` is called from the
+    worker thread with status "queued", "sent", "retrying" or "failed".
+    """
+
+    def __init__(self, spool_dir="outbox", host=SMTP_HOST, port=SMTP_PORT,
+                 username=SENDER_EMAIL, password=SENDER_PASSWORD, use_tls=True,
+                 max_attempts=5, backoff=2.0, idle_timeout=60.0, on_status=None):
+        self.spool_dir = spool_dir
+        self.failed_dir = os.path.join(spool_dir, "failed")
+        self.session = SMTPSession(host, port, username, password, use_tls)
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.idle_timeout = idle_timeout
+        self.on_status = on_status
+        self._queue = queue.Queue()
+        self._retries = []  # Heap of (monotonic due time, message id); only the worker touches it
+        self._attempts = {}  # message id -> failed attempts so far
+        self._stop = threading.Event()
+        self._thread = None
+
+    # **Public API**
+    def start(self):
+        """ Re-queue spooled messages from a previous run and start the worker """
+        os.makedirs(self.failed_dir, exist_ok=True)
+        # Every spooled message is queued again below, including retries left over from a stop()
+        self._queue, self._retries, self._attempts = queue.Queue(), [], {}
+        for name in sorted(os.listdir(self.spool_dir)):
+            if name.endswith(".eml"):
+                self._queue.put(name[:-4])
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="mail-queue", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """ Stop the worker; undelivered messages stay spooled for the next start """
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def enqueue(self, msg):
+        """ Spool a message and queue it for delivery; returns its message id """
+        message_id = uuid.uuid4().hex
+        path = self._path(message_id)
+        with open(path + ".tmp", "wb") as f:
+            f.write(msg.as_bytes())
+        os.replace(path + ".tmp", path)
+        self._notify(message_id, msg['To'], "queued", "")
+        self._queue.put(message_id)
+        return message_id
+
+    def pending(self):
+        """ Number of messages waiting for delivery, including those waiting to be retried """
+        return self._queue.qsize() + len(self._retries)
+
+    def join(self):
+        """ Block until every queued message has been sent or given up on """
+        self._queue.join()
+
+    # **Worker**
+    def _path(self, message_id):
+        return os.path.join(self.spool_dir, f"{message_id}.eml")
+
+    def _notify(self, message_id, recipient, status, detail):
+        if self.on_status is not None:
+            try:
+                self.on_status(message_id, recipient, status, detail)
+            except Exception as e:
+                print(f"❌ Mail status callback failed: {e}")
+
+    def _deliver(self, message_id):
+        """ One delivery attempt; returns False if the message was put back to be retried """
+        import smtplib
+        from email import message_from_bytes
+
+        path = self._path(message_id)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return True
+        raw = raw.replace(b"\r\n", b"\n").replace(b"\n", b"\r\n")  # smtplib sends bytes as-is; SMTP needs CRLF lines
+        msg = message_from_bytes(raw)
+        recipient = msg['To']
+
+        attempt = self._attempts.get(message_id, 0) + 1
+        start = time.perf_counter()
+        try:
+            self.session.send(msg['From'], recipient, raw)
+        except (smtplib.SMTPException, OSError) as e:
+            SMTP_SECONDS.observe(time.perf_counter() - start, "error")
+            if permanent_failure(e) or attempt >= self.max_attempts:
+                os.replace(path, os.path.join(self.failed_dir, os.path.basename(path)))
+                self._notify(message_id, recipient, "failed", str(e))
+                return True
+            self.session.close()  # The connection may be what failed
+            delay = self.backoff * 2 ** (attempt - 1)
+            self._attempts[message_id] = attempt
+            heapq.heappush(self._retries, (time.monotonic() + delay, message_id))
+            self._notify(message_id, recipient, "retrying", f"attempt {attempt} failed ({e}), retrying in {delay:.0f}s")
+            return False
+        SMTP_SECONDS.observe(time.perf_counter() - start, "sent")
+        os.remove(path)
+        self._notify(message_id, recipient, "sent", "")
+        return True
+
+    def _next(self, idle_since):
+        """ Next message id to deliver: a due retry first, else the queue; None on a timeout or the stop sentinel """
+        now = time.monotonic()
+        if self._retries and self._retries[0][0] <= now:
+            return heapq.heappop(self._retries)[1]
+        timeout = max(idle_since + self.idle_timeout - now, 0.0)
+        if self._retries:
+            timeout = min(timeout, self._retries[0][0] - now)
+        try:
+            message_id = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if message_id is None:
+            self._queue.task_done()
+        return message_id
+
+    def _run(self):
+        idle_since = time.monotonic()
+        while not self._stop.is_set():
+            message_id = self._next(idle_since)
+            if message_id is None:
+                if time.monotonic() - idle_since >= self.idle_timeout:
+                    self.session.close()
+                    idle_since = time.monotonic()
+                continue
+            try:
+                done = self._deliver(message_id)
+            except Exception as e:
+                print(f"❌ Error delivering queued mail {message_id}: {e}")
+                done = True
+            if done:
+                # A message counts as unfinished for join() until it is sent or given up on
+                self._attempts.pop(message_id, None)
+                self._queue.task_done()
+            idle_since = time.monotonic()
+        self.session.close()
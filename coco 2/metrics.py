@@ -0,0 +1,259 @@
+""" Process-wide instrumentation in Prometheus text format, with optional cProfile capture
+
+    estimator_action_seconds         duration of user actions (save, fetch, export, send, update_total, ...)
+    estimator_actions_total          user actions by outcome (done, failed, cancelled)
+    estimator_db_round_trips_total   MongoDB commands and SQLite statements by operation
+    estimator_db_command_seconds     MongoDB command latency
+    estimator_pdf_bytes              size of the PDFs handed out
+    estimator_smtp_send_seconds      SMTP send latency by result
+    estimator_http_request_seconds   HTTP API request latency by route and status
+
+The GUI's TaskExecutor times every background action and the GUI writes
+render() to ESTIMATOR_METRICS_FILE (default ./metrics.prom); the HTTP API
+serves it at /metrics/prometheus. With ESTIMATOR_PROFILE set to a directory
+(or set_profiling() called), each user-level action (PROFILED_ACTIONS: save,
+export, send, ...) is also captured with cProfile into a .prof file there.
+Frequent small actions such as update_total are timed but never profiled.
+
+    python metrics.py show metrics.prom
+    python metrics.py profile profiles/export-20250101-120000-1a2b3c.prof
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BYTE_BUCKETS = (16384, 65536, 262144, 1048576, 4194304, 16777216)  # 16 KB to 16 MB
+METRICS_FILE = "metrics.prom"
+
+REGISTRY = []
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    """ Monotonic count per label set """
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """ Cumulative bucket counts, sum and count per label set """
+
+    def __init__(self, name, help_text, labels=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._values = {}  # label values -> [count per bucket (non-cumulative) + overflow, sum]
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, *label_values):
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts = self._values.get(label_values)
+            if counts is None:
+                counts = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def count(self, *label_values):
+        counts = self._values.get(label_values)
+        return sum(counts[:-1]) if counts else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, counts in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), label_values + (le,))} {cumulative}")
+                labels = _label_text(self.labels, label_values)
+                lines.append(f"{self.name}_sum{labels} {counts[-1]:.6f}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+ACTION_SECONDS = Histogram("estimator_action_seconds", "Duration of user actions.", ("action",))
+ACTIONS = Counter("estimator_actions_total", "User actions by outcome.", ("action", "outcome"))
+DB_ROUND_TRIPS = Counter("estimator_db_round_trips_total", "MongoDB commands and SQLite statements sent.", ("backend", "operation"))
+DB_COMMAND_SECONDS = Histogram("estimator_db_command_seconds", "MongoDB command latency.", ("command",))
+PDF_BYTES = Histogram("estimator_pdf_bytes", "Size of the PDFs handed out.", buckets=BYTE_BUCKETS)
+SMTP_SECONDS = Histogram("estimator_smtp_send_seconds", "SMTP send latency.", ("result",))
+HTTP_SECONDS = Histogram("estimator_http_request_seconds", "HTTP API request latency.", ("route", "status"))
+
+
+def render():
+    """ Every metric in the Prometheus text exposition format """
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path=None):
+    """ Atomically write render() to `path` (default: ESTIMATOR_METRICS_FILE or ./metrics.prom) """
+    path = path or os.environ.get("ESTIMATOR_METRICS_FILE", METRICS_FILE)
+    tmp_path = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+    return path
+
+
+# **Actions**
+def record_action(action, seconds, outcome="done"):
+    ACTION_SECONDS.observe(seconds, action)
+    ACTIONS.inc(action, outcome)
+
+
+@contextmanager
+def timed(action):
+    """ Time the block as `action` (and profile it when profiling is on and it is in PROFILED_ACTIONS); an exception counts as failed """
+    start = time.perf_counter()
+    outcome = "failed"
+    with profiled(action):
+        try:
+            yield
+            outcome = "done"
+        finally:
+            record_action(action, time.perf_counter() - start, outcome)
+
+
+# **Database**
+def sqlite_statement(sql):
+    """ sqlite3 trace callback: count each executed statement by its first keyword """
+    DB_ROUND_TRIPS.inc("sqlite", sql.lstrip().split(None, 1)[0].upper() if sql.strip() else "OTHER")
+
+
+def mongo_command_listener():
+    """ pymongo CommandListener that counts and times every command sent to the server """
+    from pymongo import monitoring
+
+    class CommandMetrics(monitoring.CommandListener):
+        def started(self, event):
+            pass
+
+        def succeeded(self, event):
+            DB_ROUND_TRIPS.inc("mongodb", event.command_name)
+            DB_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+
+        def failed(self, event):
+            DB_ROUND_TRIPS.inc("mongodb", event.command_name)
+            DB_COMMAND_SECONDS.observe(event.duration_micros / 1e6, event.command_name)
+
+    return CommandMetrics()
+
+
+# **Profiling**
+PROFILED_ACTIONS = frozenset({"save", "export", "send", "fetch", "details", "edit", "history"})  # One .prof file each
+_profile_dir = os.environ.get("ESTIMATOR_PROFILE") or None
+_profile_lock = threading.Lock()  # One cProfile capture at a time; overlapping actions are not captured
+
+
+def set_profiling(directory):
+    """ Capture the user-level actions into `directory` with cProfile; None turns capture off """
+    global _profile_dir
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    _profile_dir = directory or None
+
+
+def profiling():
+    """ Directory profiles are captured into, or None """
+    return _profile_dir
+
+
+@contextmanager
+def profiled(action):
+    directory = _profile_dir
+    if directory is None or action not in PROFILED_ACTIONS or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(os.path.join(directory, f"{action}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{threading.get_ident() % 1000000:06d}.prof"))
+    finally:
+        _profile_lock.release()
+
+
+def main(argv=None):
+    import argparse  # This module is on the GUI's start-up path; only the CLI needs argparse
+
+    parser = argparse.ArgumentParser(prog="metrics", description="Show a metrics file or a captured profile.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="print the action timings of a metrics file")
+    show.add_argument("path", nargs="?", default=os.environ.get("ESTIMATOR_METRICS_FILE", METRICS_FILE))
+    profile = commands.add_parser("profile", help="print the slowest functions of a .prof capture")
+    profile.add_argument("path")
+    profile.add_argument("-n", "--limit", type=int, default=25, help="functions to list (default: 25)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "profile":
+            import pstats
+
+            pstats.Stats(args.path).sort_stats("cumulative").print_stats(args.limit)
+            return 0
+        with open(args.path, encoding="utf-8") as f:
+            text = f.read()
+    except OSError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    # Mean duration per action from the _sum and _count samples
+    sums, counts = {}, {}
+    for line in text.splitlines():
+        for suffix, target in (("_sum", sums), ("_count", counts)):
+            prefix = f"estimator_action_seconds{suffix}"
+            if line.startswith(prefix):
+                labels, value = line[len(prefix):].rsplit(" ", 1)
+                target[labels] = float(value)
+    for labels in sorted(counts, key=lambda labels: -sums.get(labels, 0)):
+        if counts[labels]:
+            print(f"{labels:<32} {int(counts[labels]):7d} runs  mean {sums[labels] / counts[labels] * 1000:9.1f} ms")
+    print(f"📄 Full metrics: {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
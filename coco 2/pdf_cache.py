@@ -0,0 +1,268 @@
+""" Two-tier cache of rendered quotation PDFs: an in-memory LRU over a size-bounded directory
+
+Entries are addressed by a content hash of the quotation and the date it is
+rendered on (estimator_core.quotation_key). A quotation that has not changed
+since it was last rendered is therefore served from the cache, whether it is
+re-exported, re-emailed or downloaded again through the API, and whatever ID
+it was stored under. Disk hits are promoted to memory. Both tiers evict the
+least recently used entries once they go over their byte budget. Disk entries
+keep their access order through their modification time.
+
+The disk budget holds for the directory as a whole, so the processes of
+the batch renderer, the campaign and the API can share one cache: writers
+add their bytes to a size file under a lock file in the directory, and the
+writer that takes it over budget rescans the directory and evicts by
+modification time (which also corrects the recorded size).
+
+    python pdf_cache.py stats
+    python pdf_cache.py clear
+"""
+import argparse
+import os
+import sys
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+PDF_CACHE_DIR = "pdf_cache"
+MEMORY_BYTES = 16 * 1024 * 1024
+DISK_BYTES = 256 * 1024 * 1024  # For the whole directory, across processes
+LOCK_FILE = ".lock"
+SIZE_FILE = ".size"
+
+
+class PDFCache:
+    """ Thread-safe PDF cache; `directory=None` keeps it in memory only """
+
+    def __init__(self, directory=PDF_CACHE_DIR, memory_bytes=MEMORY_BYTES, disk_bytes=DISK_BYTES):
+        self.directory = directory
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = OrderedDict()  # key -> bytes, least recently used first
+        self._memory_size = 0
+        self._lock = threading.Lock()
+        self.memory_hits = self.disk_hits = self.misses = 0
+        self.memory_evictions = self.disk_evictions = 0
+
+    # **Memory Tier**
+    def _remember(self, key, data):
+        if len(data) > self.memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_size -= len(old)
+        self._memory[key] = data
+        self._memory_size += len(data)
+        while self._memory_size > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_size -= len(evicted)
+            self.memory_evictions += 1
+
+    # **Disk Tier**
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.pdf")
+
+    @contextmanager
+    def _directory_lock(self):
+        """ Exclusive lock on the cache directory, shared by every process that uses it """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, LOCK_FILE), "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _recorded_size(self):
+        """ Bytes on disk as last recorded by any process (call with the directory lock held) """
+        try:
+            with open(os.path.join(self.directory, SIZE_FILE), encoding="ascii") as f:
+                return int(f.read().strip() or 0)
+        except (OSError, ValueError):
+            return None
+
+    def _record_size(self, size):
+        path = os.path.join(self.directory, SIZE_FILE)
+        with open(f"{path}.tmp", "w", encoding="ascii") as f:
+            f.write(str(size))
+        os.replace(f"{path}.tmp", path)
+
+    def _scan(self):
+        """ [(mtime, path, size)] of the cached PDFs, oldest access first """
+        entries = []
+        if os.path.isdir(self.directory):
+            for shard in os.scandir(self.directory):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(".pdf"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:  # Evicted by another process meanwhile
+                            continue
+                        entries.append((stat.st_mtime, entry.path, stat.st_size))
+        entries.sort()
+        return entries
+
+    def _evict(self):
+        """ Remove the least recently used files until the directory fits the budget; returns its size """
+        entries = self._scan()
+        size = sum(entry_size for _, _, entry_size in entries)
+        for _, path, entry_size in entries[:-1]:  # Always keep the newest entry
+            if size <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= entry_size
+            with self._lock:
+                self.disk_evictions += 1
+        return size
+
+    def _read_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Record the access for the eviction order
+        except OSError:
+            return None
+        return data
+
+    def _write_disk(self, key, data):
+        path = self._path(key)
+        if os.path.exists(path):
+            return  # Same key, same bytes
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            # The budget covers the directory, whichever processes write to it
+            with self._directory_lock():
+                size = self._recorded_size()
+                size = self._evict() if size is None or size + len(data) > self.disk_bytes else size + len(data)
+                self._record_size(size)
+        except OSError as e:
+            print(f"❌ Could not write {path} to the PDF cache: {e}")
+
+    # **Public Interface**
+    def get(self, key):
+        """ Cached PDF bytes for `key`, or None """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return data
+
+        data = self._read_disk(key) if self.directory else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+                self._remember(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        if self.directory:
+            self._write_disk(key, data)
+
+    def get_or_render(self, key, render):
+        """ Cached PDF for `key`, calling render() and storing its bytes on a miss """
+        data = self.get(key)
+        if data is None:
+            data = render()
+            self.put(key, data)
+        return data
+
+    def stats(self):
+        disk = self._scan() if self.directory else []
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_size,
+                "memory_evictions": self.memory_evictions,
+                "disk_entries": len(disk),
+                "disk_bytes": sum(size for _, _, size in disk),
+                "disk_evictions": self.disk_evictions,
+            }
+
+    def clear(self):
+        """ Drop every entry from both tiers """
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        if self.directory and os.path.isdir(self.directory):
+            with self._directory_lock():
+                for _, path, _ in self._scan():
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+                self._record_size(0)
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """ Process-wide PDF cache in ESTIMATOR_PDF_CACHE (default: ./pdf_cache) """
+    global _pdf_cache
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                _pdf_cache = PDFCache(os.environ.get("ESTIMATOR_PDF_CACHE", PDF_CACHE_DIR))
+    return _pdf_cache
+
+
+def set_pdf_cache(cache):
+    """ Replace the process-wide PDF cache (e.g. with a memory-only one in tests) """
+    global _pdf_cache
+    _pdf_cache = cache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pdf_cache", description="Inspect or clear the on-disk PDF cache.")
+    parser.add_argument("command", choices=("stats", "clear"))
+    parser.add_argument("--dir", default=os.environ.get("ESTIMATOR_PDF_CACHE", PDF_CACHE_DIR), help="cache directory (default: ESTIMATOR_PDF_CACHE or ./pdf_cache)")
+    args = parser.parse_args(argv)
+
+    cache = PDFCache(args.dir)
+    if args.command == "clear":
+        entries = cache.stats()["disk_entries"]
+        cache.clear()
+        print(f"✅ Removed {entries} cached PDFs from {args.dir}")
+    else:
+        stats = cache.stats()
+        print(f"📄 {stats['disk_entries']} cached PDFs, {stats['disk_bytes'] / 1024 / 1024:.1f} MB of {cache.disk_bytes / 1024 / 1024:.0f} MB in {args.dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+""" Streaming PDF export for very large quotations (bills of quantities with thousands of line items)
+
+build_pdf lays the whole quotation out as one FPDF document, which keeps every
+page in memory and then assembles the complete file as one more buffer. The
+streaming writer here instead writes each page to the output as soon as it is
+full, so memory stays flat however many line items there are. Only the byte
+offsets of the pages already written (16 bytes per page) are kept for the
+cross-reference table at the end.
+
+Line items are read from iterables, so they can come from generators (see
+estimator_core.iter_line_items) and never all be in memory at once. Tables
+continue across pages with their header repeated. Each page that breaks a
+table ends with a page subtotal, and the next page starts with the amount
+brought forward.
+
+    python estimate.py bill.csv -o bill.pdf
+    python estimate.py quote.json --stream
+"""
+import zlib
+from array import array
+from datetime import date
+
+from estimator_core import COLUMN_WIDTHS, COMPANY_NAME, get_template, safe_text
+from metrics import PDF_BYTES
+
+PAGE_WIDTH, PAGE_HEIGHT = 210.0, 297.0  # A4 in mm, as FPDF()
+MARGIN = 10.0  # Left, top and right margin (mm)
+CELL_MARGIN = 1.0  # Text inset inside a cell (mm)
+BOTTOM = PAGE_HEIGHT - 20.0  # Content ends 2 cm above the page edge, like FPDF's auto page break
+ROW_HEIGHT = 10.0
+SCALE = 72 / 25.4  # Points per mm
+FONTS = {False: ("F1", "Helvetica"), True: ("F2", "Helvetica-Bold")}
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").replace("\r", "\\r")
+
+
+class StreamingPDF:
+    """ Minimal single-pass PDF writer with FPDF-style cell layout (positions in mm) that writes page by page to `out`
+
+    Object 1 is the page tree and object 2 the shared resources; both are
+    written by close() once the number of pages is known. Each page is a page
+    object followed by its (compressed) content stream.
+    """
+
+    def __init__(self, out, compress=True):
+        from fpdf import FPDF
+
+        self.out = out
+        self.compress = compress
+        self.bytes_written = 0
+        self.pages = 0
+        self.x = self.y = MARGIN
+        self._offsets = array("Q", [0, 0, 0])  # object number -> byte offset; objects 1 and 2 are filled in by close()
+        self._content = None
+        self._font = (False, 12)
+        self._measure = FPDF()  # Only for the core font metrics of get_string_width
+        self._measure.set_font("Arial", size=12)
+        self._write(b"%PDF-1.3\n%\xe2\xe3\xcf\xd3\n")
+
+    def _write(self, data):
+        self.out.write(data)
+        self.bytes_written += len(data)
+
+    def _object(self, number, body):
+        self._offsets[number] = self.bytes_written
+        self._write(f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n")
+
+    def add_page(self):
+        self._finish_page()
+        self.pages += 1
+        self._content = []
+        self.x = self.y = MARGIN
+        self.set_font(*self._font)
+
+    def _finish_page(self):
+        if self._content is None:
+            return
+        stream = "\n".join(self._content).encode("latin-1")
+        self._content = None
+        page = len(self._offsets)
+        self._offsets.extend((0, 0))
+        self._object(page, (f"<</Type /Page /Parent 1 0 R /MediaBox [0 0 {PAGE_WIDTH * SCALE:.2f} {PAGE_HEIGHT * SCALE:.2f}]"
+                            f" /Resources 2 0 R /Contents {page + 1} 0 R>>").encode("latin-1"))
+        if self.compress:
+            stream = zlib.compress(stream)
+            self._object(page + 1, f"<</Filter /FlateDecode /Length {len(stream)}>>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        else:
+            self._object(page + 1, f"<</Length {len(stream)}>>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+
+    def set_font(self, bold=False, size=12):
+        self._font = (bold, size)
+        self._measure.set_font("Arial", style="B" if bold else "", size=size)
+        self._content.append(f"BT /{FONTS[bold][0]} {size:.2f} Tf ET")
+
+    def space_left(self):
+        """ mm of content height left on the current page """
+        return BOTTOM - self.y
+
+    def cell(self, w, h, text="", border=0, ln=False, align=""):
+        """ Like FPDF.cell without automatic page breaks; w=0 extends to the right margin """
+        if w == 0:
+            w = PAGE_WIDTH - MARGIN - self.x
+        if border:
+            self._content.append(f"{self.x * SCALE:.2f} {(PAGE_HEIGHT - self.y) * SCALE:.2f} {w * SCALE:.2f} {-h * SCALE:.2f} re S")
+        if text:
+            if align == "C":
+                dx = (w - self._measure.get_string_width(text)) / 2
+            elif align == "R":
+                dx = w - CELL_MARGIN - self._measure.get_string_width(text)
+            else:
+                dx = CELL_MARGIN
+            baseline = self.y + 0.5 * h + 0.3 * self._font[1] / SCALE
+            self._content.append(f"BT {(self.x + dx) * SCALE:.2f} {(PAGE_HEIGHT - baseline) * SCALE:.2f} Td ({_escape(text)}) Tj ET")
+        if ln:
+            self.ln(h)
+        else:
+            self.x += w
+
+    def ln(self, h=ROW_HEIGHT):
+        self.x = MARGIN
+        self.y += h
+
+    def close(self):
+        """ Write the last page, the page tree, the fonts and the cross-reference table """
+        self._finish_page()
+        fonts = len(self._offsets)
+        self._offsets.extend((0, 0))
+        for number, (_, base_font) in enumerate(FONTS.values(), fonts):
+            self._object(number, f"<</Type /Font /BaseFont /{base_font} /Subtype /Type1 /Encoding /WinAnsiEncoding>>".encode("latin-1"))
+        font_refs = " ".join(f"/{name} {number} 0 R" for number, (name, _) in enumerate(FONTS.values(), fonts))
+        self._object(2, f"<</ProcSet [/PDF /Text] /Font <<{font_refs}>>>>".encode("latin-1"))
+        kids = " ".join(f"{3 + 2 * page} 0 R" for page in range(self.pages))
+        self._object(1, f"<</Type /Pages /Kids [{kids}] /Count {self.pages}>>".encode("latin-1"))
+        catalog = len(self._offsets)
+        self._offsets.append(0)
+        self._object(catalog, b"<</Type /Catalog /Pages 1 0 R>>")
+
+        xref = self.bytes_written
+        count = len(self._offsets)
+        self._write(f"xref\n0 {count}\n0000000000 65535 f \n".encode("latin-1"))
+        self._write("".join(f"{offset:010d} 00000 n \n" for offset in self._offsets[1:]).encode("latin-1"))
+        self._write(f"trailer\n<</Size {count} /Root {count - 1} 0 R>>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1"))
+        return self.bytes_written
+
+
+def _table(pdf, title, heads, rows):
+    """ Lay out one line item table across as many pages as it needs; returns the table total
+
+    A table that breaks across pages ends every page with its subtotal and
+    closes with the table total.
+    """
+    def head(continued):
+        pdf.set_font(True, 12)
+        pdf.cell(200, ROW_HEIGHT, f"{title} (continued)" if continued else title, ln=True)
+        pdf.set_font(False, 10)
+        for width, text in zip(COLUMN_WIDTHS, heads):
+            pdf.cell(width, ROW_HEIGHT, text, border=1, align="C")
+        pdf.ln()
+
+    def total_row(label, amount):
+        pdf.set_font(True, 10)
+        pdf.cell(sum(COLUMN_WIDTHS[:-1]), ROW_HEIGHT, label, border=1, align="R")
+        pdf.cell(COLUMN_WIDTHS[-1], ROW_HEIGHT, f"{amount:.2f}", border=1, ln=True)
+        pdf.set_font(False, 10)
+
+    if pdf.space_left() < 3 * ROW_HEIGHT:  # Title, header and at least one row
+        pdf.add_page()
+    head(False)
+    total = page_total = 0.0
+    broken = False
+    for cells, amount in rows:
+        # Keep one row free for the page subtotal
+        if pdf.space_left() < 2 * ROW_HEIGHT:
+            total_row("Page subtotal", page_total)
+            pdf.add_page()
+            head(True)
+            total_row("Brought forward", total)
+            page_total = 0.0
+            broken = True
+        for width, text in zip(COLUMN_WIDTHS, cells):
+            pdf.cell(width, ROW_HEIGHT, text, border=1)
+        pdf.ln()
+        total += amount
+        page_total += amount
+    if broken:
+        total_row("Page subtotal", page_total)  # The row kept free above
+        if pdf.space_left() < ROW_HEIGHT:
+            pdf.add_page()
+        total_row(f"{title} total", total)
+    return total
+
+
+def _floor_rows(floors):
+    for floor in floors:
+        yield (safe_text(floor.name), str(floor.area_sqft), str(floor.cost_per_sqft), f"{floor.total_cost:.2f}"), floor.total_cost
+
+
+def _extra_work_rows(extra_works):
+    for work in extra_works:
+        yield (safe_text(work.name), str(work.quantity), str(work.cost_per_unit), f"{work.total_cost:.2f}"), work.total_cost
+
+
+def stream_pdf(quotation, out, floors=None, extra_works=None, compress=True):
+    """ Write the quotation PDF to the binary file `out` page by page; returns (pages, bytes written, total cost)
+
+    `floors` and `extra_works` are iterables of FloorItem / ExtraWorkItem
+    (default: the quotation's own lists) and are consumed once, in order.
+    The total is summed from them, so `quotation` only needs its customer fields.
+    """
+    template = get_template(date.today().strftime('%Y-%m-%d'))
+    pdf = StreamingPDF(out, compress)
+    pdf.add_page()
+
+    # 🏠 **Header Section**
+    pdf.set_font(True, 16)
+    pdf.cell(200, ROW_HEIGHT, COMPANY_NAME, ln=True, align="C")
+    pdf.set_font(False, 12)
+    for line in template.header_lines:
+        pdf.cell(200, ROW_HEIGHT, line, ln=True, align="C")
+    pdf.ln(10)
+
+    # 🧑 **Customer Information**
+    pdf.set_font(True, 12)
+    pdf.cell(200, ROW_HEIGHT, "Customer Information", ln=True)
+    pdf.set_font(False, 10)
+    for label, value in (("Customer Name:", quotation.customer_name), ("Building Site:", quotation.building_site),
+                         ("Validity Date:", quotation.validity_date)):
+        pdf.cell(60, ROW_HEIGHT, label)
+        pdf.cell(140, ROW_HEIGHT, safe_text(value), ln=True)
+
+    # 🏢 **Line Item Tables**
+    total = _table(pdf, "Floor Details", template.floor_heads,
+                   _floor_rows(quotation.floors if floors is None else floors))
+    total += _table(pdf, "Extra Works Details", template.extra_heads,
+                    _extra_work_rows(quotation.extra_works if extra_works is None else extra_works))
+
+    # 📊 **Total Project Cost**
+    if pdf.space_left() < ROW_HEIGHT:
+        pdf.add_page()
+    pdf.set_font(True, 12)
+    pdf.cell(200, ROW_HEIGHT, f"Total Project Cost: {total:.2f}", ln=True, align="C")
+
+    # 📄 **Add Note**
+    pdf.ln(10)
+    pdf.set_font(False, 10)
+    for line in template.note_lines:
+        if pdf.space_left() < ROW_HEIGHT:
+            pdf.add_page()
+        pdf.cell(0, ROW_HEIGHT, line, ln=True)
+
+    size = pdf.close()
+    PDF_BYTES.observe(size)
+    return pdf.pages, size, total
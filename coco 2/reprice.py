@@ -0,0 +1,222 @@
+""" Rate-revision what-if: reprice every stored quotation against a rate table (requires numpy)
+
+The rate table is a JSON file with optional "floors" and "extra_works"
+sections mapping a line item name (case-insensitive) or "*" (any other
+item) to either a new rate in rupees or a percentage shock string:
+
+    {"floors": {"*": "+6%", "Ground Floor": 1950},
+     "extra_works": {"Compound wall": "+12.5%"}}
+
+Quotations are streamed from the repository in chunks. Each chunk is
+flattened into a BillOfQuantities grouped by quotation and priced twice,
+old and new rates, in vectorized passes. Only one chunk is held in memory at a time.
+
+Missing or null quantities and rates count as 0. A quotation with an amount
+that is not a number is not priced; its row in the report names the field in
+the error column.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from decimal import Decimal
+
+import numpy as np
+
+from boq import EXTRA_WORK, FLOOR, BillOfQuantities, format_paise, to_milli, to_paise
+from storage import get_repository, open_repository
+
+# The quotation terms make the client bear material rate increases above this
+THRESHOLD_PCT = 5.0
+
+DELTA_FIELDS = ("quote_id", "email", "customer_name", "old_total", "new_total", "delta", "delta_pct", "over_threshold", "error")
+# category, document field, quantity field, rate field
+SECTIONS = ((FLOOR, "floors", "area_sqft", "cost_per_sqft"), (EXTRA_WORK, "extra_works", "quantity", "cost_per_unit"))
+LINE_FIELDS = ("email", "customer_name",
+               "floors.name", "floors.area_sqft", "floors.cost_per_sqft",
+               "extra_works.name", "extra_works.quantity", "extra_works.cost_per_unit")
+
+
+class RateTable:
+    """ Per-category rules: name -> ("rate", paise) or ("shock", basis points) """
+
+    def __init__(self, rules):
+        self.rules = {}
+        for category, section in ((FLOOR, "floors"), (EXTRA_WORK, "extra_works")):
+            self.rules[category] = {name.strip().lower(): self._parse(value)
+                                    for name, value in rules.get(section, {}).items()}
+
+    @staticmethod
+    def _parse(value):
+        if isinstance(value, str) and value.strip().endswith("%"):
+            pct = Decimal(value.strip()[:-1])
+            return "shock", int(pct * 100)
+        return "rate", to_paise(value)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def rule(self, category, name):
+        rules = self.rules[category]
+        return rules.get(name.strip().lower(), rules.get("*"))
+
+    def apply(self, bill):
+        """ New per-line rates (paise) for a bill, computed once per distinct item name """
+        n = len(bill)
+        codes = np.empty(n, dtype=np.intp)
+        lookup = {}
+        absolute, shock_bp, is_absolute = [], [], []
+        for i, (category, name) in enumerate(zip(bill.category[:n].tolist(), bill.names)):
+            key = (category, name)
+            code = lookup.get(key)
+            if code is None:
+                code = lookup[key] = len(absolute)
+                kind, value = self.rule(category, name) or ("shock", 0)
+                is_absolute.append(kind == "rate")
+                absolute.append(value if kind == "rate" else 0)
+                shock_bp.append(value if kind == "shock" else 0)
+            codes[i] = code
+
+        old = bill.rate_paise[:n]
+        shocked = (old * (10000 + np.asarray(shock_bp, dtype=np.int64)[codes]) + 5000) // 10000
+        return np.where(np.asarray(is_absolute, dtype=bool)[codes], np.asarray(absolute, dtype=np.int64)[codes], shocked)
+
+
+def _lines(items, quantity_field, rate_field):
+    """ (names, quantities, rates) of stored line items; missing or null values count as "" and 0 """
+    items = items or []
+    return ([item.get("name") or "" for item in items], [item.get(quantity_field) or 0 for item in items],
+            [item.get(rate_field) or 0 for item in items])
+
+
+def _unpriceable(document):
+    """ Why a stored quotation's line items cannot be priced, or None """
+    for _, section, quantity_field, rate_field in SECTIONS:
+        _, quantities, rates = _lines(document.get(section), quantity_field, rate_field)
+        for field, values, convert in ((quantity_field, quantities, to_milli), (rate_field, rates, to_paise)):
+            for value in values:
+                try:
+                    convert(value)
+                except (ArithmeticError, ValueError, TypeError):
+                    return f"{section}.{field} {value!r} is not a number"
+    return None
+
+
+def _build_bill(documents, skipped):
+    bill = BillOfQuantities(capacity=max(len(documents) * 4, 1))
+    for position, document in enumerate(documents):
+        if position in skipped:
+            continue
+        for category, section, quantity_field, rate_field in SECTIONS:
+            names, quantities, rates = _lines(document.get(section), quantity_field, rate_field)
+            bill.extend(category, names, quantities, rates, groups=[position] * len(names))
+    return bill
+
+
+def _chunk_bill(documents):
+    """ Bill of a chunk grouped by position, and {position: error} of the quotations left out of it """
+    try:
+        return _build_bill(documents, {}), {}
+    except (ArithmeticError, ValueError, TypeError):
+        # Rare, so only then check the amounts one by one to find the quotations at fault
+        skipped = {}
+        for position, document in enumerate(documents):
+            error = _unpriceable(document)
+            if error:
+                skipped[position] = error
+        return _build_bill(documents, skipped), skipped
+
+
+def reprice_chunk(documents, rate_table, threshold_pct=THRESHOLD_PCT):
+    """ Delta rows (DELTA_FIELDS) for a list of stored quotation documents, plus old and new chunk totals in paise """
+    bill, skipped = _chunk_bill(documents)
+    old_by_doc = bill.compute().by_group
+    new_by_doc = bill.repriced(rate_table.apply(bill)).compute().by_group
+
+    rows = []
+    for position, document in enumerate(documents):
+        if position in skipped:
+            rows.append(dict(dict.fromkeys(DELTA_FIELDS, ""), quote_id=str(document["_id"]), email=document.get("email", ""),
+                             customer_name=document.get("customer_name", ""), over_threshold=False, error=skipped[position]))
+            continue
+        old = old_by_doc.get(position, 0)
+        new = new_by_doc.get(position, 0)
+        delta = new - old
+        pct = delta * 100.0 / old if old else 0.0
+        rows.append({
+            "quote_id": str(document["_id"]),
+            "email": document.get("email", ""),
+            "customer_name": document.get("customer_name", ""),
+            "old_total": f"{old / 100:.2f}",
+            "new_total": f"{new / 100:.2f}",
+            "delta": f"{delta / 100:.2f}",
+            "delta_pct": f"{pct:.2f}",
+            "over_threshold": pct > threshold_pct,
+            "error": "",
+        })
+    return rows, sum(old_by_doc.values()), sum(new_by_doc.values())
+
+
+def run_reprice(repository, rate_table, output, chunk_size=5000, threshold_pct=THRESHOLD_PCT, report=print):
+    """ Reprice every stored quotation and write delta rows to the CSV `output`; returns (count, flagged, seconds)
+
+    `count` includes the quotations that could not be priced (rows with an error).
+    """
+    count = flagged = failed = 0
+    old_sum = new_sum = 0
+    start = time.perf_counter()
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=DELTA_FIELDS)
+        writer.writeheader()
+
+        chunk = []
+        documents = repository.iter_documents(LINE_FIELDS, batch_size=chunk_size)
+        while True:
+            document = next(documents, None)
+            if document is not None:
+                chunk.append(document)
+            if chunk and (document is None or len(chunk) >= chunk_size):
+                rows, old_total, new_total = reprice_chunk(chunk, rate_table, threshold_pct)
+                writer.writerows(rows)
+                count += len(rows)
+                flagged += sum(1 for row in rows if row["over_threshold"])
+                failed += sum(1 for row in rows if row["error"])
+                old_sum += old_total
+                new_sum += new_total
+                chunk = []
+            if document is None:
+                break
+    elapsed = time.perf_counter() - start
+
+    report(f"✅ {count} quotations repriced in {elapsed:.1f}s ({count / elapsed if elapsed > 0 else 0:.0f} quotes/sec): "
+           f"{format_paise(old_sum)} -> {format_paise(new_sum)}, {flagged} over the {threshold_pct:g}% threshold")
+    if failed:
+        report(f"❌ {failed} quotations could not be priced; see the error column of {output}")
+    return count, flagged, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="reprice", description="Reprice all stored quotations against a rate table.")
+    parser.add_argument("rates", help="rate table JSON file")
+    parser.add_argument("-o", "--output", default="reprice_deltas.csv", help="delta report (CSV)")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD_PCT, help=f"flag quotes rising more than this %% (default: {THRESHOLD_PCT:g})")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="quotations priced per vectorized pass")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    args = parser.parse_args(argv)
+
+    try:
+        rate_table = RateTable.load(args.rates)
+    except (OSError, ValueError, ArithmeticError) as e:
+        print(f"❌ {args.rates}: {e}", file=sys.stderr)
+        return 1
+
+    repository = open_repository(args.db) if args.db else get_repository()
+    run_reprice(repository, rate_table, args.output, args.chunk_size, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
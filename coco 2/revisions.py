@@ -0,0 +1,240 @@
+""" Quotation revision history stored as compact line-item deltas
+
+The newest revision of a quotation is the full document in the quotations
+collection, so lists, lookups and indexes only ever see one document per
+quotation. When a new revision is saved, the one it replaces is kept as a
+revision record holding a reverse delta: the field changes plus keep / drop /
+add runs over the floors and extra works that turn the newer revision back
+into it. Every SNAPSHOT_INTERVAL-th revision is recorded in full instead, so
+rebuilding any revision replays fewer than SNAPSHOT_INTERVAL deltas.
+
+    python revisions.py history <quote id>
+    python revisions.py show <quote id> <revision>
+    python revisions.py diff <quote id> <from revision> [<to revision>]
+"""
+import argparse
+import difflib
+import json
+import sys
+
+SNAPSHOT_INTERVAL = 10
+ITEM_LISTS = ("floors", "extra_works")
+# Bookkeeping kept on the stored document; not part of a revision's content
+STORAGE_FIELDS = ("_id", "content_key", "created_at", "updated_at", "revision")
+
+ITEM_LABELS = {"floors": "Floor", "extra_works": "Extra work"}
+FIELD_LABELS = {"email": "Email", "customer_name": "Customer name", "building_site": "Building site",
+                "validity_date": "Validity date", "total_project_cost": "Total project cost",
+                "catalogue_version": "Rate catalogue version"}
+
+
+def _item_key(item):
+    return tuple(sorted(item.items()))
+
+
+def _content(document):
+    return {field: value for field, value in document.items() if field not in STORAGE_FIELDS}
+
+
+def make_delta(source, target):
+    """ Delta that turns document `source` into document `target` (see apply_delta) """
+    source, target = _content(source), _content(target)
+    delta = {}
+    changed = {field: value for field, value in target.items()
+               if field not in ITEM_LISTS and (field not in source or source[field] != value)}
+    removed = sorted(field for field in source if field not in ITEM_LISTS and field not in target)
+    if changed:
+        delta["set"] = changed
+    if removed:
+        delta["unset"] = removed
+
+    for name in ITEM_LISTS:
+        old, new = source.get(name) or [], target.get(name) or []
+        if old == new:
+            continue
+        ops = []
+        matcher = difflib.SequenceMatcher(None, [_item_key(item) for item in old], [_item_key(item) for item in new], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                ops.append(["keep", i2 - i1])
+                continue
+            if i2 > i1:
+                ops.append(["drop", i2 - i1])
+            if j2 > j1:
+                ops.append(["add", new[j1:j2]])
+        delta[name] = ops
+    return delta
+
+
+def apply_delta(document, delta):
+    """ New document from `document` and a delta made by make_delta """
+    unset = delta.get("unset", ())
+    result = {field: value for field, value in document.items() if field not in unset}
+    result.update(delta.get("set", {}))
+    for name in ITEM_LISTS:
+        ops = delta.get(name)
+        if ops is None:
+            continue
+        old = document.get(name) or []
+        items = []
+        position = 0
+        for op, arg in ops:
+            if op == "keep":
+                items.extend(old[position:position + arg])
+                position += arg
+            elif op == "drop":
+                position += arg
+            else:
+                items.extend(arg)
+        result[name] = items
+    return result
+
+
+def revision_record(revision, replaced, replacement):
+    """ Record that preserves revision `revision` (the document `replaced`) once `replacement` supersedes it """
+    record = {"revision": revision, "saved_at": replaced.get("updated_at") or replaced.get("created_at")}
+    if revision % SNAPSHOT_INTERVAL == 0:
+        record["snapshot"] = _content(replaced)
+    else:
+        record["delta"] = make_delta(replacement, replaced)
+    return record
+
+
+def rebuild(head, records, revision):
+    """ Document of `revision` from the current document and the records of revisions `revision` and up, oldest first
+
+    Replay starts at the first snapshot at or after `revision` (or at the
+    current document if there is none) and applies the reverse deltas back down.
+    """
+    chain = []
+    document = head
+    for record in records:
+        if "snapshot" in record:
+            document = dict(record["snapshot"])
+            break
+        chain.append(record)
+    for record in reversed(chain):
+        document = apply_delta(document, record["delta"])
+
+    document = _content(document)
+    document["_id"] = head.get("_id")
+    document["revision"] = revision
+    return document
+
+
+def _describe(name, item):
+    if name == "floors":
+        return f"{item.get('name')}: {item.get('area_sqft')} sqft x ₹{item.get('cost_per_sqft')} = ₹{item.get('total_cost')}"
+    return f"{item.get('name')}: Qty {item.get('quantity')} @ ₹{item.get('cost_per_unit')} = ₹{item.get('total_cost')}"
+
+
+def diff_documents(old, new):
+    """ Changes from revision document `old` to `new` as dicts with section, change, name, old and new """
+    changes = []
+    old_content, new_content = _content(old), _content(new)
+    for field in sorted((set(old_content) | set(new_content)) - set(ITEM_LISTS)):
+        if old_content.get(field) != new_content.get(field):
+            changes.append({"section": "fields", "change": "changed", "name": field,
+                            "old": old_content.get(field), "new": new_content.get(field)})
+
+    for name in ITEM_LISTS:
+        old_items, new_items = old.get(name) or [], new.get(name) or []
+        matcher = difflib.SequenceMatcher(None, [_item_key(item) for item in old_items], [_item_key(item) for item in new_items], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                continue
+            added = list(new_items[j1:j2])
+            for item in old_items[i1:i2]:
+                # An item with the same name in the replacement run was edited, not removed
+                match = next((candidate for candidate in added if candidate.get("name") == item.get("name")), None)
+                if match is not None:
+                    added.remove(match)
+                    changes.append({"section": name, "change": "changed", "name": item.get("name"), "old": item, "new": match})
+                else:
+                    changes.append({"section": name, "change": "removed", "name": item.get("name"), "old": item, "new": None})
+            for item in added:
+                changes.append({"section": name, "change": "added", "name": item.get("name"), "old": None, "new": item})
+    return changes
+
+
+def format_diff(changes):
+    """ One readable line per change from diff_documents """
+    if not changes:
+        return ["No changes."]
+    lines = []
+    for change in changes:
+        section = change["section"]
+        if section == "fields":
+            label = FIELD_LABELS.get(change["name"], change["name"])
+            lines.append(f"~ {label}: {change['old']} → {change['new']}")
+        elif change["change"] == "added":
+            lines.append(f"+ {ITEM_LABELS[section]} {_describe(section, change['new'])}")
+        elif change["change"] == "removed":
+            lines.append(f"- {ITEM_LABELS[section]} {_describe(section, change['old'])}")
+        else:
+            lines.append(f"~ {ITEM_LABELS[section]} {_describe(section, change['old'])} → {_describe(section, change['new'])}")
+    return lines
+
+
+def revision_history(repository, quote_id):
+    """ [(revision, saved_at, changes from the previous revision or None for the first)], oldest first """
+    history = []
+    previous = None
+    for revision, saved_at in repository.list_revisions(quote_id):
+        document = repository.get_revision(quote_id, revision)
+        history.append((revision, saved_at, diff_documents(previous, document) if previous else None))
+        previous = document
+    return history
+
+
+def main(argv=None):
+    from storage import get_repository, open_repository
+
+    parser = argparse.ArgumentParser(prog="revisions", description="Show the revision history of a stored quotation.")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    history = commands.add_parser("history", help="list the revisions of a quotation with their changes")
+    history.add_argument("quote_id")
+    show = commands.add_parser("show", help="print one revision as JSON")
+    show.add_argument("quote_id")
+    show.add_argument("revision", type=int)
+    diff = commands.add_parser("diff", help="changes between two revisions (default: up to the current one)")
+    diff.add_argument("quote_id")
+    diff.add_argument("old", type=int)
+    diff.add_argument("new", type=int, nargs="?")
+    args = parser.parse_args(argv)
+
+    repository = open_repository(args.db) if args.db else get_repository()
+    revisions = repository.list_revisions(args.quote_id)
+    if not revisions:
+        print(f"❌ Quotation {args.quote_id} not found.", file=sys.stderr)
+        return 1
+
+    if args.command == "history":
+        for revision, saved_at, changes in revision_history(repository, args.quote_id):
+            print(f"🔹 Revision {revision} ({saved_at})")
+            for line in (format_diff(changes) if changes is not None else ["Created."]):
+                print(f"   {line}")
+        return 0
+
+    if args.command == "show":
+        document = repository.get_revision(args.quote_id, args.revision)
+        if document is None:
+            print(f"❌ Quotation {args.quote_id} has no revision {args.revision}.", file=sys.stderr)
+            return 1
+        print(json.dumps(document, indent=2, default=str))
+        return 0
+
+    new = args.new or revisions[-1][0]
+    old_document = repository.get_revision(args.quote_id, args.old)
+    new_document = repository.get_revision(args.quote_id, new)
+    if old_document is None or new_document is None:
+        print(f"❌ Quotation {args.quote_id} has revisions 1 to {revisions[-1][0]}.", file=sys.stderr)
+        return 1
+    for line in format_diff(diff_documents(old_document, new_document)):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
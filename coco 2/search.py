@@ -0,0 +1,305 @@
+""" Ranked, typo-tolerant search over customer names, building sites and line item names (requires numpy)
+
+The index maps every word of those fields to the quotations it occurs in, per
+field. A query word is expanded to the indexed words that equal it, start
+with it, or share enough trigrams with it (so "vikrm" still finds "Vikram"),
+and each quotation scores the field weight x similarity x rarity of its best
+match for every query word. Scores are accumulated in numpy arrays, so a query
+touches only the postings of the expanded words.
+
+The process-wide index is built from the repository on first use. Saves of
+this process are indexed as they happen (update_search_index); quotations
+saved or revised by other processes (the GUI, import_quotes.py, another
+service) are picked up by created_at / updated_at at most REFRESH_INTERVAL
+seconds later, on the next search. Until the index is built,
+search_quotations falls back to the database's own text search.
+
+    python search.py "vikram nagar"
+"""
+import argparse
+import bisect
+import math
+import re
+import sys
+import threading
+import time
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+# Field -> weight; a customer name match outranks a site match, which outranks a line item
+FIELD_WEIGHTS = {"customer_name": 3.0, "building_site": 2.0, "floors.name": 1.0, "extra_works.name": 1.0}
+INDEX_FIELDS = tuple(FIELD_WEIGHTS)
+MIN_SIMILARITY = 0.3  # Trigram similarity below which a word is not a fuzzy match
+MAX_EXPANSIONS = 50  # Indexed words one query word may expand to
+WORD = re.compile(r"\w+")
+REFRESH_INTERVAL = 30.0  # Seconds between checks for quotations saved by other processes
+REFRESH_OVERLAP = timedelta(minutes=2)  # Changes are re-read this far back, for clock skew between writers and late commits
+
+
+def words(text):
+    """ Lower-cased words of a field value """
+    return WORD.findall(str(text or "").lower())
+
+
+def trigrams(word):
+    """ Trigrams of a word padded like pg_trgm, so short words and word starts count """
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _field_words(document):
+    yield "customer_name", words(document.get("customer_name"))
+    yield "building_site", words(document.get("building_site"))
+    for field, items in (("floors.name", "floors"), ("extra_works.name", "extra_works")):
+        yield field, [word for item in document.get(items) or [] for word in words(item.get("name"))]
+
+
+class SearchIndex:
+    """ In-memory word index with trigram lookup for fuzzy matches; thread-safe """
+
+    def __init__(self):
+        self.quote_ids = []  # ordinal -> quote id
+        self._ordinals = {}  # quote id -> current ordinal
+        self._alive = bytearray()  # ordinal -> 1, or 0 once the quotation was re-indexed under a new ordinal
+        self._vocabulary = {}  # word -> word number
+        self._trigram_counts = array("H")  # word number -> number of trigrams
+        self._sorted_words = []  # for prefix matches; None while bulk loading
+        self._trigrams = {}  # trigram -> array of word numbers
+        self._postings = {}  # (field, word number) -> array of ordinals
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ordinals)
+
+    @classmethod
+    def build(cls, documents):
+        """ Index of an iterable of documents with an "_id" """
+        index = cls()
+        index._sorted_words = None  # Sorted once at the end instead of an insort per new word
+        for document in documents:
+            index._add(str(document["_id"]), document)  # Not shared yet, so no locking
+        index._sorted_words = sorted(index._vocabulary)
+        return index
+
+    def _new_word(self, word):
+        number = self._vocabulary[word] = len(self._vocabulary)
+        word_trigrams = trigrams(word)
+        self._trigram_counts.append(min(len(word_trigrams), 65535))
+        for trigram in word_trigrams:
+            self._trigrams.setdefault(trigram, array("I")).append(number)
+        if self._sorted_words is not None:
+            bisect.insort(self._sorted_words, word)
+        return number
+
+    def add(self, quote_id, document):
+        """ Index a stored quotation, replacing what was indexed for it before """
+        with self._lock:
+            self._add(quote_id, document)
+
+    def _add(self, quote_id, document):
+        old = self._ordinals.get(quote_id)
+        if old is not None:
+            self._alive[old] = 0
+        ordinal = len(self.quote_ids)
+        self.quote_ids.append(quote_id)
+        self._alive.append(1)
+        self._ordinals[quote_id] = ordinal
+        vocabulary, postings = self._vocabulary, self._postings
+        for field, field_words in _field_words(document):
+            for word in set(field_words):
+                number = vocabulary.get(word)
+                if number is None:
+                    number = self._new_word(word)
+                key = (field, number)
+                posting = postings.get(key)
+                if posting is None:
+                    posting = postings[key] = array("I")
+                posting.append(ordinal)
+
+    def _expand(self, word):
+        """ [(word number, similarity)] of the indexed words that match `word`, best first """
+        matches = {}
+        start = bisect.bisect_left(self._sorted_words, word)
+        for candidate in self._sorted_words[start:start + MAX_EXPANSIONS]:
+            if not candidate.startswith(word):
+                break
+            matches[self._vocabulary[candidate]] = 0.5 + 0.5 * len(word) / len(candidate)  # 1.0 for the word itself
+
+        query_trigrams = trigrams(word)
+        shared = Counter()
+        for trigram in query_trigrams:
+            shared.update(self._trigrams.get(trigram, ()))
+        for number, count in shared.items():
+            similarity = count / (len(query_trigrams) + self._trigram_counts[number] - count)
+            if similarity >= MIN_SIMILARITY and similarity > matches.get(number, 0.0):
+                matches[number] = similarity
+        return sorted(matches.items(), key=lambda match: -match[1])[:MAX_EXPANSIONS]
+
+    def search(self, query, limit=20):
+        """ [(quote id, score)] of the best matches for `query`, best first """
+        import numpy as np
+
+        terms = list(dict.fromkeys(words(query)))
+        with self._lock:
+            if not terms or not self._ordinals or limit < 1:
+                return []
+            if self._sorted_words is None:
+                self._sorted_words = sorted(self._vocabulary)
+            size = len(self.quote_ids)
+            scores = np.zeros(size, dtype=np.float32)
+            for term in terms:
+                # Best match per quotation for this word, so a word matching twice is not counted twice
+                term_scores = np.zeros(size, dtype=np.float32)
+                for number, similarity in self._expand(term):
+                    for field, weight in FIELD_WEIGHTS.items():
+                        postings = self._postings.get((field, number))
+                        if postings is None:
+                            continue
+                        ordinals = np.frombuffer(postings, dtype=np.uint32)
+                        score = weight * similarity * math.log(1 + len(self._ordinals) / len(postings))
+                        term_scores[ordinals] = np.maximum(term_scores[ordinals], score)
+                        del ordinals  # Release the buffer so add() can grow the array again
+                scores += term_scores
+            if len(self._ordinals) < size:
+                alive = np.frombuffer(self._alive, dtype=np.uint8)
+                scores[alive == 0] = 0
+                del alive
+
+            count = min(limit, size)
+            top = np.argpartition(-scores, count - 1)[:count]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [(self.quote_ids[ordinal], round(float(scores[ordinal]), 3)) for ordinal in top if scores[ordinal] > 0]
+
+
+def _utc(stamp):
+    """ A stored created_at / updated_at (datetime, naive meaning UTC, or ISO string) as an aware datetime, or None """
+    if isinstance(stamp, str):
+        try:
+            stamp = datetime.fromisoformat(stamp)
+        except ValueError:
+            return None
+    if not isinstance(stamp, datetime):
+        return None
+    return stamp if stamp.tzinfo else stamp.replace(tzinfo=timezone.utc)
+
+
+_search_index = None
+_search_index_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_changes_since = None  # Local time the last look for changes started
+_checked_at = 0.0  # time.monotonic() of the last look for changes
+_refreshed = {}  # quote id -> change time last indexed by a refresh, for the overlap window
+
+
+def get_search_index(repository=None):
+    """ Process-wide search index, built from `repository` (default: get_repository()) on the first call
+
+    Building reads every quotation once, so the first call can take a while;
+    call it from a worker thread.
+    """
+    global _search_index, _changes_since, _checked_at
+    if _search_index is None:
+        with _search_index_lock:
+            if _search_index is None:
+                from storage import get_repository
+
+                repository = repository or get_repository()
+                started, checked_at = datetime.now(timezone.utc), time.monotonic()
+                index = SearchIndex.build(repository.iter_documents(("_id",) + INDEX_FIELDS))
+                _changes_since, _checked_at = started, checked_at
+                _search_index = index
+    return _search_index
+
+
+def search_index_ready():
+    return _search_index is not None
+
+
+def update_search_index(quote_id, document):
+    """ Index a quotation this process just saved; a no-op until the index is built """
+    if _search_index is not None:
+        _search_index.add(str(quote_id), document)
+
+
+def refresh_search_index(repository=None):
+    """ Index the quotations created or revised by any process since the last refresh; returns how many
+
+    A no-op until the index is built, and while another thread is refreshing.
+    """
+    global _changes_since, _checked_at
+    if _search_index is None or not _refresh_lock.acquire(blocking=False):
+        return 0
+    try:
+        from storage import get_repository
+
+        repository = repository or get_repository()
+        started, checked_at = datetime.now(timezone.utc), time.monotonic()
+        since = _changes_since - REFRESH_OVERLAP
+        count = 0
+        for document in repository.iter_changed(since, ("_id",) + INDEX_FIELDS):
+            quote_id = str(document["_id"])
+            changed = max(filter(None, (_utc(document.get("created_at")), _utc(document.get("updated_at")))), default=None)
+            if changed is not None and _refreshed.get(quote_id) == changed:
+                continue  # Already indexed by an earlier refresh whose window overlapped this one
+            _search_index.add(quote_id, document)
+            _refreshed[quote_id] = changed
+            count += 1
+        for quote_id in [quote_id for quote_id, changed in _refreshed.items() if changed is None or changed <= since]:
+            del _refreshed[quote_id]
+        _changes_since, _checked_at = started, checked_at
+        return count
+    finally:
+        _refresh_lock.release()
+
+
+def search_quotations(query, limit=20, repository=None):
+    """ Summaries (with a "score") of the quotations best matching `query`, best first
+
+    Uses the search index once it is built, otherwise the database's own
+    text search (exact words only).
+    """
+    from storage import SUMMARY_FIELDS, get_repository
+
+    if limit < 1:
+        return []  # A database LIMIT of 0 or less means no limit at all
+    repository = repository or get_repository()
+    if _search_index is None:
+        return repository.text_search(query, limit)
+    if time.monotonic() - _checked_at >= REFRESH_INTERVAL:
+        refresh_search_index(repository)
+    matches = _search_index.search(query, limit)
+    documents = {str(document["_id"]): document for document in repository.get_many([quote_id for quote_id, _ in matches])}
+    summaries = []
+    for quote_id, score in matches:
+        document = documents.get(quote_id)
+        if document is not None:
+            summaries.append(dict({field: document.get(field) for field in SUMMARY_FIELDS}, _id=quote_id, score=score))
+    return summaries
+
+
+def main(argv=None):
+    from storage import get_repository, open_repository
+
+    parser = argparse.ArgumentParser(prog="search", description="Search stored quotations by customer, site or line item.")
+    parser.add_argument("query")
+    parser.add_argument("-n", "--limit", type=int, default=20, help="results to show (default: 20)")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    args = parser.parse_args(argv)
+
+    repository = open_repository(args.db) if args.db else get_repository()
+    start = time.perf_counter()
+    index = get_search_index(repository)
+    print(f"🔍 Indexed {len(index)} quotations in {time.perf_counter() - start:.1f}s")
+
+    start = time.perf_counter()
+    results = search_quotations(args.query, args.limit, repository)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        print(f"{result['score']:7.2f}  {result['_id']}  {result['customer_name']} · {result['building_site']} · ₹{result['total_project_cost']}")
+    print(f"✅ {len(results)} results in {elapsed * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,467 @@
+""" Quotation HTTP API for phones and the web portal, served with asyncio
+
+    POST /estimate                  quotation JSON -> validated quotation with line and project totals
+    POST /pdf                       quotation JSON -> application/pdf
+    POST /quotations                quotation JSON -> {"id"} (saved; re-saving identical content returns the same id)
+    GET  /quotations?email=&after=  one page of summaries, newest first -> {"quotations", "next"}
+    GET  /quotations/<id>           stored quotation
+    PUT  /quotations/<id>           quotation JSON -> {"id", "revision"} (saved as a new revision of it)
+    GET  /quotations/<id>/revisions        -> {"revisions": [{"revision", "saved_at"}]}, oldest first
+    GET  /quotations/<id>/revisions/<n>    one revision of the stored quotation
+    GET  /quotations/<id>/diff?from=&to=   changes between two revisions (default: the latest two) -> {"changes"}
+    GET  /quotations/<id>/pdf       stored quotation as application/pdf
+    POST /quotations/<id>/send      e-mail the stored quotation (optional body {"email"}) -> 202
+    GET  /search?q=&limit=          quotations ranked by customer name, site and line item match (typo-tolerant) -> {"quotations"}
+    GET  /analytics/monthly         quotations and quoted value per month -> {"months"}
+    GET  /analytics/floors          area, value and average cost per sqft by floor type -> {"floors"}
+    GET  /analytics/extra-works?top=  extra works with the most revenue -> {"extra_works"}
+    GET  /metrics/prometheus        process metrics (actions, DB round trips, PDF sizes, SMTP and HTTP latency) as Prometheus text
+    GET  /metrics                   request count, errors and latency percentiles per route, PDF cache stats
+
+The server is a small HTTP/1.1 implementation on asyncio streams with
+keep-alive, so it needs nothing beyond the standard library. PDFs are
+rendered in a process pool. Repository calls run in a thread pool, which
+stands in for an async database driver.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from analytics import floor_rates, monthly_totals, top_extra_works
+from estimator_core import ValidationError, build_pdf, is_valid_email, pdf_bytes, quotation_from_dict, quotation_key, validate_customer_info
+from metrics import HTTP_SECONDS, PDF_BYTES, render as render_metrics
+from pdf_cache import get_pdf_cache
+from revisions import diff_documents
+from search import get_search_index, search_quotations, update_search_index
+from storage import get_repository, open_repository
+
+MAX_BODY = 1024 * 1024  # Largest accepted request body (bytes)
+KEEP_ALIVE_TIMEOUT = 15  # Seconds an idle connection is kept open
+LATENCY_SAMPLES = 2048  # Most recent requests kept per route for percentiles
+API_OUTBOX = os.path.join("outbox", "api")  # Separate from the desktop app's spool
+
+
+class HTTPError(Exception):
+    """ Returned to the client as a JSON {"error"} response with this status """
+
+    def __init__(self, status, message, field=None):
+        super().__init__(message)
+        self.status = status
+        self.field = field
+
+
+def render_document(document):
+    """ PDF bytes for a quotation dict; runs in the PDF process pool """
+    return pdf_bytes(build_pdf(quotation_from_dict(document)))
+
+
+class LatencyMetrics:
+    """ Per-route request counts, error counts and recent latencies """
+
+    def __init__(self, samples=LATENCY_SAMPLES):
+        self.samples = samples
+        self.started = time.time()
+        self._routes = {}
+
+    def record(self, route, status, seconds):
+        stats = self._routes.get(route)
+        if stats is None:
+            stats = self._routes[route] = {"count": 0, "errors": 0, "total": 0.0, "recent": deque(maxlen=self.samples)}
+        stats["count"] += 1
+        stats["errors"] += status >= 500
+        stats["total"] += seconds
+        stats["recent"].append(seconds)
+
+    @staticmethod
+    def _percentile(ordered, pct):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def snapshot(self):
+        routes = {}
+        for route, stats in sorted(self._routes.items()):
+            recent = sorted(stats["recent"])
+            routes[route] = {
+                "count": stats["count"],
+                "errors": stats["errors"],
+                "mean_ms": round(stats["total"] * 1000 / stats["count"], 3),
+                "p50_ms": round(self._percentile(recent, 50) * 1000, 3),
+                "p95_ms": round(self._percentile(recent, 95) * 1000, 3),
+                "p99_ms": round(self._percentile(recent, 99) * 1000, 3),
+                "max_ms": round(recent[-1] * 1000, 3),
+            }
+        return {"uptime_s": round(time.time() - self.started, 1), "routes": routes}
+
+
+class QuotationService:
+    """ Route table, handlers and the asyncio connection loop """
+
+    def __init__(self, repository=None, pdf_workers=None, db_threads=16, mail_queue=None):
+        self.repository = repository
+        self.pdf_pool = ProcessPoolExecutor(max_workers=pdf_workers)
+        self.db_pool = ThreadPoolExecutor(max_workers=db_threads, thread_name_prefix="db")
+        self.mail_queue = mail_queue
+        self.metrics = LatencyMetrics()
+        self._rendering = {}  # PDF cache key -> render in progress, shared by concurrent requests
+        self.routes = (
+            ("POST", re.compile(r"/estimate"), "POST /estimate", self.estimate),
+            ("POST", re.compile(r"/pdf"), "POST /pdf", self.export_pdf),
+            ("POST", re.compile(r"/quotations"), "POST /quotations", self.save),
+            ("GET", re.compile(r"/quotations"), "GET /quotations", self.find),
+            ("GET", re.compile(r"/quotations/(?P<quote_id>[^/]+)"), "GET /quotations/<id>", self.get),
+            ("PUT", re.compile(r"/quotations/(?P<quote_id>[^/]+)"), "PUT /quotations/<id>", self.save_revision),
+            ("GET", re.compile(r"/quotations/(?P<quote_id>[^/]+)/revisions"), "GET /quotations/<id>/revisions", self.list_revisions),
+            ("GET", re.compile(r"/quotations/(?P<quote_id>[^/]+)/revisions/(?P<revision>\d+)"), "GET /quotations/<id>/revisions/<n>", self.get_revision),
+            ("GET", re.compile(r"/quotations/(?P<quote_id>[^/]+)/diff"), "GET /quotations/<id>/diff", self.diff),
+            ("GET", re.compile(r"/quotations/(?P<quote_id>[^/]+)/pdf"), "GET /quotations/<id>/pdf", self.get_pdf),
+            ("POST", re.compile(r"/quotations/(?P<quote_id>[^/]+)/send"), "POST /quotations/<id>/send", self.send),
+            ("GET", re.compile(r"/search"), "GET /search", self.search),
+            ("GET", re.compile(r"/analytics/monthly"), "GET /analytics/monthly", self.monthly),
+            ("GET", re.compile(r"/analytics/floors"), "GET /analytics/floors", self.floors),
+            ("GET", re.compile(r"/analytics/extra-works"), "GET /analytics/extra-works", self.extra_works),
+            ("GET", re.compile(r"/metrics"), "GET /metrics", self.get_metrics),
+            ("GET", re.compile(r"/metrics/prometheus"), "GET /metrics/prometheus", self.get_prometheus_metrics),
+        )
+
+    # **Helpers**
+    async def _db(self, method, *args, **kwargs):
+        """ Run a blocking repository method in the database thread pool """
+        repository = self.repository or get_repository()
+        return await asyncio.get_running_loop().run_in_executor(self.db_pool, lambda: getattr(repository, method)(*args, **kwargs))
+
+    async def _store(self, method, document, *args):
+        """ Run a saving repository method, then index the quotation, in the database thread pool """
+        repository = self.repository or get_repository()
+
+        def store():
+            result = getattr(repository, method)(*args, document)
+            update_search_index(args[0] if args else result, document)  # The quote id is an argument of save_revision
+            return result
+
+        return await asyncio.get_running_loop().run_in_executor(self.db_pool, store)
+
+    async def _render(self, document):
+        data = await self._cached_render(document)
+        PDF_BYTES.observe(len(data))
+        return data
+
+    async def _cached_render(self, document):
+        """ PDF bytes from the PDF cache, or rendered in the process pool and cached """
+        loop = asyncio.get_running_loop()
+        cache = get_pdf_cache()
+        key = quotation_key(quotation_from_dict(document))
+        data = await loop.run_in_executor(self.db_pool, cache.get, key)
+        if data is not None:
+            return data
+
+        rendering = self._rendering.get(key)
+        if rendering is not None:
+            return await rendering  # The same quotation is already being rendered for another request
+        rendering = self._rendering[key] = loop.run_in_executor(self.pdf_pool, render_document, document)
+        try:
+            data = await rendering
+            await loop.run_in_executor(self.db_pool, cache.put, key, data)
+        finally:
+            del self._rendering[key]
+        return data
+
+    @staticmethod
+    def _quotation(body, complete=False):
+        """ Validated Quotation from a JSON request body; `complete` also requires the customer details """
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "Request body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        try:
+            quotation = quotation_from_dict(data)
+            if complete:
+                validate_customer_info(quotation.customer_name, quotation.building_site, quotation.validity_date)
+        except ValidationError as e:
+            raise HTTPError(400, str(e), e.field)
+        except (TypeError, AttributeError):
+            raise HTTPError(400, "floors and extra_works must be lists of objects")
+        return quotation
+
+    @staticmethod
+    def _count(query, name, default, maximum=None):
+        """ Positive integer query parameter, capped at `maximum` """
+        try:
+            value = int(query.get(name, [str(default)])[0])
+        except ValueError:
+            value = 0
+        if value < 1:
+            raise HTTPError(400, f"{name} must be a positive integer", name)
+        return value if maximum is None else min(value, maximum)
+
+    async def _stored(self, quote_id):
+        document = await self._db("get", quote_id)
+        if document is None:
+            raise HTTPError(404, f"Quotation {quote_id} not found")
+        return document
+
+    # **Handlers** return (status, payload); bytes are sent as a PDF, anything else as JSON
+    async def estimate(self, body, query):
+        return 200, self._quotation(body).to_document()
+
+    async def export_pdf(self, body, query):
+        return 200, await self._render(self._quotation(body, complete=True).to_document())
+
+    async def save(self, body, query):
+        quotation = self._quotation(body, complete=True)
+        if not is_valid_email(quotation.email):
+            raise HTTPError(400, "A valid email is required to save a quotation", "email")
+        document = quotation.to_document()
+        quote_id = await self._store("save", document)
+        return 201, {"id": quote_id}
+
+    async def find(self, body, query):
+        email = query.get("email", [""])[0].strip().lower()
+        if not email:
+            raise HTTPError(400, "The email query parameter is required", "email")
+        try:
+            summaries, cursor = await self._db("find_page", email, after=query.get("after", [None])[0])
+        except (ValueError, IndexError):
+            raise HTTPError(400, "Invalid page cursor", "after")
+        return 200, {"quotations": summaries, "next": cursor}
+
+    async def get(self, body, query, quote_id):
+        return 200, await self._stored(quote_id)
+
+    async def save_revision(self, body, query, quote_id):
+        quotation = self._quotation(body, complete=True)
+        if not is_valid_email(quotation.email):
+            raise HTTPError(400, "A valid email is required to save a quotation", "email")
+        document = quotation.to_document()
+        try:
+            revision = await self._store("save_revision", document, quote_id)
+        except KeyError:
+            raise HTTPError(404, f"Quotation {quote_id} not found")
+        except ValueError as e:
+            raise HTTPError(409, str(e))
+        return 200, {"id": quote_id, "revision": revision}
+
+    async def list_revisions(self, body, query, quote_id):
+        revisions = await self._db("list_revisions", quote_id)
+        if not revisions:
+            raise HTTPError(404, f"Quotation {quote_id} not found")
+        return 200, {"revisions": [{"revision": revision, "saved_at": saved_at} for revision, saved_at in revisions]}
+
+    async def _revision(self, quote_id, revision):
+        document = await self._db("get_revision", quote_id, revision)
+        if document is None:
+            raise HTTPError(404, f"Quotation {quote_id} has no revision {revision}")
+        return document
+
+    async def get_revision(self, body, query, quote_id, revision):
+        return 200, await self._revision(quote_id, int(revision))
+
+    async def diff(self, body, query, quote_id):
+        revisions = await self._db("list_revisions", quote_id)
+        if not revisions:
+            raise HTTPError(404, f"Quotation {quote_id} not found")
+        try:
+            new = int(query.get("to", [revisions[-1][0]])[0])
+            old = int(query.get("from", [max(1, new - 1)])[0])
+        except ValueError:
+            raise HTTPError(400, "from and to must be revision numbers")
+        old_document, new_document = await asyncio.gather(self._revision(quote_id, old), self._revision(quote_id, new))
+        return 200, {"from": old, "to": new, "changes": diff_documents(old_document, new_document)}
+
+    async def get_pdf(self, body, query, quote_id):
+        return 200, await self._render(await self._stored(quote_id))
+
+    async def send(self, body, query, quote_id):
+        from mailer import MailQueue, build_message
+
+        try:
+            recipient = (json.loads(body) if body else {}).get("email")
+        except (ValueError, AttributeError):
+            raise HTTPError(400, "Request body must be a JSON object")
+        if recipient is not None and not isinstance(recipient, str):
+            raise HTTPError(400, "email must be a string", "email")
+        document = await self._stored(quote_id)
+        recipient = (recipient or document.get("email", "")).strip().lower()
+        if not is_valid_email(recipient):
+            raise HTTPError(400, "No valid recipient email", "email")
+
+        pdf_data = await self._render(document)
+        if self.mail_queue is None:
+            self.mail_queue = MailQueue(spool_dir=API_OUTBOX).start()
+        message_id = await asyncio.get_running_loop().run_in_executor(
+            self.db_pool, self.mail_queue.enqueue, build_message(recipient, pdf_data))
+        return 202, {"status": "queued", "message_id": message_id, "recipient": recipient}
+
+    async def search(self, body, query):
+        text = query.get("q", [""])[0].strip()
+        if not text:
+            raise HTTPError(400, "The q query parameter is required", "q")
+        limit = self._count(query, "limit", 20, maximum=100)
+        results = await asyncio.get_running_loop().run_in_executor(self.db_pool, search_quotations, text, limit, self.repository)
+        return 200, {"quotations": results}
+
+    async def _report(self, report, *args):
+        repository = self.repository or get_repository()
+        return await asyncio.get_running_loop().run_in_executor(self.db_pool, report, repository, *args)
+
+    async def monthly(self, body, query):
+        return 200, {"months": await self._report(monthly_totals)}
+
+    async def floors(self, body, query):
+        return 200, {"floors": await self._report(floor_rates)}
+
+    async def extra_works(self, body, query):
+        return 200, {"extra_works": await self._report(top_extra_works, self._count(query, "top", 10))}
+
+    async def get_prometheus_metrics(self, body, query):
+        return 200, render_metrics()
+
+    async def get_metrics(self, body, query):
+        return 200, dict(self.metrics.snapshot(), pdf_cache=get_pdf_cache().stats())
+
+    # **HTTP**
+    async def dispatch(self, method, target, body):
+        """ (route label, status, payload) for one request """
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, label, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            try:
+                status, payload = await handler(body, parse_qs(url.query), **match.groupdict())
+            except HTTPError as e:
+                status, payload = e.status, {"error": str(e), "field": e.field}
+            except Exception as e:
+                print(f"❌ {method} {path}: {e}")
+                status, payload = 500, {"error": "Internal server error"}
+            return label, status, payload
+        if allowed:
+            return "other", 405, {"error": f"{method} is not allowed on {path}"}
+        return "other", 404, {"error": f"No route for {path}"}
+
+    @staticmethod
+    async def _read_request(reader):
+        """ (method, target, headers, body) of the next request, or None when the client closed the connection """
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HTTPError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if length > MAX_BODY:
+            raise HTTPError(413, f"Request body is larger than {MAX_BODY} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return parts[0].upper(), parts[1], headers, body
+
+    @staticmethod
+    def _response(status, payload, keep_alive):
+        if isinstance(payload, bytes):
+            content, content_type = payload, "application/pdf"
+        elif isinstance(payload, str):
+            content, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            content, content_type = json.dumps(payload, default=str).encode("utf-8"), "application/json"
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(content)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        return head.encode("latin-1") + content
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    writer.write(self._response(e.status, {"error": str(e)}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+
+                start = time.perf_counter()
+                label, status, payload = await self.dispatch(method, target, body)
+                elapsed = time.perf_counter() - start
+                self.metrics.record(label, status, elapsed)
+                HTTP_SECONDS.observe(elapsed, label, status)
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(self._response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _indexed(future):
+        if not future.cancelled() and future.exception() is not None:
+            print(f"❌ Could not build the search index: {future.exception()}")
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        """ Serve until cancelled; `ready(server)` is called once the socket is listening """
+        # Searches use the database's text index until the search index is built
+        indexing = asyncio.get_running_loop().run_in_executor(self.db_pool, get_search_index, self.repository)
+        indexing.add_done_callback(self._indexed)
+        server = await asyncio.start_server(self.handle_connection, host, port, backlog=1024)
+        if ready:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pdf_pool.shutdown(cancel_futures=True)
+        self.db_pool.shutdown(wait=False, cancel_futures=True)
+        if self.mail_queue is not None:
+            self.mail_queue.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="service", description="Serve the quotation HTTP API.")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on (default: 8080)")
+    parser.add_argument("-j", "--pdf-workers", type=int, default=None, help="PDF rendering processes (default: one per CPU)")
+    parser.add_argument("--db", help="database URL (default: ESTIMATOR_DB or local MongoDB)")
+    args = parser.parse_args(argv)
+
+    def ready(server):
+        print(f"✅ Quotation API listening on http://{args.host}:{args.port}")
+
+    service = QuotationService(open_repository(args.db) if args.db else None, pdf_workers=args.pdf_workers)
+    try:
+        asyncio.run(service.serve(args.host, args.port, ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
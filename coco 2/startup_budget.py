@@ -0,0 +1,96 @@
+""" Start-up budget check for the GUI: times its module-level imports with `python -X importtime`
+
+The imports at the top of estimator2.py are everything the app loads before
+its window appears. This script imports them in a fresh interpreter, reports
+the slowest modules, and fails if the total is over budget or if a module
+that should load on first use or in the background warm-up (fpdf,
+tkcalendar, smtplib, pymongo, ...) is pulled in eagerly.
+
+    python startup_budget.py --budget-ms 100
+"""
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GUI_SCRIPT = os.path.join(HERE, "estimator2.py")
+DEFAULT_BUDGET_MS = 100
+
+# Loaded on first use or by the background warm-up, never before the window appears
+DEFERRED_MODULES = ("fpdf", "tkcalendar", "babel", "smtplib", "email.mime", "pymongo", "bson", "numpy")
+
+
+def startup_imports(path=GUI_SCRIPT):
+    """ Modules the GUI script imports at module level, in order """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(modules):
+    """ (total seconds, {module: cumulative µs}) for importing `modules` in a fresh interpreter """
+    code = ("import time; _t = time.perf_counter(); import " + ", ".join(modules)
+            + "; print(time.perf_counter() - _t)")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, cwd=HERE)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return float(result.stdout.strip()), times
+
+
+def check_startup(budget_ms=DEFAULT_BUDGET_MS, repeat=3, report=print):
+    """ Best-of-`repeat` import time of the GUI's start-up modules; returns True when within budget """
+    modules = startup_imports()
+    runs = [measure(modules) for _ in range(repeat)]
+    total, times = min(runs, key=lambda run: run[0])
+
+    report(f"🔍 Start-up imports: {', '.join(modules)}")
+    for name, micros in sorted(times.items(), key=lambda item: -item[1])[:8]:
+        report(f"   {micros / 1000:7.1f} ms  {name}")
+
+    ok = True
+    eager = sorted(name for name in times
+                   if any(name == deferred or name.startswith(deferred + ".") for deferred in DEFERRED_MODULES))
+    if eager:
+        report(f"❌ Imported before the window appears (should be lazy): {', '.join(eager)}")
+        ok = False
+    if total * 1000 > budget_ms:
+        report(f"❌ Start-up imports took {total * 1000:.1f} ms, over the {budget_ms:g} ms budget")
+        ok = False
+    if ok:
+        report(f"✅ Start-up imports took {total * 1000:.1f} ms (budget {budget_ms:g} ms)")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="startup_budget", description="Check the GUI's start-up import time against a budget.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help=f"maximum import time (default: {DEFAULT_BUDGET_MS} ms)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs to take the best of (default: 3)")
+    args = parser.parse_args(argv)
+
+    try:
+        ok = check_startup(args.budget_ms, args.repeat)
+    except RuntimeError as e:
+        print(f"❌ Could not import the start-up modules: {e}", file=sys.stderr)
+        return 1
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
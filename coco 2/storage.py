@@ -0,0 +1,678 @@
+""" Quotation persistence: lazily connected MongoDB repository and an embedded SQLite backend
+
+Both repositories store and return plain quotation documents (the shape of
+Quotation.to_document()) with an "_id" key, so callers do not care which one
+is configured. The backend is chosen by the ESTIMATOR_DB environment variable:
+a mongodb:// URI (default) or sqlite:///path/to/file.db.
+
+Every stored document carries a content_key derived from its customer fields
+and line items; saving the same quotation twice returns the existing id
+instead of creating a duplicate.
+
+Editing a stored quotation saves a new revision in place (save_revision); the
+replaced revisions are kept as compact deltas next to it (see revisions.py).
+Every save also updates the reporting summary rows (see analytics.py).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+from analytics import MONTH, PIPELINES, SUMMARY_COLLECTION_NAME, SUMMARY_KINDS, UNKNOWN_MONTH, created_at, summary_increments
+from metrics import mongo_command_listener, sqlite_statement
+from revisions import SNAPSHOT_INTERVAL, rebuild, revision_record
+
+MONGO_URI = "mongodb://localhost:27017/"
+DB_NAME = "constructionestimator"
+COLLECTION_NAME = "quotations"
+CATALOGUE_COLLECTION_NAME = "rate_catalogue"
+REVISIONS_COLLECTION_NAME = "quotation_revisions"
+
+PAGE_SIZE = 20
+
+# Fields the quotation list needs; line items are only loaded for a single quotation
+SUMMARY_FIELDS = ("email", "customer_name", "building_site", "validity_date", "total_project_cost", "created_at")
+
+
+# Fields that identify a quotation's content; ids, timestamps and derived totals are left out
+CONTENT_FIELDS = ("email", "customer_name", "building_site", "validity_date", "floors", "extra_works")
+
+
+def content_key(document):
+    """ Stable hash of a quotation's customer fields and line items """
+    content = {field: document.get(field) for field in CONTENT_FIELDS}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _stamp(document):
+    document = dict(document)
+    document.pop("_id", None)
+    if not document.get("created_at"):
+        document["created_at"] = datetime.now(timezone.utc)
+    document["content_key"] = content_key(document)
+    return document
+
+
+class MongoRepository:
+    """ Quotations collection behind a pooled MongoClient that connects on first use """
+
+    def __init__(self, uri=MONGO_URI, db_name=DB_NAME, collection_name=COLLECTION_NAME,
+                 max_pool_size=10, timeout_ms=5000, client=None):
+        self.uri = uri
+        self.db_name = db_name
+        self.collection_name = collection_name
+        self.max_pool_size = max_pool_size
+        self.timeout_ms = timeout_ms
+        self._client = client
+        self._collection = None
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            with self._lock:
+                if self._collection is None:
+                    if self._client is None:
+                        from pymongo import MongoClient
+
+                        self._client = MongoClient(self.uri, maxPoolSize=self.max_pool_size,
+                                                   serverSelectionTimeoutMS=self.timeout_ms,
+                                                   connectTimeoutMS=self.timeout_ms,
+                                                   socketTimeoutMS=self.timeout_ms * 6,
+                                                   event_listeners=[mongo_command_listener()])
+                    db = self._client[self.db_name]
+                    collection = db[self.collection_name]
+                    self.ensure_indexes(collection)
+                    db[CATALOGUE_COLLECTION_NAME].create_index("version", name="version", unique=True)
+                    db[REVISIONS_COLLECTION_NAME].create_index([("quote_id", 1), ("revision", 1)], name="quote_revision", unique=True)
+                    db[SUMMARY_COLLECTION_NAME].create_index("kind", name="kind")
+                    self._collection = collection
+                    print("✅ Connected to MongoDB successfully")
+        return self._collection
+
+    def connect(self):
+        """ Connect and create the indexes now instead of on the first query """
+        self.collection
+
+    @staticmethod
+    def ensure_indexes(collection):
+        """ Create the lookup indexes (no-op if they already exist) """
+        from pymongo import ASCENDING, DESCENDING, TEXT
+
+        collection.create_index([("email", ASCENDING), ("_id", DESCENDING)], name="email_recent")
+        collection.create_index([("validity_date", ASCENDING)], name="validity_date")
+        collection.create_index([("created_at", DESCENDING)], name="created_at")
+        collection.create_index([("updated_at", DESCENDING)], name="updated_at")
+        collection.create_index([("content_key", ASCENDING)], name="content_key", unique=True,
+                                partialFilterExpression={"content_key": {"$exists": True}})
+        collection.create_index([("customer_name", TEXT), ("building_site", TEXT), ("floors.name", TEXT), ("extra_works.name", TEXT)],
+                                name="search_text", weights={"customer_name": 3, "building_site": 2}, default_language="none")
+
+    @staticmethod
+    def _object_ids(quote_ids):
+        from bson import ObjectId
+        from bson.errors import InvalidId
+
+        object_ids = []
+        for quote_id in quote_ids:
+            try:
+                object_ids.append(ObjectId(quote_id))
+            except (InvalidId, TypeError):
+                continue
+        return object_ids
+
+    def save(self, document):
+        """ Store one quotation document (or find its identical twin) and return its id """
+        document = _stamp(document)
+        result = self.collection.update_one({"content_key": document["content_key"]}, {"$setOnInsert": document}, upsert=True)
+        if result.upserted_id is None:
+            return str(self.collection.find_one({"content_key": document["content_key"]}, {"_id": 1})["_id"])
+        self._update_summaries(added=[document])
+        return str(result.upserted_id)
+
+    def upsert_many(self, documents, ordered=False, w=1):
+        """ Insert a batch of documents with one bulk_write, skipping content duplicates
+
+        Returns (inserted, duplicates). Unordered batches let the server apply
+        the writes in parallel and keep going past a failing document; `w` sets
+        the write concern for the batch.
+        """
+        from pymongo import UpdateOne
+        from pymongo.write_concern import WriteConcern
+
+        documents = [_stamp(document) for document in documents]
+        requests = [UpdateOne({"content_key": document["content_key"]}, {"$setOnInsert": document}, upsert=True)
+                    for document in documents]
+        if not requests:
+            return 0, 0
+        collection = self.collection.with_options(write_concern=WriteConcern(w=w))
+        result = collection.bulk_write(requests, ordered=ordered)
+        self._update_summaries(added=[documents[index] for index in result.upserted_ids])
+        return result.upserted_count, len(requests) - result.upserted_count
+
+    def get(self, quote_id):
+        """ Full quotation document by id, or None """
+        object_ids = self._object_ids([quote_id])
+        return self.collection.find_one({"_id": object_ids[0]}) if object_ids else None
+
+    def get_many(self, quote_ids):
+        """ Full quotation documents for a list of ids; unknown ids are skipped """
+        return self.collection.find({"_id": {"$in": self._object_ids(quote_ids)}})
+
+    def find_by_email(self, email):
+        """ All full quotation documents for a customer email """
+        return self.collection.find({"email": email.strip().lower()})
+
+    def iter_documents(self, fields, batch_size=1000):
+        """ Stream every quotation with only `fields` (dotted paths allowed) through a server-side cursor """
+        pipeline = [{"$project": dict.fromkeys(fields, 1)}]
+        return self.collection.aggregate(pipeline, allowDiskUse=True, batchSize=batch_size)
+
+    def iter_changed(self, since, fields):
+        """ Quotations created or revised after the UTC datetime `since`, with `fields` plus created_at and updated_at """
+        since = since.astimezone(timezone.utc).replace(tzinfo=None)  # Stored datetimes are naive UTC
+        projection = dict.fromkeys(tuple(fields) + ("created_at", "updated_at"), 1)
+        return self.collection.find({"$or": [{"created_at": {"$gt": since}}, {"updated_at": {"$gt": since}}]}, projection)
+
+    # **Revisions**
+    @property
+    def revisions(self):
+        return self.collection.database[REVISIONS_COLLECTION_NAME]
+
+    def save_revision(self, quote_id, document):
+        """ Make `document` the newest revision of a stored quotation and return its revision number
+
+        The replaced revision is kept as a delta record. Saving unchanged content
+        returns the current revision without writing. Raises KeyError for an
+        unknown quotation and ValueError if the quotation changed concurrently or
+        the new content duplicates another stored quotation.
+        """
+        from pymongo.errors import DuplicateKeyError
+
+        head = self.get(quote_id)
+        if head is None:
+            raise KeyError(f"Quotation {quote_id} does not exist")
+        document = _stamp(document)
+        current = head.get("revision", 1)
+        if document["content_key"] == head.get("content_key"):
+            return current
+
+        document.update(created_at=created_at(head), updated_at=datetime.now(timezone.utc), revision=current + 1)
+        try:
+            # The old content_key guards against a concurrent save of the same quotation
+            result = self.collection.replace_one({"_id": head["_id"], "content_key": head.get("content_key")}, document)
+        except DuplicateKeyError:
+            raise ValueError("Another stored quotation already has exactly this content")
+        if result.matched_count == 0:
+            raise ValueError(f"Quotation {quote_id} was changed by someone else; reload it and try again")
+        record = revision_record(current, head, document)
+        record["quote_id"] = str(head["_id"])
+        self.revisions.insert_one(record)
+        self._update_summaries(added=[document], removed=[head])
+        return current + 1
+
+    def get_revision(self, quote_id, revision):
+        """ Full document of one revision of a quotation, or None """
+        head = self.get(quote_id)
+        if head is None:
+            return None
+        current = head.get("revision", 1)
+        if revision == current:
+            return head
+        if not 1 <= revision < current:
+            return None
+        records = self.revisions.find(
+            {"quote_id": str(head["_id"]), "revision": {"$gte": revision, "$lt": min(current, revision + SNAPSHOT_INTERVAL)}},
+            {"_id": 0}).sort("revision", 1)
+        return rebuild(head, list(records), revision)
+
+    def list_revisions(self, quote_id):
+        """ [(revision, saved_at)] of a quotation, oldest first and ending with the current one; [] if unknown """
+        head = self.get(quote_id)
+        if head is None:
+            return []
+        records = self.revisions.find({"quote_id": str(head["_id"])}, {"revision": 1, "saved_at": 1}).sort("revision", 1)
+        return ([(record["revision"], record.get("saved_at")) for record in records]
+                + [(head.get("revision", 1), head.get("updated_at") or head.get("created_at"))])
+
+    # **Reporting Summaries**
+    @property
+    def summary_collection(self):
+        return self.collection.database[SUMMARY_COLLECTION_NAME]
+
+    def _update_summaries(self, added=(), removed=()):
+        """ Apply the summary changes of stored / replaced documents with one unordered bulk $inc """
+        from pymongo import UpdateOne
+
+        requests = [UpdateOne({"_id": f"{kind}:{key}"},
+                              {"$inc": {"count": count, "quantity": quantity, "total": total},
+                               "$setOnInsert": {"kind": kind, "key": key, "name": name}}, upsert=True)
+                    for (kind, key), (name, count, quantity, total) in summary_increments(added, removed).items()]
+        if requests:
+            self.summary_collection.bulk_write(requests, ordered=False)
+
+    def summaries(self, kind):
+        """ Summary rows of one kind as dicts with key, name, count, quantity and total """
+        return list(self.summary_collection.find({"kind": kind}, {"_id": 0, "kind": 0}))
+
+    def rebuild_summaries(self):
+        """ Recompute every summary row with aggregation pipelines and return how many there are
+
+        Quotations stored before created_at existed first get the generation
+        time of their ObjectId as created_at, so every one has a month.
+        """
+        from pymongo import UpdateOne
+
+        legacy = [UpdateOne({"_id": document["_id"]}, {"$set": {"created_at": created_at(document)}})
+                  for document in self.collection.find({"created_at": None}, {"_id": 1})]
+        if legacy:
+            self.collection.bulk_write(legacy, ordered=False)
+        rows = []
+        for kind in SUMMARY_KINDS:
+            for group in self.collection.aggregate(PIPELINES[kind], allowDiskUse=True):
+                key = f"{group['_id']['year']:04d}-{group['_id']['month']:02d}" if kind == MONTH else group["_id"]
+                rows.append({"_id": f"{kind}:{key}", "kind": kind, "key": key, "name": group.get("name", key),
+                             "count": group["count"], "quantity": group.get("quantity", 0), "total": group["total"]})
+        self.summary_collection.delete_many({})
+        if rows:
+            self.summary_collection.insert_many(rows)
+        return len(rows)
+
+    # **Rate Catalogue**
+    @property
+    def catalogue(self):
+        return self.collection.database[CATALOGUE_COLLECTION_NAME]
+
+    def latest_catalogue_version(self):
+        """ Newest rate catalogue version number, or None if no catalogue was saved """
+        document = self.catalogue.find_one({}, {"version": 1}, sort=[("version", -1)])
+        return document["version"] if document else None
+
+    def get_catalogue(self, version):
+        """ Entries of one rate catalogue version, or None """
+        document = self.catalogue.find_one({"version": version}, {"entries": 1})
+        return document["entries"] if document else None
+
+    def save_catalogue(self, entries):
+        """ Store entries as a new catalogue version and return its number """
+        from pymongo.errors import DuplicateKeyError
+
+        while True:
+            version = (self.latest_catalogue_version() or 0) + 1
+            try:
+                self.catalogue.insert_one({"version": version, "entries": list(entries), "created_at": datetime.now(timezone.utc)})
+                return version
+            except DuplicateKeyError:
+                continue  # Another writer took this version number
+
+    def find_page(self, email, after=None, limit=PAGE_SIZE):
+        """ One page of quotation summaries for an email, newest first
+
+        Returns (summaries, next_cursor). Pass next_cursor back as `after` to load
+        the following page; it is None on the last page. Paging continues from
+        the last _id seen, so every page is a bounded walk of the email_recent index.
+        """
+        query = {"email": email.strip().lower()}
+        if after is not None:
+            query["_id"] = {"$lt": self._object_ids([after])[0]}
+        projection = dict.fromkeys(SUMMARY_FIELDS, 1)
+        summaries = list(self.collection.find(query, projection).sort("_id", -1).limit(limit + 1))
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            return summaries, str(summaries[-1]["_id"])
+        return summaries, None
+
+    def text_search(self, query, limit=PAGE_SIZE):
+        """ Summaries (with a "score") of the quotations matching words of `query` in the search_text index, best first """
+        projection = dict.fromkeys(SUMMARY_FIELDS, 1)
+        projection["score"] = {"$meta": "textScore"}
+        cursor = self.collection.find({"$text": {"$search": query}}, projection).sort([("score", {"$meta": "textScore"})]).limit(limit)
+        return [dict(summary, _id=str(summary["_id"])) for summary in cursor]
+
+
+class SQLiteRepository:
+    """ Embedded single-file quotation store for offline site laptops and tests """
+
+    def __init__(self, path="quotations.db"):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.set_trace_callback(sqlite_statement)  # Statement counts for the metrics
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS quotations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    email TEXT NOT NULL,
+                    customer_name TEXT,
+                    building_site TEXT,
+                    validity_date TEXT,
+                    total_project_cost REAL,
+                    created_at TEXT,
+                    document TEXT NOT NULL
+                );
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(quotations)")}
+            if "content_key" not in columns:
+                conn.execute("ALTER TABLE quotations ADD COLUMN content_key TEXT")
+            conn.executescript("""
+                CREATE INDEX IF NOT EXISTS email_recent ON quotations (email, id DESC);
+                CREATE INDEX IF NOT EXISTS validity_date ON quotations (validity_date);
+                CREATE INDEX IF NOT EXISTS created_at ON quotations (created_at);
+                CREATE INDEX IF NOT EXISTS updated_at ON quotations (json_extract(document, '$.updated_at'));
+                CREATE UNIQUE INDEX IF NOT EXISTS content_key ON quotations (content_key);
+                CREATE TABLE IF NOT EXISTS rate_catalogue (
+                    version INTEGER PRIMARY KEY,
+                    created_at TEXT,
+                    entries TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS quotation_revisions (
+                    quote_id INTEGER NOT NULL,
+                    revision INTEGER NOT NULL,
+                    saved_at TEXT,
+                    record TEXT NOT NULL,
+                    PRIMARY KEY (quote_id, revision)
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS quotation_summaries (
+                    kind TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    name TEXT,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    quantity REAL NOT NULL DEFAULT 0,
+                    total REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (kind, key)
+                ) WITHOUT ROWID;
+            """)
+            self._conn = conn
+        return self._conn
+
+    def connect(self):
+        """ Open the database file and create the schema now instead of on the first query """
+        with self._lock:
+            self.conn
+
+    @staticmethod
+    def _row(document):
+        document = _stamp(document)
+        created_at = document["created_at"]
+        if isinstance(created_at, datetime):
+            document["created_at"] = created_at.isoformat()
+        return (document.get("email", ""), document.get("customer_name"), document.get("building_site"),
+                document.get("validity_date"), document.get("total_project_cost"), document["created_at"],
+                document["content_key"], json.dumps(document, default=str))
+
+    @staticmethod
+    def _document(quote_id, document):
+        document = json.loads(document)
+        document["_id"] = str(quote_id)
+        return document
+
+    @staticmethod
+    def _int_ids(quote_ids):
+        int_ids = []
+        for quote_id in quote_ids:
+            try:
+                int_ids.append(int(quote_id))
+            except (TypeError, ValueError):
+                continue
+        return int_ids
+
+    _INSERT = ("INSERT INTO quotations (email, customer_name, building_site, validity_date, total_project_cost, created_at, content_key, document) "
+               "VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (content_key) DO NOTHING")
+
+    def save(self, document):
+        """ Store one quotation document (or find its identical twin) and return its id """
+        row = self._row(document)
+        with self._lock, self.conn:
+            if self.conn.execute(self._INSERT, row).rowcount:
+                quote_id = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self._update_summaries("quotations.id = ?", (quote_id,))
+                return str(quote_id)
+            return str(self.conn.execute("SELECT id FROM quotations WHERE content_key = ?", (row[6],)).fetchone()[0])
+
+    def upsert_many(self, documents, ordered=False, w=1):
+        """ Insert a batch of documents in one transaction, skipping content duplicates; returns (inserted, duplicates) """
+        rows = [self._row(document) for document in documents]
+        with self._lock, self.conn:
+            last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM quotations").fetchone()[0]
+            before = self.conn.total_changes
+            self.conn.executemany(self._INSERT, rows)
+            inserted = self.conn.total_changes - before
+            if inserted:
+                self._update_summaries("quotations.id > ?", (last_id,))
+        return inserted, len(rows) - inserted
+
+    def get(self, quote_id):
+        """ Full quotation document by id, or None """
+        int_ids = self._int_ids([quote_id])
+        if not int_ids:
+            return None
+        with self._lock:
+            row = self.conn.execute("SELECT id, document FROM quotations WHERE id = ?", int_ids).fetchone()
+        return self._document(*row) if row else None
+
+    def get_many(self, quote_ids):
+        """ Full quotation documents for a list of ids; unknown ids are skipped """
+        int_ids = self._int_ids(quote_ids)
+        for start in range(0, len(int_ids), 500):
+            chunk = int_ids[start:start + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT id, document FROM quotations WHERE id IN ({','.join('?' * len(chunk))})", chunk).fetchall()
+            for row in rows:
+                yield self._document(*row)
+
+    def find_by_email(self, email):
+        """ All full quotation documents for a customer email """
+        with self._lock:
+            rows = self.conn.execute("SELECT id, document FROM quotations WHERE email = ? ORDER BY id",
+                                     (email.strip().lower(),)).fetchall()
+        return [self._document(*row) for row in rows]
+
+    def iter_documents(self, fields, batch_size=1000):
+        """ Stream every quotation in id order, `batch_size` rows at a time (fields are not trimmed) """
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self.conn.execute("SELECT id, document FROM quotations WHERE id > ? ORDER BY id LIMIT ?",
+                                         (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._document(*row)
+            last_id = rows[-1][0]
+
+    def iter_changed(self, since, fields):
+        """ Quotations created or revised after the UTC datetime `since`; see MongoRepository.iter_changed """
+        since = since.astimezone(timezone.utc).isoformat()  # Stored as ISO strings, which sort by time
+        with self._lock:
+            rows = self.conn.execute("SELECT id, document FROM quotations WHERE created_at > ? OR json_extract(document, '$.updated_at') > ?",
+                                     (since, since)).fetchall()
+        return [self._document(*row) for row in rows]
+
+    # **Revisions**
+    def save_revision(self, quote_id, document):
+        """ Make `document` the newest revision of a stored quotation; see MongoRepository.save_revision """
+        head = self.get(quote_id)
+        if head is None:
+            raise KeyError(f"Quotation {quote_id} does not exist")
+        current = head.get("revision", 1)
+        document = dict(document, created_at=head.get("created_at"), updated_at=datetime.now(timezone.utc).isoformat(), revision=current + 1)
+        row = self._row(document)
+        if row[6] == head.get("content_key"):
+            return current
+
+        record = revision_record(current, head, json.loads(row[7]))
+        with self._lock, self.conn:
+            self._update_summaries("quotations.id = ?", (int(quote_id),), sign=-1)  # Rolled back with the rest if the update fails
+            try:
+                cursor = self.conn.execute(
+                    "UPDATE quotations SET email = ?, customer_name = ?, building_site = ?, validity_date = ?, "
+                    "total_project_cost = ?, created_at = ?, content_key = ?, document = ? WHERE id = ? AND content_key = ?",
+                    row + (int(quote_id), head.get("content_key")))
+            except sqlite3.IntegrityError:
+                raise ValueError("Another stored quotation already has exactly this content")
+            if cursor.rowcount == 0:
+                raise ValueError(f"Quotation {quote_id} was changed by someone else; reload it and try again")
+            self._update_summaries("quotations.id = ?", (int(quote_id),))
+            self.conn.execute("INSERT INTO quotation_revisions (quote_id, revision, saved_at, record) VALUES (?, ?, ?, ?)",
+                              (int(quote_id), current, record["saved_at"], json.dumps(record, default=str)))
+        return current + 1
+
+    def get_revision(self, quote_id, revision):
+        """ Full document of one revision of a quotation, or None """
+        head = self.get(quote_id)
+        if head is None:
+            return None
+        current = head.get("revision", 1)
+        if revision == current:
+            return head
+        if not 1 <= revision < current:
+            return None
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT record FROM quotation_revisions WHERE quote_id = ? AND revision >= ? AND revision < ? ORDER BY revision",
+                (int(quote_id), revision, min(current, revision + SNAPSHOT_INTERVAL))).fetchall()
+        return rebuild(head, [json.loads(row[0]) for row in rows], revision)
+
+    def list_revisions(self, quote_id):
+        """ [(revision, saved_at)] of a quotation, oldest first and ending with the current one; [] if unknown """
+        head = self.get(quote_id)
+        if head is None:
+            return []
+        with self._lock:
+            rows = self.conn.execute("SELECT revision, saved_at FROM quotation_revisions WHERE quote_id = ? ORDER BY revision",
+                                     (int(quote_id),)).fetchall()
+        return [tuple(row) for row in rows] + [(head.get("revision", 1), head.get("updated_at") or head.get("created_at"))]
+
+    # **Reporting Summaries**
+    # Summary rows of the quotations matching a WHERE clause, grouped in SQL; json_each unwinds the line items
+    # (and has its own id and key columns, hence quotations.id and GROUP BY 2)
+    _SUMMARY_SELECTS = (
+        f"SELECT 'month' AS kind, coalesce(substr(created_at, 1, 7), '{UNKNOWN_MONTH}') AS key, "
+        f"coalesce(substr(created_at, 1, 7), '{UNKNOWN_MONTH}') AS name, COUNT(*) AS count, "
+        "0 AS quantity, SUM(total_project_cost) AS total FROM quotations WHERE {where} GROUP BY 2",
+        "SELECT 'floor' AS kind, lower(json_extract(item.value, '$.name')) AS key, json_extract(item.value, '$.name') AS name, "
+        "COUNT(*) AS count, SUM(json_extract(item.value, '$.area_sqft')) AS quantity, SUM(json_extract(item.value, '$.total_cost')) AS total "
+        "FROM quotations, json_each(quotations.document, '$.floors') AS item WHERE {where} GROUP BY 2",
+        "SELECT 'extra_work' AS kind, lower(json_extract(item.value, '$.name')) AS key, json_extract(item.value, '$.name') AS name, "
+        "COUNT(*) AS count, SUM(json_extract(item.value, '$.quantity')) AS quantity, SUM(json_extract(item.value, '$.total_cost')) AS total "
+        "FROM quotations, json_each(quotations.document, '$.extra_works') AS item WHERE {where} GROUP BY 2",
+    )
+
+    def _update_summaries(self, where, params, sign=1):
+        """ Add (or with sign=-1 subtract) the quotations matching `where` to the summary rows (call inside a transaction) """
+        for select in self._SUMMARY_SELECTS:
+            self.conn.execute(
+                "INSERT INTO quotation_summaries (kind, key, name, count, quantity, total) "
+                f"SELECT kind, key, name, ? * count, ? * quantity, ? * total FROM ({select.format(where=where)}) WHERE true "
+                "ON CONFLICT (kind, key) DO UPDATE SET count = count + excluded.count, "
+                "quantity = quantity + excluded.quantity, total = total + excluded.total",
+                (sign, sign, sign) + tuple(params))
+
+    def summaries(self, kind):
+        """ Summary rows of one kind as dicts with key, name, count, quantity and total """
+        with self._lock:
+            rows = self.conn.execute("SELECT key, name, count, quantity, total FROM quotation_summaries WHERE kind = ?", (kind,)).fetchall()
+        return [dict(zip(("key", "name", "count", "quantity", "total"), row)) for row in rows]
+
+    def rebuild_summaries(self):
+        """ Recompute every summary row from the quotations table and return how many there are """
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM quotation_summaries")
+            self._update_summaries("true", ())
+            return self.conn.execute("SELECT COUNT(*) FROM quotation_summaries").fetchone()[0]
+
+    # **Rate Catalogue**
+    def latest_catalogue_version(self):
+        """ Newest rate catalogue version number, or None if no catalogue was saved """
+        with self._lock:
+            return self.conn.execute("SELECT MAX(version) FROM rate_catalogue").fetchone()[0]
+
+    def get_catalogue(self, version):
+        """ Entries of one rate catalogue version, or None """
+        with self._lock:
+            row = self.conn.execute("SELECT entries FROM rate_catalogue WHERE version = ?", (version,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_catalogue(self, entries):
+        """ Store entries as a new catalogue version and return its number """
+        with self._lock, self.conn:
+            cursor = self.conn.execute(
+                "INSERT INTO rate_catalogue (version, created_at, entries) "
+                "SELECT COALESCE(MAX(version), 0) + 1, ?, ? FROM rate_catalogue",
+                (datetime.now(timezone.utc).isoformat(), json.dumps(list(entries))))
+            return cursor.lastrowid
+
+    def find_page(self, email, after=None, limit=PAGE_SIZE):
+        """ One page of quotation summaries for an email, newest first; see MongoRepository.find_page """
+        query = f"SELECT id, {', '.join(SUMMARY_FIELDS)} FROM quotations WHERE email = ?"
+        params = [email.strip().lower()]
+        if after is not None:
+            query += " AND id < ?"
+            params.append(int(after))
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+
+        summaries = [dict(zip(("_id",) + SUMMARY_FIELDS, (str(row[0]),) + tuple(row[1:]))) for row in rows]
+        if len(summaries) > limit:
+            summaries = summaries[:limit]
+            return summaries, summaries[-1]["_id"]
+        return summaries, None
+
+    def text_search(self, query, limit=PAGE_SIZE):
+        """ Summaries of the quotations whose customer name, site or a line item contains every word of `query`, newest first
+
+        A substring scan; the embedded store has no text index.
+        """
+        words = query.split()
+        if not words:
+            return []
+        condition = ("(customer_name LIKE ?1 OR building_site LIKE ?1"
+                     " OR EXISTS (SELECT 1 FROM json_each(quotations.document, '$.floors') AS item WHERE json_extract(item.value, '$.name') LIKE ?1)"
+                     " OR EXISTS (SELECT 1 FROM json_each(quotations.document, '$.extra_works') AS item WHERE json_extract(item.value, '$.name') LIKE ?1))")
+        clauses, params = [], []
+        for number, word in enumerate(words, 1):
+            clauses.append(condition.replace("?1", f"?{number}"))
+            params.append(f"%{word}%")
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT id, {', '.join(SUMMARY_FIELDS)} FROM quotations WHERE {' AND '.join(clauses)} ORDER BY id DESC LIMIT {int(limit)}",
+                params).fetchall()
+        return [dict(zip(("_id",) + SUMMARY_FIELDS, (str(row[0]),) + tuple(row[1:])), score=1.0) for row in rows]
+
+
+def open_repository(url=None):
+    """ Repository for a mongodb:// URI or a sqlite:///path URL (default: ESTIMATOR_DB or local MongoDB) """
+    url = url or os.environ.get("ESTIMATOR_DB", MONGO_URI)
+    if url.startswith("sqlite:///"):
+        return SQLiteRepository(url[len("sqlite:///"):])
+    return MongoRepository(url)
+
+
+_repository = None
+_repository_lock = threading.Lock()
+
+
+def get_repository():
+    """ Process-wide repository; nothing connects until the first query """
+    global _repository
+    if _repository is None:
+        with _repository_lock:  # The GUI warms it up from a worker thread
+            if _repository is None:
+                _repository = open_repository()
+    return _repository
+
+
+def set_repository(repository):
+    """ Replace the process-wide repository (e.g. with a mongomock or SQLite one in tests) """
+    global _repository
+    _repository = repository
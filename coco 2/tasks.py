@@ -0,0 +1,161 @@
+""" Background task executor for the GUI: a thread pool plus a completion queue drained on the Tk thread
+
+Work functions run on pool threads and receive their Task, which they use to
+report progress and to check for cancellation. Every progress update, result
+and error is queued, and callbacks only run inside poll(), which the GUI calls
+from root.after. Tk widgets are therefore only touched from the Tk thread. Every task is timed
+under its key (the first element of a tuple key) in the process metrics.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import profiled, record_action
+
+
+class TaskCancelled(Exception):
+    """ Raised by Task.check() once the task has been cancelled """
+
+
+class Task:
+    """ Handle of one submitted action, shared by the worker and the GUI """
+    __slots__ = ("key", "label", "future", "fraction", "_cancelled", "_events")
+
+    def __init__(self, key, label, events):
+        self.key = key
+        self.label = label
+        self.future = None
+        self.fraction = 0.0  # Last reported progress, updated by TaskExecutor.poll()
+        self._cancelled = threading.Event()
+        self._events = events
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        """ Ask the task to stop; a task that has not started yet never runs, a running one stops at its next check() """
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self._events.put((self, "cancelled", None))  # Never started, so the worker will not report it
+
+    def check(self):
+        """ Raise TaskCancelled if the task was cancelled; call between steps of the work """
+        if self._cancelled.is_set():
+            raise TaskCancelled()
+
+    def progress(self, fraction, detail=""):
+        """ Report progress (0.0 to 1.0) from the worker thread """
+        self._events.put((self, "progress", (fraction, detail)))
+
+
+class TaskExecutor:
+    """ Runs work(task) on a thread pool, at most one task per key at a time
+
+    A second submit() for a key that is still running, or that was submitted less
+    than `debounce` seconds ago, is ignored, so a double-click cannot save or send
+    twice. on_status(task, status, detail) is called from poll() with the
+    statuses "started", "progress", "done", "failed" and "cancelled". A task
+    cancelled or replaced while its work runs ends as "cancelled" even if the
+    work never calls check(); its on_done / on_error are not called.
+    """
+
+    def __init__(self, max_workers=4, debounce=0.5, on_status=None):
+        self.debounce = debounce
+        self.on_status = on_status
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._events = queue.Queue()
+        self._running = {}
+        self._submitted_at = {}
+
+    def running(self, key):
+        return key in self._running
+
+    def submit(self, key, work, on_done=None, on_error=None, label=None, replace=False, debounce=None):
+        """ Queue work(task); returns the Task, or None when debounced
+
+        on_done(result) and on_error(exception) run on the polling thread. With
+        replace=True a running task of the same key is cancelled instead of the
+        new one being ignored. `debounce` overrides the executor default for
+        this call. Tasks without a label are not reported to on_status.
+        """
+        now = time.monotonic()
+        debounce = self.debounce if debounce is None else debounce
+        current = self._running.get(key)
+        if current is not None:
+            if not replace:
+                return None
+            current.cancel()
+        elif not replace and now - self._submitted_at.get(key, float("-inf")) < debounce:
+            return None
+
+        task = Task(key, label, self._events)
+        self._running[key] = task
+        self._submitted_at[key] = now
+        self._notify(task, "started", "")
+        task.future = self._pool.submit(self._run, task, work, on_done, on_error)
+        return task
+
+    def _run(self, task, work, on_done, on_error):
+        action = task.key[0] if isinstance(task.key, tuple) else task.key
+        start = time.perf_counter()
+        try:
+            task.check()
+            with profiled(action):
+                result = work(task)
+        except TaskCancelled:
+            outcome, event = "cancelled", (task, "cancelled", None)
+        except Exception as e:
+            outcome, event = "failed", (task, "failed", (e, on_error))
+        else:
+            outcome, event = "done", (task, "done", (result, on_done))
+        if task.cancelled:
+            outcome, event = "cancelled", (task, "cancelled", None)
+        record_action(action, time.perf_counter() - start, outcome)
+        self._events.put(event)
+
+    def cancel(self, key):
+        task = self._running.get(key)
+        if task is not None:
+            task.cancel()
+
+    def _notify(self, task, status, detail):
+        if task.label is not None and self.on_status:
+            self.on_status(task, status, detail)
+
+    def poll(self):
+        """ Deliver queued progress and completions; call from the GUI thread """
+        while True:
+            try:
+                task, status, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+
+            if status == "progress":
+                if not task.cancelled:
+                    task.fraction, detail = payload
+                    self._notify(task, status, detail)
+                continue
+
+            if self._running.get(task.key) is task:
+                del self._running[task.key]
+            if task.cancelled:
+                status = "cancelled"  # Cancelled after the worker finished; the result is stale
+            if status == "done":
+                result, on_done = payload
+                self._notify(task, status, "")
+                if on_done:
+                    on_done(result)
+            elif status == "failed":
+                error, on_error = payload
+                self._notify(task, status, str(error))
+                if on_error:
+                    on_error(error)
+            else:
+                self._notify(task, status, "")
+
+    def shutdown(self):
+        for task in list(self._running.values()):
+            task.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
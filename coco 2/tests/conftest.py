@@ -0,0 +1,18 @@
+""" The modules live side by side in the app directory and import each other by name """
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(params=["sqlite", "mongomock"])
+def repository(request):
+    """ The same tests against the SQLite backend and MongoDB (through mongomock) """
+    from storage import MongoRepository, SQLiteRepository
+
+    if request.param == "sqlite":
+        return SQLiteRepository(":memory:")
+    mongomock = pytest.importorskip("mongomock")
+    return MongoRepository(client=mongomock.MongoClient())
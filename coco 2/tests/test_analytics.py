@@ -0,0 +1,85 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from analytics import UNKNOWN_MONTH, floor_rates, month_key, monthly_totals, top_extra_works
+from storage import SQLiteRepository
+
+
+def quotation(n, site="Plot 12", created_at=None):
+    floors = [{"name": "Ground Floor", "area_sqft": 1000 + n, "cost_per_sqft": 1800, "total_cost": (1000 + n) * 1800},
+              {"name": "first floor" if n % 2 else "First Floor", "area_sqft": 900, "cost_per_sqft": 1900, "total_cost": 900 * 1900}]
+    works = [{"name": "Sump", "quantity": n, "cost_per_unit": 15000, "total_cost": n * 15000}]
+    document = {"email": f"customer{n}@example.com", "customer_name": "Ravi Kumar", "building_site": site, "validity_date": "2030-12-31",
+                "floors": floors, "extra_works": works, "total_project_cost": sum(item["total_cost"] for item in floors + works)}
+    if created_at is not None:
+        document["created_at"] = created_at
+    return document
+
+
+def reports(repository):
+    """ Every report, with names lower-cased: a row shows whichever spelling of a name it saw first """
+    return (monthly_totals(repository),
+            [dict(row, name=row["name"].lower()) for row in floor_rates(repository)],
+            [dict(row, name=row["name"].lower()) for row in top_extra_works(repository, 100)])
+
+
+def test_month_key():
+    assert month_key(datetime(2024, 3, 5, tzinfo=timezone.utc)) == "2024-03"
+    assert month_key("2024-11-30T10:00:00+00:00") == "2024-11"
+    assert month_key(None) == month_key("") == UNKNOWN_MONTH
+
+
+def test_incremental_summaries_match_a_rebuild(repository):
+    ids = [repository.save(quotation(n, created_at=datetime(2024, 1 + n % 3, 10, tzinfo=timezone.utc))) for n in range(1, 6)]
+    # 4 and 5 are duplicates; they come last because mongomock numbers upserted_ids by upsert, not by operation index
+    assert repository.upsert_many([quotation(n) for n in (6, 7, 8, 4, 5)]) == (3, 2)
+    repository.save_revision(ids[0], quotation(20, site="Plot 13"))
+    repository.save(quotation(2, created_at=datetime(2024, 3, 10, tzinfo=timezone.utc)))  # Duplicate content
+
+    incremental = reports(repository)
+    assert sum(row["count"] for row in incremental[0]) == 8
+    assert {row["name"] for row in incremental[1]} == {"ground floor", "first floor"}
+    repository.rebuild_summaries()
+    assert reports(repository) == incremental
+
+
+def test_rebuild_dates_quotations_without_created_at_by_their_object_id():
+    mongomock = pytest.importorskip("mongomock")
+    from storage import MongoRepository
+
+    repository = MongoRepository(client=mongomock.MongoClient())
+    legacy_id = repository.collection.insert_one(quotation(1)).inserted_id  # Stored before created_at existed
+    repository.collection.insert_one(dict(quotation(2), created_at=None))
+    month = month_key(legacy_id.generation_time)
+
+    assert repository.rebuild_summaries() > 0
+    assert monthly_totals(repository) == [{"month": month, "count": 2, "total": pytest.approx(
+        quotation(1)["total_project_cost"] + quotation(2)["total_project_cost"])}]
+    assert repository.collection.count_documents({"created_at": None}) == 0
+
+
+def test_revising_a_quotation_without_created_at_keeps_its_month():
+    mongomock = pytest.importorskip("mongomock")
+    from storage import MongoRepository
+
+    repository = MongoRepository(client=mongomock.MongoClient())
+    legacy_id = repository.collection.insert_one(quotation(1)).inserted_id
+    repository.rebuild_summaries()
+    repository.collection.update_one({"_id": legacy_id}, {"$unset": {"created_at": ""}})
+
+    repository.save_revision(str(legacy_id), quotation(3))
+    incremental = reports(repository)
+    assert [row["month"] for row in incremental[0]] == [month_key(legacy_id.generation_time)]
+    repository.rebuild_summaries()
+    assert reports(repository) == incremental
+
+
+def test_sqlite_rows_without_created_at_count_as_unknown():
+    repository = SQLiteRepository(":memory:")
+    repository.save(quotation(1, created_at=datetime(2024, 5, 1, tzinfo=timezone.utc)))
+    repository.save(quotation(2))
+    repository.conn.execute("UPDATE quotations SET created_at = NULL WHERE id = 2")
+
+    repository.rebuild_summaries()
+    assert [row["month"] for row in monthly_totals(repository)] == ["2024-05", UNKNOWN_MONTH]
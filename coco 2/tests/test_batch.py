@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from batch import pdf_filename, run_batch
+from estimator_core import ValidationError, iter_records
+
+CSV_HEAD = "quote_id,email,customer_name,building_site,validity_date,item_type,name,quantity,rate\n"
+
+
+def record(n, **changes):
+    return dict({"quote_id": f"Q{n}", "email": f"customer{n}@example.com", "customer_name": "Ravi Kumar", "building_site": f"Plot {n}",
+                 "validity_date": "2030-12-31", "floors": [{"name": "Ground Floor", "area_sqft": 1000 + n, "cost_per_sqft": 1800}],
+                 "extra_works": []}, **changes)
+
+
+def errors():
+    seen = []
+    return seen, lambda location, error: seen.append((location, type(error)))
+
+
+def test_jsonl_skips_malformed_lines(tmp_path):
+    path = tmp_path / "quotes.jsonl"
+    line = json.dumps(record(1))
+    path.write_text(f"{line}\n\n{{not json\n{json.dumps({'email': 'a@example.com'})}\n", encoding="utf-8")
+
+    seen, on_error = errors()
+    records = list(iter_records(str(path), on_error))
+    assert [r["quote_id"] for r in records] == ["Q1", "4"]  # Without a quote_id, the line number
+    assert seen == [("line 3", json.JSONDecodeError)]
+
+    with pytest.raises(ValueError):
+        list(iter_records(str(path)))
+
+
+def test_csv_groups_consecutive_rows_into_quotations(tmp_path):
+    path = tmp_path / "quotes.csv"
+    path.write_text(CSV_HEAD +
+                    "Q1,a@example.com,Ravi Kumar,Plot 1,2030-12-31,floor,Ground Floor,1000,1800\n"
+                    "Q1,a@example.com,Ravi Kumar,Plot 1,2030-12-31,Extra_Work,Sump,1,45000\n"
+                    "Q2,b@example.com,Anu,Plot 2,2030-12-31,floor,Ground Floor,900,1700\n", encoding="utf-8")
+
+    records = list(iter_records(str(path)))
+    assert [r["quote_id"] for r in records] == ["Q1", "Q2"]
+    assert records[0]["floors"] == [{"name": "Ground Floor", "area_sqft": "1000", "cost_per_sqft": "1800"}]
+    assert records[0]["extra_works"] == [{"name": "Sump", "quantity": "1", "cost_per_unit": "45000"}]
+
+
+def test_csv_skips_a_quotation_with_an_unknown_item_type(tmp_path):
+    path = tmp_path / "quotes.csv"
+    path.write_text(CSV_HEAD +
+                    "Q1,a@example.com,Ravi Kumar,Plot 1,2030-12-31,floor,Ground Floor,1000,1800\n"
+                    "Q1,a@example.com,Ravi Kumar,Plot 1,2030-12-31,roof,Terrace,1,1\n"
+                    "Q1,a@example.com,Ravi Kumar,Plot 1,2030-12-31,wall,Compound,1,1\n"
+                    "Q2,b@example.com,Anu,Plot 2,2030-12-31,floor,Ground Floor,900,1700\n", encoding="utf-8")
+
+    seen, on_error = errors()
+    assert [r["quote_id"] for r in iter_records(str(path), on_error)] == ["Q2"]
+    assert seen == [("quote Q1", ValidationError)]  # Reported once per quotation
+
+    with pytest.raises(ValidationError, match="Unknown item_type 'roof'"):
+        list(iter_records(str(path)))
+
+
+def test_pdf_filename_is_safe():
+    assert pdf_filename({"quote_id": "../Q 1/2"}) == "Q_1_2.pdf"
+    assert pdf_filename({}) == "quotation.pdf"
+
+
+def test_run_batch_renders_and_counts_failures(tmp_path):
+    path = tmp_path / "quotes.jsonl"
+    lines = [json.dumps(record(n)) for n in range(5)]
+    lines += ["{not json", json.dumps(record(5, customer_name="")), json.dumps(record(6, floors=[]))]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    output_dir = tmp_path / "pdfs"
+
+    messages = []
+    rendered, failures, _ = run_batch(str(path), str(output_dir), workers=2, report=messages.append)
+    assert rendered == 5
+    assert sorted(location for location, _ in failures) == ["line 6", "quote Q5", "quote Q6"]
+    assert sorted(p.name for p in output_dir.iterdir()) == [f"Q{n}.pdf" for n in range(5)]
+    assert all(p.read_bytes().startswith(b"%PDF") for p in output_dir.iterdir())
+    assert messages[-1].startswith("✅ 5 quotations rendered, 3 failed")
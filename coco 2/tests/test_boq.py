@@ -0,0 +1,54 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from boq import EXTRA_WORK, FLOOR, BillOfQuantities, format_paise, to_milli, to_paise  # noqa: E402
+from estimator_core import quotation_from_dict  # noqa: E402
+
+
+@pytest.mark.parametrize("amount, paise", [(0.285, 29), ("2.675", 268), (1.005, 101), (1999.5, 199950), (0, 0), (-0.125, -13)])
+def test_to_paise_rounds_half_up(amount, paise):
+    assert to_paise(amount) == paise
+
+
+def test_to_milli_rounds_half_up():
+    assert to_milli(1200.125) == 1200125
+    assert to_milli("0.0005") == 1
+
+
+def test_format_paise():
+    assert format_paise(123456789) == "₹1,234,567.89"
+    assert format_paise(-5) == "-₹0.05"
+
+
+def test_add_and_extend_store_the_same_values():
+    quantities = [1, 0.285, 1200.125, "3.0005", np.float64(2.675)]
+    rates = [0.285, 1.005, 2.675, "1999.995", np.float64(0.285)]
+    added = BillOfQuantities()
+    for i, (quantity, rate) in enumerate(zip(quantities, rates)):
+        added.add(FLOOR, f"item {i}", quantity, rate)
+    extended = BillOfQuantities()
+    extended.extend(FLOOR, [f"item {i}" for i in range(len(quantities))], quantities, rates)
+
+    assert added.qty_milli[:len(added)].tolist() == extended.qty_milli[:len(extended)].tolist()
+    assert added.rate_paise[:len(added)].tolist() == extended.rate_paise[:len(extended)].tolist()
+    assert added.compute().grand_total == extended.compute().grand_total
+
+
+def test_from_quotation_totals_are_exact():
+    quotation = quotation_from_dict({"floors": [{"name": "Ground Floor", "area_sqft": "1200.125", "cost_per_sqft": "1999.99"}] * 3,
+                                     "extra_works": [{"name": "Sump", "quantity": 7, "cost_per_unit": "0.285"}]})
+    totals = BillOfQuantities.from_quotation(quotation, tax_bp=1800).compute()
+
+    # 1200.125 sqft x ₹1999.99 = ₹2,400,237.99875; 7 x ₹0.29 (the rate rounds to paise first)
+    assert totals.line_totals.tolist() == [240023800] * 3 + [203]
+    assert totals.subtotal == 3 * 240023800 + 203
+    assert totals.line_tax.tolist() == [43204284] * 3 + [37]
+    assert totals.by_category == {"floor": 3 * (240023800 + 43204284), "extra_work": 203 + 37}
+    assert totals.grand_total == totals.subtotal + totals.tax
+
+
+def test_extra_work_category():
+    bill = BillOfQuantities()
+    bill.extend(EXTRA_WORK, ["Sump", "Sump"], [1, 2], [100, 100])
+    assert bill.compute().by_group == {"Sump": 30000}
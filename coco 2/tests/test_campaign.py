@@ -0,0 +1,105 @@
+import csv
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+pytest.importorskip("fpdf")
+
+import campaign  # noqa: E402
+from storage import SQLiteRepository, set_repository  # noqa: E402
+
+
+def document(n, **fields):
+    return dict({"email": f"customer{n}@example.com", "customer_name": "Ravi Kumar", "building_site": f"Plot {n}",
+                 "validity_date": "2030-12-31", "floors": [{"name": "Ground Floor", "area_sqft": 1000 + n, "cost_per_sqft": 1800,
+                                                            "total_cost": (1000 + n) * 1800}],
+                 "extra_works": [], "total_project_cost": (1000 + n) * 1800}, **fields)
+
+
+class Session:
+    """ SMTPSession stand-in that records sends and refuses bounce@example.com """
+    sent = []
+    lock = threading.Lock()
+
+    def send(self, sender, recipient, raw):
+        if recipient == "bounce@example.com":
+            raise OSError("550 No such user")
+        with self.lock:
+            self.sent.append(recipient)
+
+    def close(self):
+        pass
+
+
+class InlineExecutor:
+    """ ProcessPoolExecutor stand-in that renders on submit and tracks results not yet collected """
+    max_outstanding = 0
+
+    def __init__(self, max_workers=None):
+        self.outstanding = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, function, *args):
+        future = Future()
+        try:
+            future.set_result(function(*args))
+        except Exception as e:
+            future.set_exception(e)
+        self.outstanding.add(future)
+        InlineExecutor.max_outstanding = max(InlineExecutor.max_outstanding, len(self.outstanding))
+        original = future.result
+        future.result = lambda timeout=None: (self.outstanding.discard(future), original(timeout))[1]
+        return future
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # The PDF cache's disk tier
+    repository = SQLiteRepository(":memory:")
+    set_repository(repository)
+    Session.sent = []
+    yield repository
+    set_repository(None)
+
+
+def test_report_has_one_row_per_quotation(repository, monkeypatch):
+    monkeypatch.setattr(campaign, "ProcessPoolExecutor", InlineExecutor)
+    ids = [repository.save(document(n)) for n in range(20)]
+    ids.append(repository.save(document(20, email="bounce@example.com")))
+    ids.append(repository.save(document(21, floors=[{"name": "", "area_sqft": 1, "cost_per_sqft": 1, "total_cost": 1}])))
+    ids.append("999999")
+
+    InlineExecutor.max_outstanding = 0
+    rows, _ = campaign.run_campaign(ids, sessions=2, workers=3, session_factory=Session, report=lambda message: None)
+    assert InlineExecutor.max_outstanding <= 3 * 2  # Renders are collected as they are submitted
+    by_id = {row["quote_id"]: row for row in rows}
+    assert len(rows) == len(by_id) == len(ids)
+    assert sorted(Session.sent) == sorted(f"customer{n}@example.com" for n in range(20))
+    assert by_id[ids[20]]["status"] == "failed" and "550" in by_id[ids[20]]["error"]
+    assert by_id[ids[21]]["error"].startswith("render error:")
+    assert (by_id["999999"]["status"], by_id["999999"]["error"]) == ("failed", "quotation not found")
+
+    campaign.write_report(rows, "report.csv")
+    with open("report.csv", encoding="utf-8", newline="") as f:
+        assert [row["quote_id"] for row in csv.DictReader(f)] == [row["quote_id"] for row in rows]
+
+
+def test_renders_in_worker_processes(repository):
+    ids = [repository.save(document(n)) for n in range(3)]
+    rows, _ = campaign.run_campaign(ids, sessions=1, workers=2, session_factory=Session, report=lambda message: None)
+    assert [row["status"] for row in rows] == ["sent"] * 3
+
+
+def test_rate_limit_spaces_sends(repository, monkeypatch):
+    monkeypatch.setattr(campaign, "ProcessPoolExecutor", InlineExecutor)
+    ids = [repository.save(document(n)) for n in range(3)]
+    sleeps = []
+    monkeypatch.setattr("mailer.time.sleep", sleeps.append)
+    campaign.run_campaign(ids, sessions=1, per_minute=60, workers=1, session_factory=Session, report=lambda message: None)
+    assert sleeps == pytest.approx([1.0, 2.0], abs=0.2)  # Sends 1 s apart; the stubbed sleep does not advance the clock
@@ -0,0 +1,46 @@
+from catalogue import RateCatalogue
+from storage import SQLiteRepository
+
+
+class UnreachableRepository:
+    calls = 0
+
+    def latest_catalogue_version(self):
+        self.calls += 1
+        raise ConnectionError("database unreachable")
+
+
+def test_cached_never_touches_the_repository():
+    repository = UnreachableRepository()
+    catalogue = RateCatalogue(repository)
+    assert catalogue.stale()
+    assert catalogue.cached() is None
+    assert repository.calls == 0
+
+
+def test_current_refreshes_the_cached_snapshot():
+    repository = SQLiteRepository(":memory:")
+    catalogue = RateCatalogue(repository, refresh_interval=3600)
+    repository.save_catalogue([{"name": "Ground Floor", "category": "floor", "rate": 1850.0, "unit": "sqft"}])
+
+    snapshot = catalogue.current()
+    assert not catalogue.stale()
+    assert catalogue.cached() is snapshot
+    assert snapshot.get("ground floor", "floor")["rate"] == 1850.0
+
+    catalogue.publish([{"name": "Ground Floor", "category": "floor", "rate": 1990.0, "unit": "sqft"}])
+    assert catalogue.stale()
+    assert catalogue.cached() is snapshot  # Unchanged until the next current()
+    assert catalogue.current().get("Ground Floor", "floor")["rate"] == 1990.0
+
+
+def test_an_unreachable_database_is_not_retried_until_the_interval_passes():
+    repository = UnreachableRepository()
+    catalogue = RateCatalogue(repository, refresh_interval=3600)
+    for _ in range(3):
+        try:
+            catalogue.current()
+        except ConnectionError:
+            pass
+    assert repository.calls == 1
+    assert not catalogue.stale()
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import estimate
+from pdf_cache import get_pdf_cache, set_pdf_cache
+
+QUOTATION = {"email": "ravi@example.com", "customer_name": "Ravi Kumar", "building_site": "Plot 7", "validity_date": "2030-12-31",
+             "floors": [{"name": "Ground Floor", "area_sqft": 1000, "cost_per_sqft": 1800}],
+             "extra_works": [{"name": "Sump", "quantity": 1, "cost_per_unit": 45000}]}
+
+
+@pytest.fixture(autouse=True)
+def restore_pdf_cache(monkeypatch):
+    """ main() installs a memory-only PDF cache for the process """
+    monkeypatch.delenv("ESTIMATOR_PDF_CACHE", raising=False)
+    cache = get_pdf_cache()
+    yield
+    set_pdf_cache(cache)
+
+
+def write(path, data):
+    path.write_text(json.dumps(data), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_writes_the_pdf(tmp_path, capsys, stream):
+    source = write(tmp_path / "quote.json", QUOTATION)
+    assert estimate.main([source] + (["--stream"] if stream else [])) == 0
+
+    assert (tmp_path / "quote.pdf").read_bytes().startswith(b"%PDF")
+    assert "Total Project Cost ₹1845000.00" in capsys.readouterr().out
+
+
+def test_output_path(tmp_path):
+    output = tmp_path / "out" / "ravi.pdf"
+    output.parent.mkdir()
+    assert estimate.main([write(tmp_path / "quote.json", QUOTATION), "-o", str(output)]) == 0
+    assert output.read_bytes().startswith(b"%PDF")
+
+
+@pytest.mark.parametrize("data, message", [
+    (dict(QUOTATION, customer_name=""), "Customer name cannot be empty."),
+    (dict(QUOTATION, floors=[{"name": "Ground Floor", "area_sqft": "lots", "cost_per_sqft": 1800}]), "valid numerical values"),
+    (dict(QUOTATION, floors=[], extra_works=[]), "No data to export!"),
+])
+def test_rejects_invalid_input(tmp_path, capsys, data, message):
+    assert estimate.main([write(tmp_path / "quote.json", data)]) == 1
+    assert message in capsys.readouterr().err
+    assert not (tmp_path / "quote.pdf").exists()
+
+
+def test_rejects_a_missing_or_malformed_file(tmp_path):
+    assert estimate.main([str(tmp_path / "missing.json")]) == 1
+    broken = tmp_path / "broken.json"
+    broken.write_text("{not json", encoding="utf-8")
+    assert estimate.main([str(broken)]) == 1
@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from estimator_core import Quotation, ValidationError, parse_extra_work, parse_floor, quotation_from_dict, validate_customer_info
+
+
+def quotation():
+    quotation = Quotation("ravi@example.com", "Ravi Kumar", "Plot 7", "2030-12-31")
+    quotation.add_floor("Ground Floor", 1000.0, 1800.0)
+    quotation.add_floor("First Floor", 800.0, 1750.0)
+    quotation.add_extra_work("Sump", 1, 45000.0)
+    return quotation
+
+
+def test_line_items_keep_a_running_total():
+    q = quotation()
+    assert [floor.total_cost for floor in q.floors] == [1800000.0, 1400000.0]
+    assert q.extra_works[0].total_cost == 45000.0
+    assert q.total_cost == 3245000.0
+
+
+def test_clear_empties_the_quotation_but_keeps_the_customer():
+    q = quotation()
+    q.catalogue_version = 3
+    assert not q.is_empty()
+
+    q.clear()
+    assert q.is_empty()
+    assert q.total_cost == 0.0
+    assert q.catalogue_version is None
+    assert q.customer_name == "Ravi Kumar"
+
+
+def test_document_round_trip():
+    q = quotation()
+    document = q.to_document()
+    assert document["total_project_cost"] == 3245000.0
+    assert document["floors"][1] == {"name": "First Floor", "area_sqft": 800.0, "cost_per_sqft": 1750.0, "total_cost": 1400000.0}
+    assert "catalogue_version" not in document
+
+    copy = quotation_from_dict(document)
+    assert copy.to_document() == document
+    assert copy.total_cost == q.total_cost
+
+
+def test_catalogue_version_is_stored_when_set():
+    q = quotation()
+    q.catalogue_version = 4
+    document = q.to_document()
+    assert document["catalogue_version"] == 4
+    assert quotation_from_dict(document).catalogue_version == 4
+
+
+def test_from_dict_normalizes_customer_fields():
+    q = quotation_from_dict({"email": " Ravi@Example.COM ", "customer_name": " Ravi Kumar ", "building_site": " Plot 7 ",
+                             "validity_date": " 2030-12-31 ", "floors": [{"name": " Ground Floor ", "area_sqft": "1000", "cost_per_sqft": "1800"}]})
+    assert (q.email, q.customer_name, q.building_site, q.validity_date) == ("ravi@example.com", "Ravi Kumar", "Plot 7", "2030-12-31")
+    assert q.floors[0].name == "Ground Floor"
+    assert q.total_cost == pytest.approx(1800000.0)
+
+
+@pytest.mark.parametrize("parse", [parse_floor, parse_extra_work])
+def test_parsers_accept_numeric_strings(parse):
+    assert parse(" Sump ", "2", "45000.5") == ("Sump", 2, 45000.5)
+
+
+@pytest.mark.parametrize("parse, field, message", [
+    (parse_floor, "floor_name", "Floor name cannot be empty."),
+    (parse_extra_work, "extra_works", "Extra works name cannot be empty."),
+])
+def test_parsers_reject_a_blank_name(parse, field, message):
+    with pytest.raises(ValidationError, match=message) as error:
+        parse("   ", "1", "1")
+    assert error.value.field == field
+
+
+@pytest.mark.parametrize("parse", [parse_floor, parse_extra_work])
+@pytest.mark.parametrize("quantity, rate, message", [
+    ("", "1800", "Enter valid numerical values."),
+    ("1000", None, "Enter valid numerical values."),
+    ("lots", "1800", "Please enter valid numerical values."),
+    ("1000", "cheap", "Please enter valid numerical values."),
+])
+def test_parsers_reject_missing_or_bad_numbers(parse, quantity, rate, message):
+    with pytest.raises(ValidationError, match=message):
+        parse("Ground Floor", quantity, rate)
+
+
+def test_extra_work_quantity_must_be_whole():
+    with pytest.raises(ValidationError):
+        parse_extra_work("Sump", "1.5", "45000")
+
+
+def test_bad_line_item_fails_the_whole_dict():
+    with pytest.raises(ValidationError):
+        quotation_from_dict({"floors": [{"name": "Ground Floor", "area_sqft": "lots", "cost_per_sqft": 1800}]})
+
+
+@pytest.mark.parametrize("customer_name, building_site, validity_date, field", [
+    ("", "Plot 7", "2030-12-31", "customer_name"),
+    ("Ravi 2", "Plot 7", "2030-12-31", "customer_name"),
+    ("Ravi Kumar", "", "2030-12-31", "building_site"),
+    ("Ravi Kumar", "Plot 7", "31-12-2030", "validity_date"),
+    ("Ravi Kumar", "Plot 7", "2030-02-30", "validity_date"),
+])
+def test_customer_info_rejections_name_the_field(customer_name, building_site, validity_date, field):
+    with pytest.raises(ValidationError) as error:
+        validate_customer_info(customer_name, building_site, validity_date)
+    assert error.value.field == field
+
+
+def test_customer_info_accepts_a_valid_customer():
+    validate_customer_info("Ravi Kumar", "Plot 7", "2030-12-31")
+
+
+def test_core_imports_without_tkinter_or_mongodb():
+    code = "import sys, estimator_core; print(sorted({'tkinter', 'pymongo'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
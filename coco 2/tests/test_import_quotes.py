@@ -0,0 +1,60 @@
+import json
+
+from import_quotes import import_records
+from storage import content_key
+
+CSV_HEAD = "quote_id,email,customer_name,building_site,validity_date,item_type,name,quantity,rate\n"
+
+
+def record(n):
+    return {"quote_id": f"Q{n}", "email": f"customer{n}@example.com", "customer_name": "Ravi Kumar", "building_site": f"Plot {n}",
+            "validity_date": "2030-12-31", "floors": [{"name": "Ground Floor", "area_sqft": 1000 + n, "cost_per_sqft": 1800}],
+            "extra_works": [{"name": "Sump", "quantity": 1, "cost_per_unit": 45000}]}
+
+
+def stored_count(repository):
+    return sum(1 for _ in repository.iter_documents(("_id",)))
+
+
+def quiet(message):
+    pass
+
+
+def test_importing_a_file_twice_inserts_nothing_new(repository, tmp_path):
+    path = tmp_path / "history.jsonl"
+    lines = [json.dumps(record(n)) for n in range(7)] + [json.dumps(record(3)), "{not json", json.dumps(dict(record(8), floors=[{"name": ""}]))]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    assert import_records(str(path), repository, batch_size=3, report=quiet)[:3] == (7, 1, 2)
+    assert import_records(str(path), repository, batch_size=3, report=quiet)[:3] == (0, 8, 2)
+    assert stored_count(repository) == 7
+
+
+def test_csv_and_jsonl_of_the_same_quotations_are_duplicates(repository, tmp_path):
+    jsonl = tmp_path / "history.jsonl"
+    jsonl.write_text("".join(json.dumps(record(n)) + "\n" for n in range(3)), encoding="utf-8")
+    csv_path = tmp_path / "history.csv"
+    csv_path.write_text(CSV_HEAD + "".join(
+        f"Q{n},customer{n}@example.com,Ravi Kumar,Plot {n},2030-12-31,floor,Ground Floor,{1000 + n},1800\n"
+        f"Q{n},customer{n}@example.com,Ravi Kumar,Plot {n},2030-12-31,extra_work,Sump,1,45000\n" for n in range(4)), encoding="utf-8")
+
+    assert import_records(str(jsonl), repository, report=quiet)[:3] == (3, 0, 0)
+    assert import_records(str(csv_path), repository, report=quiet)[:3] == (1, 3, 0)
+    assert stored_count(repository) == 4
+
+
+def test_saving_the_same_content_twice_returns_the_same_id(repository):
+    document = dict(record(1), total_project_cost=1001 * 1800 + 45000)
+    document.pop("quote_id")
+    for item in document["floors"] + document["extra_works"]:
+        item["total_cost"] = 0
+    first = repository.save(dict(document))
+    assert repository.save(dict(document, created_at="2020-01-01T00:00:00+00:00", total_project_cost=1)) == first
+    assert repository.save(dict(document, building_site="Plot 99")) != first
+    assert stored_count(repository) == 2
+
+
+def test_content_key_ignores_ids_timestamps_and_totals():
+    document = record(1)
+    assert content_key(document) == content_key(dict(document, _id="x", created_at="2020-01-01", total_project_cost=5, quote_id="Q9"))
+    assert content_key(document) != content_key(dict(document, email="other@example.com"))
@@ -0,0 +1,137 @@
+import smtplib
+import socket
+import threading
+
+import pytest
+
+pytest.importorskip("aiosmtpd")
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from mailer import MailQueue, RateLimiter, build_message, permanent_failure  # noqa: E402
+
+
+class Handler:
+    """ Accepts everything except the replies set in `refuse` (recipient -> list of RCPT replies, used in turn) """
+
+    def __init__(self):
+        self.delivered = []
+        self.peers = set()
+        self.refuse = {}
+        self.data_reply = None
+        self.lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        with self.lock:
+            replies = self.refuse.get(address)
+            reply = replies.pop(0) if replies else None
+        if reply:
+            return reply
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.data_reply:
+            return self.data_reply
+        with self.lock:
+            self.delivered.extend(envelope.rcpt_tos)
+            self.peers.add(session.peer)  # One peer address per connection
+        return "250 Message accepted"
+
+
+@pytest.fixture
+def smtp_server():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+
+@pytest.fixture
+def mail_queue(smtp_server, tmp_path):
+    _, port = smtp_server
+    statuses = []
+    mail_queue = MailQueue(str(tmp_path / "outbox"), host="127.0.0.1", port=port, username=None, use_tls=False,
+                           max_attempts=3, backoff=0.05, idle_timeout=5,
+                           on_status=lambda message_id, recipient, status, detail: statuses.append((recipient, status)))
+    mail_queue.statuses = statuses
+    mail_queue.start()
+    yield mail_queue
+    mail_queue.stop(timeout=5)
+
+
+def send(mail_queue, recipient):
+    return mail_queue.enqueue(build_message(recipient, b"%PDF-1.3 test"))
+
+
+def test_delivers_over_one_reused_session(smtp_server, mail_queue, tmp_path):
+    handler, _ = smtp_server
+    for n in range(3):
+        send(mail_queue, f"customer{n}@example.com")
+    mail_queue.join()
+    assert handler.delivered == [f"customer{n}@example.com" for n in range(3)]
+    assert len(handler.peers) == 1
+    assert sorted(status for _, status in mail_queue.statuses) == ["queued"] * 3 + ["sent"] * 3
+    assert [name for name in (tmp_path / "outbox").iterdir() if name.is_file()] == []
+
+
+def test_retries_then_sends(smtp_server, mail_queue):
+    handler, _ = smtp_server
+    handler.refuse["flaky@example.com"] = ["451 4.3.0 Try again later"]
+    send(mail_queue, "flaky@example.com")
+    mail_queue.join()
+    assert handler.delivered == ["flaky@example.com"]
+    assert [status for _, status in mail_queue.statuses] == ["queued", "retrying", "sent"]
+
+
+def test_retries_then_fails_without_holding_up_the_queue(smtp_server, mail_queue, tmp_path):
+    handler, _ = smtp_server
+    handler.refuse["flaky@example.com"] = ["451 4.3.0 Try again later"] * 3
+    send(mail_queue, "flaky@example.com")
+    send(mail_queue, "customer@example.com")
+    mail_queue.join()
+    assert handler.delivered == ["customer@example.com"]
+    outcomes = [entry for entry in mail_queue.statuses if entry[1] != "queued"]
+    assert outcomes.count(("flaky@example.com", "retrying")) == 2
+    assert outcomes[-1] == ("flaky@example.com", "failed")  # The other message did not wait for the retries
+    assert outcomes.index(("customer@example.com", "sent")) < outcomes.index(("flaky@example.com", "retrying"), 1)
+    assert len(list((tmp_path / "outbox" / "failed").iterdir())) == 1
+    assert mail_queue.pending() == 0
+
+
+@pytest.mark.parametrize("recipient_reply, data_reply", [("550 5.1.1 No such user", None), (None, "554 5.6.0 Message rejected")])
+def test_permanent_failure_is_not_retried(smtp_server, mail_queue, recipient_reply, data_reply):
+    handler, _ = smtp_server
+    if recipient_reply:
+        handler.refuse["gone@example.com"] = [recipient_reply]
+    handler.data_reply = data_reply
+    send(mail_queue, "gone@example.com")
+    mail_queue.join()
+    assert [status for _, status in mail_queue.statuses] == ["queued", "failed"]
+
+
+def test_permanent_failure():
+    assert permanent_failure(smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"No such user")}))
+    assert not permanent_failure(smtplib.SMTPRecipientsRefused({"a@example.com": (451, b"Later")}))
+    assert permanent_failure(smtplib.SMTPSenderRefused(553, b"Sender rejected", "me@example.com"))
+    assert permanent_failure(smtplib.SMTPDataError(554, b"Rejected"))
+    assert not permanent_failure(smtplib.SMTPDataError(421, b"Closing"))
+    assert not permanent_failure(smtplib.SMTPServerDisconnected("gone"))
+    assert not permanent_failure(ConnectionRefusedError())
+
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock = [100.0]
+    sleeps = []
+    monkeypatch.setattr("mailer.time.monotonic", lambda: clock[0])
+    monkeypatch.setattr("mailer.time.sleep", sleeps.append)
+    limiter = RateLimiter(per_minute=120)
+    for _ in range(3):
+        limiter.wait()
+    assert sleeps == [0.5, 1.0]
+    assert RateLimiter(0).interval == 0.0
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+import metrics
+from metrics import ACTIONS, PROFILED_ACTIONS, profiled, set_profiling, timed
+
+
+@pytest.fixture
+def profile_dir(tmp_path):
+    set_profiling(str(tmp_path))
+    yield tmp_path
+    set_profiling(None)
+
+
+def test_small_actions_are_timed_but_not_profiled(profile_dir):
+    done = ACTIONS.value("update_total", "done")
+    for _ in range(50):
+        with timed("update_total"):
+            pass
+    assert ACTIONS.value("update_total", "done") == done + 50
+    assert os.listdir(profile_dir) == []
+
+
+@pytest.mark.parametrize("action", sorted(PROFILED_ACTIONS))
+def test_user_actions_are_profiled(profile_dir, action):
+    with profiled(action):
+        sum(range(1000))
+    assert [name.split("-")[0] for name in os.listdir(profile_dir)] == [action]
+
+
+def test_failed_action_is_counted(profile_dir):
+    failed = ACTIONS.value("save", "failed")
+    with pytest.raises(ValueError):
+        with timed("save"):
+            raise ValueError("boom")
+    assert ACTIONS.value("save", "failed") == failed + 1
+    assert len(os.listdir(profile_dir)) == 1
+
+
+def test_profiling_off_writes_nothing(tmp_path):
+    assert metrics.profiling() is None
+    with profiled("export"):
+        pass
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from pdf_cache import PDFCache
+
+BUDGET = 64 * 1024
+
+
+def disk_bytes(directory):
+    return sum(entry.stat().st_size for shard in os.scandir(directory) if shard.is_dir() for entry in os.scandir(shard.path))
+
+
+def fill(directory, prefix, count=40, size=4096):
+    cache = PDFCache(directory, disk_bytes=BUDGET)
+    for i in range(count):
+        cache.put(f"{prefix}{i:062d}", bytes(size))
+    return count
+
+
+def test_memory_only_cache_writes_nothing(tmp_path):
+    cache = PDFCache(directory=None)
+    assert cache.get_or_render("ab" * 32, lambda: b"%PDF") == b"%PDF"
+    assert cache.get("ab" * 32) == b"%PDF"
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_disk_hit_from_another_instance(tmp_path):
+    PDFCache(str(tmp_path)).put("cd" * 32, b"%PDF-1.3")
+    other = PDFCache(str(tmp_path))
+    assert other.get("cd" * 32) == b"%PDF-1.3"
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_budget_holds_across_instances(tmp_path):
+    for prefix in ("aa", "bb", "cc"):
+        fill(str(tmp_path), prefix)
+    assert disk_bytes(tmp_path) <= BUDGET
+    assert PDFCache(str(tmp_path), disk_bytes=BUDGET).stats()["disk_bytes"] == disk_bytes(tmp_path)
+
+
+def test_budget_holds_across_processes(tmp_path):
+    with ProcessPoolExecutor(max_workers=4) as pool:
+        assert sum(pool.map(fill, [str(tmp_path)] * 4, ["aa", "bb", "cc", "dd"])) == 160
+    assert disk_bytes(tmp_path) <= BUDGET
+
+
+def test_least_recently_used_is_evicted_first(tmp_path):
+    cache = PDFCache(str(tmp_path), memory_bytes=0, disk_bytes=3 * 4096)
+    keys = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, bytes(4096))
+        os.utime(cache._path(key), (1000 + age, 1000 + age))
+    assert cache.get(keys[0]) is not None  # Now the most recently used
+    cache.put("99" + "0" * 62, bytes(4096))
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+
+def test_clear(tmp_path):
+    fill(str(tmp_path), "ee", count=3)
+    cache = PDFCache(str(tmp_path))
+    cache.clear()
+    assert cache.stats()["disk_entries"] == 0
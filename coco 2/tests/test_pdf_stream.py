@@ -0,0 +1,115 @@
+import io
+import os
+import re
+import zlib
+
+import pytest
+
+pytest.importorskip("fpdf")
+
+import estimate  # noqa: E402
+from estimator_core import ExtraWorkItem, FloorItem, Quotation  # noqa: E402
+from pdf_stream import stream_pdf  # noqa: E402
+
+CSV_HEAD = "email,customer_name,building_site,validity_date,item_type,name,quantity,rate\n"
+
+
+def quotation(floors=0, extra_works=0):
+    quote = Quotation("ravi@example.com", "Ravi Kumar", "Anna Nagar (Plot 7)", "2030-01-31")
+    for i in range(floors):
+        quote.add_floor(f"Floor {i}", 1000 + i, 1850.5)
+    for i in range(extra_works):
+        quote.add_extra_work(f"Sump {i}", 3, 12000)
+    return quote
+
+
+def render(quote, **kwargs):
+    out = io.BytesIO()
+    pages, size, total = stream_pdf(quote, out, compress=False, **kwargs)
+    data = out.getvalue()
+    assert size == len(data)
+    return pages, data, total
+
+
+def test_cross_reference_table_points_at_every_object():
+    out = io.BytesIO()
+    stream_pdf(quotation(60, 5), out)
+    data = out.getvalue()
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", data).group(1))
+    assert data[xref:xref + 5] == b"xref\n"
+    count = int(re.match(rb"xref\n0 (\d+)\n", data[xref:]).group(1))
+    offsets = re.findall(rb"(\d{10}) 00000 n \n", data[xref:])
+    assert len(offsets) == count - 1
+    for number, offset in enumerate(offsets, 1):
+        assert data[int(offset):].startswith(f"{number} 0 obj\n".encode())
+    streams = re.findall(rb"/FlateDecode /Length (\d+)>>\nstream\n", data)
+    assert streams and b"Floor Details" in b"".join(
+        zlib.decompress(block) for block in re.findall(rb"stream\n(.*?)\nendstream", data, re.S))
+
+
+def test_small_quotation_fits_on_one_page():
+    pages, data, total = render(quotation(2, 1))
+    assert pages == 1
+    assert b"/Count 1" in data
+    assert b"Page subtotal" not in data
+    assert b"Anna Nagar \\(Plot 7\\)" in data
+    assert total == pytest.approx(quotation(2, 1).total_cost)
+
+
+def test_long_tables_continue_with_subtotals():
+    quote = quotation(200, 40)
+    pages, data, total = render(quote)
+    assert pages > 5
+    assert f"/Count {pages}".encode() in data
+    breaks = data.count(b"Brought forward")
+    assert breaks == pages - 1
+    assert data.count(b"Page subtotal") == breaks + 2  # Every break, and the last page of each broken table
+    assert data.count(b"Floor Details \\(continued\\)") + data.count(b"Extra Works Details \\(continued\\)") == breaks
+    assert b"Floor Details total" in data and b"Extra Works Details total" in data
+    assert total == pytest.approx(quote.total_cost)
+    assert f"Total Project Cost: {quote.total_cost:.2f}".encode() in data
+
+
+def test_page_count_grows_with_rows():
+    assert render(quotation(50))[0] < render(quotation(500))[0]
+
+
+def test_line_items_are_read_once_from_iterables():
+    consumed = []
+
+    def floors():
+        for i in range(100):
+            consumed.append(i)
+            yield FloorItem(f"Floor {i}", 1000, 2000)
+
+    pages, data, total = render(quotation(), floors=floors(), extra_works=iter([ExtraWorkItem("Sump", 2, 5000)]))
+    assert consumed == list(range(100))
+    assert total == 100 * 1000 * 2000 + 2 * 5000
+    assert b"Floor 99" in data and b"Sump" in data
+
+
+def write_bill(path, rows):
+    path.write_text(CSV_HEAD + "".join(
+        f"ravi@example.com,Ravi Kumar,Anna Nagar,2030-01-31,{row}\n" for row in rows), encoding="utf-8")
+
+
+def test_estimate_streams_a_csv_bill(tmp_path, capsys, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("ESTIMATOR_PDF_CACHE", raising=False)
+    bill = tmp_path / "bill.csv"
+    write_bill(bill, [f"floor,Floor {i},1200,1850" for i in range(80)] + ["extra_work,Sump,2,15000"])
+    assert estimate.main([str(bill)]) == 0
+    data = (tmp_path / "bill.pdf").read_bytes()
+    assert data.startswith(b"%PDF-1.3") and data.endswith(b"%%EOF\n")
+    assert f"Total Project Cost ₹{80 * 1200 * 1850 + 2 * 15000:.2f}" in capsys.readouterr().out
+    assert sorted(os.listdir(tmp_path)) == ["bill.csv", "bill.pdf"]
+
+
+def test_bad_row_keeps_the_previous_pdf(tmp_path, capsys):
+    bill, output = tmp_path / "bill.csv", tmp_path / "bill.pdf"
+    output.write_bytes(b"previous export")
+    write_bill(bill, ["floor,Ground Floor,1200,1850", "floor,First Floor,lots,1850"])
+    assert estimate.main([str(bill), "-o", str(output)]) == 1
+    assert "Row 3" in capsys.readouterr().err
+    assert output.read_bytes() == b"previous export"
+    assert sorted(os.listdir(tmp_path)) == ["bill.csv", "bill.pdf"]
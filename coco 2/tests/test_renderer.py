@@ -0,0 +1,55 @@
+import pytest
+
+from estimator_core import Quotation, build_pdf, pdf_bytes, quotation_key, render_pdf, safe_text
+from pdf_cache import PDFCache, get_pdf_cache, set_pdf_cache
+
+
+@pytest.fixture
+def cache():
+    previous = get_pdf_cache()
+    cache = PDFCache(directory=None)
+    set_pdf_cache(cache)
+    yield cache
+    set_pdf_cache(previous)
+
+
+def quotation(area=1000.0):
+    quotation = Quotation("ravi@example.com", "Ravi Kumar", "Plot 7", "2030-12-31")
+    quotation.add_floor("Ground Floor", area, 1800.0)
+    quotation.add_extra_work("Sump", 1, 45000.0)
+    return quotation
+
+
+def test_pdf_bytes_is_a_pdf():
+    data = pdf_bytes(build_pdf(quotation()))
+    assert isinstance(data, bytes)
+    assert data.startswith(b"%PDF")
+
+
+def test_render_is_memoized(cache):
+    first = render_pdf(quotation())
+    assert first.startswith(b"%PDF")
+    assert render_pdf(quotation()) is first  # An equal quotation is served from the cache
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.get(quotation_key(quotation())) is first
+
+
+def test_changed_content_renders_again(cache):
+    assert render_pdf(quotation()) is not render_pdf(quotation(area=1200.0))
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_entries"]) == (2, 2)
+
+
+def test_key_follows_content_and_date():
+    key = quotation_key(quotation(), "2030-01-01")
+    assert quotation_key(quotation(), "2030-01-01") == key
+    assert quotation_key(quotation(area=1200.0), "2030-01-01") != key
+    assert quotation_key(quotation(), "2030-01-02") != key  # The date is printed on the PDF
+
+    renamed = quotation()
+    renamed.customer_name = "Anu"
+    assert quotation_key(renamed, "2030-01-01") != key
+
+
+def test_safe_text_drops_what_latin1_cannot_print():
+    assert safe_text("Café ₹ ✅") == "Cafe  "
@@ -0,0 +1,81 @@
+import csv
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from boq import EXTRA_WORK, FLOOR, BillOfQuantities  # noqa: E402
+from reprice import RateTable, reprice_chunk, run_reprice  # noqa: E402
+from storage import SQLiteRepository  # noqa: E402
+
+RATES = RateTable({"floors": {"*": "+6%", "Ground Floor": 1950}, "extra_works": {"Compound wall": "+12.5%"}})
+
+
+def document(quote_id, floors=(), works=(), **fields):
+    return dict({"_id": quote_id, "email": f"{quote_id}@example.com", "customer_name": "Ravi Kumar",
+                 "floors": [{"name": name, "area_sqft": area, "cost_per_sqft": rate} for name, area, rate in floors],
+                 "extra_works": [{"name": name, "quantity": quantity, "cost_per_unit": rate} for name, quantity, rate in works]},
+                **fields)
+
+
+def test_rules():
+    assert RATES.rule(FLOOR, " ground floor ") == ("rate", 195000)
+    assert RATES.rule(FLOOR, "Terrace") == ("shock", 600)
+    assert RATES.rule(EXTRA_WORK, "COMPOUND WALL") == ("shock", 1250)
+    assert RATES.rule(EXTRA_WORK, "Sump") is None
+
+
+def test_apply_rates_and_shocks():
+    bill = BillOfQuantities()
+    bill.add(FLOOR, "Ground Floor", 1000, 1800)
+    bill.add(FLOOR, "First Floor", 1000, 1800.25)
+    bill.add(EXTRA_WORK, "Compound wall", 1, 0.01)
+    bill.add(EXTRA_WORK, "Sump", 1, 45000)
+    # 180025 paise + 6% = 190826.5, rounded half up; 1 paisa + 12.5% rounds back to 1
+    assert RATES.apply(bill).tolist() == [195000, 190827, 1, 4500000]
+
+
+def test_threshold_and_totals():
+    documents = [document("a", floors=[("Terrace", 100, 1000)]),  # +6%
+                 document("b", works=[("Sump", 1, 5000)]),  # Unchanged
+                 document("c", floors=[("Ground Floor", 100, 2000)])]  # 2000 -> 1950
+    rows, old, new = reprice_chunk(documents, RATES, threshold_pct=5)
+    assert [(row["old_total"], row["new_total"], row["delta_pct"], row["over_threshold"]) for row in rows] == [
+        ("100000.00", "106000.00", "6.00", True), ("5000.00", "5000.00", "0.00", False), ("200000.00", "195000.00", "-2.50", False)]
+    assert (old, new) == (30500000, 30600000)
+    assert not reprice_chunk(documents[:1], RATES, threshold_pct=6)[0][0]["over_threshold"]  # Above, not at, the threshold
+
+
+def test_null_amounts_count_as_zero():
+    documents = [document("a", floors=[("Terrace", None, 1000), (None, 10, None)], works=[("Sump", 2, 100)]),
+                 dict(document("b"), floors=None, extra_works=[{"name": "Sump"}])]
+    rows, old, new = reprice_chunk(documents, RATES)
+    assert [(row["old_total"], row["error"]) for row in rows] == [("200.00", ""), ("0.00", "")]
+
+
+def test_unpriceable_quotation_is_reported_and_skipped():
+    documents = [document("a", floors=[("Terrace", 100, 1000)]),
+                 document("b", floors=[("Terrace", "lots", 1000)]),
+                 document("c", works=[("Sump", 1, float("inf"))])]
+    rows, old, new = reprice_chunk(documents, RATES)
+    assert [row["error"] for row in rows] == ["", "floors.area_sqft 'lots' is not a number", "extra_works.cost_per_unit inf is not a number"]
+    assert [row["new_total"] for row in rows] == ["106000.00", "", ""]
+    assert (old, new) == (10000000, 10600000)
+
+
+def test_run_reprice_streams_every_chunk(tmp_path):
+    repository = SQLiteRepository(":memory:")
+    for n in range(7):
+        repository.save({"email": f"c{n}@example.com", "customer_name": "Ravi Kumar", "building_site": "Plot", "validity_date": "2030-12-31",
+                         "floors": [{"name": "Terrace", "area_sqft": 100 + n, "cost_per_sqft": None if n == 3 else 1000, "total_cost": 0}],
+                         "extra_works": [{"name": "Sump", "quantity": "two" if n == 5 else 1, "cost_per_unit": 500, "total_cost": 500}],
+                         "total_project_cost": 0})
+    output = tmp_path / "deltas.csv"
+    messages = []
+    count, flagged, _ = run_reprice(repository, RATES, output, chunk_size=3, report=messages.append)
+    assert (count, flagged) == (7, 5)
+    with open(output, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert [row["error"] != "" for row in rows] == [False] * 5 + [True, False]
+    assert rows[3]["old_total"] == "500.00"
+    assert "1 quotations could not be priced" in messages[-1]
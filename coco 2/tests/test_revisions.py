@@ -0,0 +1,73 @@
+import pytest
+
+from revisions import SNAPSHOT_INTERVAL, apply_delta, diff_documents, format_diff, make_delta, revision_history
+from storage import SQLiteRepository
+
+BASE = {"email": "ravi@example.com", "customer_name": "Ravi Kumar", "building_site": "Plot 12", "validity_date": "2030-12-31",
+        "floors": [{"name": "Ground Floor", "area_sqft": 1200, "cost_per_sqft": 1850, "total_cost": 2220000}],
+        "extra_works": [{"name": "Sump", "quantity": 1, "cost_per_unit": 45000, "total_cost": 45000}],
+        "total_project_cost": 2265000}
+
+
+def revised(document, n):
+    """ `document` with the n-th edit: a new floor, a changed rate and an edited site """
+    floors = list(document["floors"]) + [{"name": f"Floor {n}", "area_sqft": 100 + n, "cost_per_sqft": 1900, "total_cost": (100 + n) * 1900}]
+    works = [dict(work, cost_per_unit=work["cost_per_unit"] + n, total_cost=work["quantity"] * (work["cost_per_unit"] + n))
+             for work in document["extra_works"]]
+    total = sum(item["total_cost"] for item in floors + works)
+    return dict(document, building_site=f"Plot {12 + n}", floors=floors, extra_works=works, total_project_cost=total)
+
+
+def test_delta_round_trip():
+    new = revised(BASE, 1)
+    new["unset_me"] = True
+    old = dict(BASE, note="dropped later")
+    assert apply_delta(new, make_delta(new, old)) == old
+    assert apply_delta(old, make_delta(old, new)) == new
+    assert make_delta(BASE, dict(BASE)) == {}
+
+
+def test_every_revision_rebuilds(repository):
+    quote_id = repository.save(dict(BASE))
+    versions = [dict(BASE)]
+    for n in range(1, 2 * SNAPSHOT_INTERVAL + 3):  # Crosses two snapshots
+        versions.append(revised(versions[-1], n))
+        assert repository.save_revision(quote_id, versions[-1]) == n + 1
+
+    for revision, expected in enumerate(versions, 1):
+        document = repository.get_revision(quote_id, revision)
+        assert document["revision"] == revision
+        for field, value in expected.items():
+            assert document[field] == value, (revision, field)
+    assert repository.get_revision(quote_id, len(versions) + 1) is None
+    assert [revision for revision, _ in repository.list_revisions(quote_id)] == list(range(1, len(versions) + 1))
+
+
+def test_unchanged_content_keeps_the_revision(repository):
+    quote_id = repository.save(dict(BASE))
+    assert repository.save_revision(quote_id, revised(BASE, 1)) == 2
+    assert repository.save_revision(quote_id, revised(BASE, 1)) == 2
+    assert len(repository.list_revisions(quote_id)) == 2
+
+
+def test_unknown_quotation(repository):
+    repository.save(dict(BASE))
+    with pytest.raises(KeyError):
+        repository.save_revision("999999" if isinstance(repository, SQLiteRepository) else "0" * 24, dict(BASE))
+
+
+def test_diff_documents():
+    new = revised(BASE, 1)
+    changes = diff_documents(BASE, new)
+    assert {(change["section"], change["change"], change["name"]) for change in changes} == {
+        ("fields", "changed", "building_site"), ("fields", "changed", "total_project_cost"),
+        ("floors", "added", "Floor 1"), ("extra_works", "changed", "Sump")}
+    assert "~ Building site: Plot 12 → Plot 13" in format_diff(changes)
+    assert format_diff(diff_documents(BASE, BASE)) == ["No changes."]
+
+
+def test_revision_history(repository):
+    quote_id = repository.save(dict(BASE))
+    repository.save_revision(quote_id, revised(BASE, 1))
+    history = revision_history(repository, quote_id)
+    assert [(revision, changes is None) for revision, _, changes in history] == [(1, True), (2, False)]
@@ -0,0 +1,101 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import search  # noqa: E402
+from search import SearchIndex, trigrams, words  # noqa: E402
+from storage import SQLiteRepository  # noqa: E402
+
+DOCUMENTS = [
+    {"_id": "1", "customer_name": "Vikram Sethu", "building_site": "Indira Nagar", "floors": [{"name": "Ground Floor"}], "extra_works": []},
+    {"_id": "2", "customer_name": "Meena Devi", "building_site": "Vikram Nagar", "floors": [], "extra_works": [{"name": "Sump"}]},
+    {"_id": "3", "customer_name": "Arun Kumar", "building_site": "Anna Nagar", "floors": [], "extra_works": [{"name": "Compound wall"}]},
+]
+
+
+@pytest.fixture
+def index():
+    return SearchIndex.build(DOCUMENTS)
+
+
+def test_words_and_trigrams():
+    assert words("Plot 12, Anna-Nagar") == ["plot", "12", "anna", "nagar"]
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+def test_customer_name_outranks_site(index):
+    assert [quote_id for quote_id, _ in index.search("vikram")] == ["1", "2"]
+
+
+def test_typos_and_prefixes(index):
+    assert index.search("vikrm")[0][0] == "1"
+    assert index.search("comp")[0][0] == "3"
+
+
+@pytest.mark.parametrize("limit", [0, -3])
+def test_non_positive_limit_returns_nothing(index, limit):
+    assert index.search("nagar", limit=limit) == []
+
+
+def test_limit_larger_than_the_index(index):
+    assert len(index.search("nagar", limit=1000)) == 3
+
+
+def test_empty_query_and_empty_index(index):
+    assert index.search("  ,. ") == []
+    assert SearchIndex().search("nagar") == []
+
+
+def test_reindexing_replaces_the_old_entry(index):
+    index.add("1", dict(DOCUMENTS[0], customer_name="Lakshmi Narayanan"))
+    assert "1" not in [quote_id for quote_id, _ in index.search("vikram")]
+    assert index.search("lakshmi")[0][0] == "1"
+    assert len(index) == 3
+
+
+def test_search_quotations_with_a_non_positive_limit_skips_the_database(monkeypatch):
+    repository = SQLiteRepository(":memory:")
+    monkeypatch.setattr(search, "_search_index", None)
+    monkeypatch.setattr(repository, "text_search", lambda query, limit: pytest.fail("database queried"))
+    assert search.search_quotations("nagar", limit=0, repository=repository) == []
+
+
+@pytest.fixture
+def shared_index(monkeypatch):
+    """ A fresh process-wide index for search_quotations, refreshed on every search """
+    for name, value in (("_search_index", None), ("_changes_since", None), ("_checked_at", 0.0), ("_refreshed", {})):
+        monkeypatch.setattr(search, name, value)
+    monkeypatch.setattr(search, "REFRESH_INTERVAL", 0.0)
+
+
+def names(results):
+    return [result["customer_name"] for result in results]
+
+
+def stored(document, **fields):
+    """ A complete quotation document with the names of one of DOCUMENTS """
+    document = dict(document, email="customer@example.com", validity_date="2030-12-31", total_project_cost=0, **fields)
+    document.pop("_id")
+    document["floors"] = [dict(floor, area_sqft=1000, cost_per_sqft=0, total_cost=0) for floor in document["floors"]]
+    document["extra_works"] = [dict(work, quantity=1, cost_per_unit=0, total_cost=0) for work in document["extra_works"]]
+    return document
+
+
+def test_changes_from_other_processes_are_picked_up(repository, shared_index):
+    quote_id = repository.save(stored(DOCUMENTS[0]))
+    search.get_search_index(repository)
+    assert names(search.search_quotations("meena", repository=repository)) == []
+
+    repository.save(stored(DOCUMENTS[1]))  # Saved elsewhere: no update_search_index
+    assert names(search.search_quotations("meena", repository=repository)) == ["Meena Devi"]
+    repository.save_revision(quote_id, stored(DOCUMENTS[0], customer_name="Lakshmi Narayanan"))
+    assert names(search.search_quotations("lakshmi", repository=repository)) == ["Lakshmi Narayanan"]
+    assert names(search.search_quotations("sethu", repository=repository)) == []
+
+
+def test_refresh_indexes_each_change_once(repository, shared_index):
+    search.get_search_index(repository)
+    repository.save(stored(DOCUMENTS[2]))
+    assert search.refresh_search_index(repository) == 1
+    assert search.refresh_search_index(repository) == 0  # Still in the overlap window, but already indexed
+    assert len(search.get_search_index().quote_ids) == 1
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from service import QuotationService
+from storage import SQLiteRepository
+
+QUOTATION = {"email": "ravi@example.com", "customer_name": "Ravi Kumar", "building_site": "Plot 12, Anna Nagar",
+             "validity_date": "2030-12-31", "floors": [{"name": "Ground Floor", "area_sqft": 1200, "cost_per_sqft": 1850}],
+             "extra_works": [{"name": "Sump", "quantity": 1, "cost_per_unit": 45000}]}
+
+
+@pytest.fixture
+def service():
+    service = QuotationService(repository=SQLiteRepository(":memory:"), pdf_workers=1, db_threads=2)
+    yield service
+    service.close()
+
+
+def request(service, method, target, body=None):
+    """ (status, payload) of one request through the route table """
+    data = json.dumps(body).encode("utf-8") if body is not None and not isinstance(body, bytes) else body
+    _, status, payload = asyncio.run(service.dispatch(method, target, data or b""))
+    return status, payload
+
+
+def test_estimate(service):
+    status, payload = request(service, "POST", "/estimate", QUOTATION)
+    assert status == 200
+    assert payload["total_project_cost"] == 1200 * 1850 + 45000
+
+
+@pytest.mark.parametrize("body", [b"not json", b"[1, 2]", {"floors": 5}, {"floors": ["Ground Floor"]},
+                                  {"floors": [{"name": "", "area_sqft": 1, "cost_per_sqft": 1}]}])
+def test_estimate_rejects_bad_bodies(service, body):
+    status, payload = request(service, "POST", "/estimate", body)
+    assert status == 400
+    assert payload["error"]
+
+
+def test_unknown_route_and_method(service):
+    assert request(service, "GET", "/nowhere")[0] == 404
+    assert request(service, "DELETE", "/quotations")[0] == 405
+
+
+def test_save_requires_email(service):
+    status, payload = request(service, "POST", "/quotations", dict(QUOTATION, email="not-an-email"))
+    assert (status, payload["field"]) == (400, "email")
+
+
+def test_missing_quotation(service):
+    assert request(service, "GET", "/quotations/12345")[0] == 404
+
+
+@pytest.mark.parametrize("body", [{"email": 5}, {"email": ["a@b.com"]}, {"email": "nobody"}, b"[]", b"{"])
+def test_send_rejects_bad_recipients(service, body):
+    status, _ = request(service, "POST", "/quotations", QUOTATION)
+    assert status == 201
+    quote_id = service.repository.find_page(QUOTATION["email"])[0][0]["_id"]
+    status, payload = request(service, "POST", f"/quotations/{quote_id}/send", body)
+    assert status == 400
+    assert payload["error"]
+
+
+@pytest.mark.parametrize("top", ["0", "-1", "x", "2.5"])
+def test_extra_works_rejects_non_positive_top(service, top):
+    status, payload = request(service, "GET", f"/analytics/extra-works?top={top}")
+    assert (status, payload["field"]) == (400, "top")
+
+
+def test_extra_works_top(service):
+    request(service, "POST", "/quotations", QUOTATION)
+    request(service, "POST", "/quotations", dict(QUOTATION, customer_name="Meena Devi",
+                                                 extra_works=[{"name": "Compound wall", "quantity": 40, "cost_per_unit": 900}]))
+    status, payload = request(service, "GET", "/analytics/extra-works?top=1")
+    assert status == 200
+    assert [row["name"] for row in payload["extra_works"]] == ["Sump"]
+
+
+@pytest.mark.parametrize("limit", ["0", "-3", "ten"])
+def test_search_rejects_non_positive_limit(service, limit):
+    status, payload = request(service, "GET", f"/search?q=ravi&limit={limit}")
+    assert (status, payload["field"]) == (400, "limit")
+
+
+def test_search_requires_a_query(service):
+    assert request(service, "GET", "/search?q=%20")[0] == 400
+
+
+def test_saves_are_indexed_off_the_event_loop(service, monkeypatch):
+    import threading
+
+    import service as service_module
+
+    indexed = []
+    monkeypatch.setattr(service_module, "update_search_index", lambda quote_id, document: indexed.append(
+        (quote_id, threading.current_thread() is threading.main_thread())))
+    status, payload = request(service, "POST", "/quotations", QUOTATION)
+    assert status == 201
+    status, revised = request(service, "PUT", f"/quotations/{payload['id']}", dict(QUOTATION, building_site="Plot 14"))
+    assert (status, revised["revision"]) == (200, 2)
+    assert indexed == [(payload["id"], False), (payload["id"], False)]
@@ -0,0 +1,96 @@
+import pytest
+
+from estimator_core import Quotation
+from storage import SUMMARY_FIELDS, MongoRepository, SQLiteRepository, open_repository
+
+
+def document(n, email="ravi@example.com"):
+    quotation = Quotation(email, "Ravi Kumar", f"Plot {n}", "2030-12-31")
+    quotation.add_floor("Ground Floor", 1000.0 + n, 1800.0)
+    return quotation.to_document()
+
+
+def save_all(repository, count, email="ravi@example.com"):
+    return [repository.save(document(n, email)) for n in range(count)]
+
+
+def test_pages_walk_every_quotation_newest_first(repository):
+    ids = save_all(repository, 7)
+    save_all(repository, 2, email="anu@example.com")
+
+    pages, cursor = [], None
+    while True:
+        summaries, cursor = repository.find_page(" Ravi@Example.com ", after=cursor, limit=3)
+        pages.append([str(summary["_id"]) for summary in summaries])
+        if cursor is None:
+            break
+        assert cursor == pages[-1][-1]
+    assert pages == [ids[6:3:-1], ids[3:0:-1], ids[:1]]
+
+
+def test_page_holds_only_summary_fields(repository):
+    save_all(repository, 1)
+    (summary,), cursor = repository.find_page("ravi@example.com")
+    assert cursor is None
+    assert set(summary) == {"_id"} | set(SUMMARY_FIELDS)
+    assert summary["total_project_cost"] == 1800000.0
+
+
+def test_exact_page_has_no_next_cursor(repository):
+    save_all(repository, 3)
+    summaries, cursor = repository.find_page("ravi@example.com", limit=3)
+    assert len(summaries) == 3
+    assert cursor is None
+    assert repository.find_page("nobody@example.com") == ([], None)
+
+
+def test_invalid_cursor_is_rejected(repository):
+    save_all(repository, 2)
+    with pytest.raises((ValueError, IndexError)):  # What the service answers with a 400
+        repository.find_page("ravi@example.com", after="not-a-cursor")
+
+
+def test_get_returns_the_stored_document(repository):
+    quote_id = save_all(repository, 2)[1]
+    stored = repository.get(quote_id)
+    assert str(stored["_id"]) == quote_id
+    assert stored["building_site"] == "Plot 1"
+    assert stored["floors"] == document(1)["floors"]
+
+
+@pytest.mark.parametrize("quote_id", ["999999", "64b000000000000000000000", "not-an-id", None])
+def test_get_unknown_id_is_none(repository, quote_id):
+    save_all(repository, 1)
+    assert repository.get(quote_id) is None
+
+
+def test_get_many_skips_unknown_ids(repository):
+    ids = save_all(repository, 3)
+    found = repository.get_many([ids[2], "not-an-id", ids[0], "999999"])
+    assert sorted(str(stored["_id"]) for stored in found) == sorted([ids[0], ids[2]])
+
+
+def test_find_by_email_normalizes_the_email(repository):
+    ids = save_all(repository, 2)
+    save_all(repository, 1, email="anu@example.com")
+    found = repository.find_by_email("  RAVI@example.COM ")
+    assert sorted(str(stored["_id"]) for stored in found) == sorted(ids)
+    assert list(repository.find_by_email("nobody@example.com")) == []
+
+
+def test_open_repository_picks_the_backend(tmp_path, monkeypatch):
+    path = tmp_path / "quotes.db"
+    repository = open_repository(f"sqlite:///{path}")
+    assert isinstance(repository, SQLiteRepository)
+    assert repository.path == str(path)
+    assert not path.exists()  # Nothing is opened until the first query
+
+    quote_id = repository.save(document(0))
+    assert open_repository(f"sqlite:///{path}").get(quote_id)["building_site"] == "Plot 0"
+
+    monkeypatch.setenv("ESTIMATOR_DB", f"sqlite:///{path}")
+    assert isinstance(open_repository(), SQLiteRepository)
+    monkeypatch.setenv("ESTIMATOR_DB", "mongodb://db.invalid:27017")
+    mongo = open_repository()
+    assert isinstance(mongo, MongoRepository)
+    assert mongo._client is None  # No connection attempt yet
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+
+from tasks import TaskCancelled, TaskExecutor
+
+
+@pytest.fixture
+def executor():
+    statuses = []
+    executor = TaskExecutor(max_workers=2, debounce=60, on_status=lambda task, status, detail: statuses.append((task.key, status)))
+    executor.statuses = statuses
+    yield executor
+    executor.shutdown()
+
+
+def poll_until(executor, condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        executor.poll()
+        time.sleep(0.005)
+
+
+def test_callbacks_run_in_poll(executor):
+    results, errors = [], []
+    executor.submit("save", lambda task: 42, on_done=results.append, label="Saving")
+    executor.submit("send", lambda task: 1 / 0, on_error=errors.append, label="Sending")
+    time.sleep(0.05)
+    assert results == [] and errors == []  # Nothing runs on the polling thread until poll()
+    poll_until(executor, lambda: results and errors)
+    assert results == [42]
+    assert isinstance(errors[0], ZeroDivisionError)
+    assert sorted(executor.statuses) == [("save", "done"), ("save", "started"), ("send", "failed"), ("send", "started")]
+
+
+def test_running_key_and_debounce(executor):
+    release = threading.Event()
+    assert executor.submit("save", lambda task: release.wait(5)) is not None
+    assert executor.submit("save", lambda task: None) is None  # Still running
+    release.set()
+    poll_until(executor, lambda: not executor.running("save"))
+    assert executor.submit("save", lambda task: None) is None  # Within the debounce interval
+    assert executor.submit("save", lambda task: None, debounce=0) is not None
+
+
+def test_replace_drops_the_stale_result(executor):
+    release = threading.Event()
+    results = []
+    first = executor.submit("fetch", lambda task: release.wait(5) and "old", on_done=results.append, label="Fetching")
+    second = executor.submit("fetch", lambda task: "new", on_done=results.append, label="Fetching", replace=True)
+    assert first.cancelled and not second.cancelled
+    poll_until(executor, lambda: results)
+    release.set()  # The old work never calls check(), so it runs to the end
+    poll_until(executor, lambda: ("fetch", "cancelled") in executor.statuses)
+    assert results == ["new"]
+    assert not executor.running("fetch")
+
+
+def test_cancel_stops_work_at_its_next_check(executor):
+    started, steps = threading.Event(), []
+
+    def work(task):
+        started.set()
+        for step in range(200):
+            task.check()
+            steps.append(step)
+            time.sleep(0.005)
+        return "finished"
+
+    results = []
+    executor.submit("export", work, on_done=results.append, label="Exporting")
+    assert started.wait(5)
+    executor.cancel("export")
+    poll_until(executor, lambda: ("export", "cancelled") in executor.statuses)
+    assert results == [] and len(steps) < 200
+
+
+def test_cancel_before_start_never_runs(executor):
+    release, ran = threading.Event(), []
+    for key in ("a", "b"):
+        executor.submit(key, lambda task: release.wait(5))  # Both workers busy
+    task = executor.submit("c", lambda task: ran.append(True), label="Waiting")
+    task.cancel()
+    release.set()
+    poll_until(executor, lambda: ("c", "cancelled") in executor.statuses)
+    executor._pool.shutdown(wait=True)
+    assert ran == []
+
+
+def test_progress(executor):
+    def work(task):
+        task.progress(0.5, "half way")
+        return None
+
+    task = executor.submit("export", work, label="Exporting")
+    poll_until(executor, lambda: ("export", "done") in executor.statuses)
+    assert task.fraction == 0.5
+    assert ("export", "progress") in executor.statuses
+
+
+def test_check_raises_once_cancelled(executor):
+    task = executor.submit("save", lambda task: None)
+    task.cancel()
+    with pytest.raises(TaskCancelled):
+        task.check()